@@ -1,5 +1,16 @@
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
+import json
 import os
 import re
+import select
+import shutil
+import struct
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 def convert_to_txt(directory_path):
     """
@@ -55,138 +66,330 @@ def is_absolute_url(url):
     )
     return url.startswith(absolute_url_patterns)
 
-def modify_href_src_in_files(txt_files, search_sim_text='some_similar_text'):
+# الگوی regex برای پیدا کردن تگ‌های <link> با ویژگی href
+link_tag_regex = re.compile(r'<link\b[^>]*href\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+# الگوی regex برای پیدا کردن تگ‌های <script> با ویژگی src
+script_tag_regex = re.compile(r'<script\b[^>]*src\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+# الگوی regex برای پیدا کردن تگ‌های <img> با ویژگی src
+img_tag_regex = re.compile(r'<img\b[^>]*src\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+def rewrite_lines(lines, filename, search_sim_text='some_similar_text'):
     """
-    این تابع فایل‌های .txt را پردازش می‌کند تا ویژگی href در تگ‌های <link>، 
-    ویژگی src در تگ‌های <script> و ویژگی src در تگ‌های <img> را به قالب {% static '...' %} تغییر دهد
-    مگر اینکه قبلاً شامل {% static %}، {{ ... }} باشند یا URL مطلق باشد.
-    همچنین جستجوی متنی مشابه در خطوط انجام می‌دهد و نتایج را در فایل‌های لاگ ذخیره می‌کند.
+    نسخه قدیمی مبتنی بر regex خط‌به‌خط؛ فقط برای مقایسه در --benchmark نگه داشته شده است.
+    خطوط یک فایل را در جا به قالب {% static '...' %} تغییر می‌دهد.
+    خروجی: (آیا تغییری اعمال شد، نتایج تغییرات، نتایج جستجوی متن مشابه)
     """
     search_results = []
     search_sim_results = []
-    found_any = False
+    modified = False  # علامت برای بررسی تغییرات
+
+    # پردازش هر خط در فایل
+    for line_num, line in enumerate(lines, start=1):
+        original_line = line  # نگهداری نسخه اصلی خط برای مقایسه
+
+        # پردازش ویژگی href در تگ‌های <link>
+        if '<link' in line:
+            matches = link_tag_regex.finditer(line)
+            for match in matches:
+                original_content = match.group(1)
+
+                # بررسی وجود قالب‌های Django در محتوای href یا URL مطلق
+                if ('{%' in original_content or '%}' in original_content or 
+                    '{{' in original_content or '}}' in original_content or 
+                    is_absolute_url(original_content)):
+                    search_results.append(f'{filename}:{line_num} ---> href="{original_content}" (has {{%}}، {{}} یا URL مطلق)')
+                    continue
+
+                # تغییر href به قالب {% static '...' %}
+                new_content = f'{{% static \'{original_content}\' %}}'
+                # جایگزینی محتوای جدید در خط
+                new_href_attribute = f'href="{new_content}"'
+                line = re.sub(r'href\s*=\s*["\']([^"\']+)["\']', new_href_attribute, line, count=1)
+                search_results.append(f'{filename}:{line_num} ---> Updated href="{new_content}"')
+                modified = True
+
+        # پردازش ویژگی src در تگ‌های <script>
+        if '<script' in line:
+            matches = script_tag_regex.finditer(line)
+            for match in matches:
+                original_content = match.group(1)
+
+                # بررسی وجود قالب‌های Django در محتوای src یا URL مطلق
+                if ('{%' in original_content or '%}' in original_content or 
+                    '{{' in original_content or '}}' in original_content or 
+                    is_absolute_url(original_content)):
+                    search_results.append(f'{filename}:{line_num} ---> src="{original_content}" (has {{%}}، {{}} یا URL مطلق)')
+                    continue
+
+                # تغییر src به قالب {% static '...' %}
+                new_content = f'{{% static \'{original_content}\' %}}'
+                # جایگزینی محتوای جدید در خط
+                new_src_attribute = f'src="{new_content}"'
+                line = re.sub(r'src\s*=\s*["\']([^"\']+)["\']', new_src_attribute, line, count=1)
+                search_results.append(f'{filename}:{line_num} ---> Updated src="{new_content}"')
+                modified = True
+
+        # پردازش ویژگی src در تگ‌های <img>
+        if '<img' in line:
+            matches = img_tag_regex.finditer(line)
+            for match in matches:
+                original_content = match.group(1)
+
+                # بررسی وجود قالب‌های Django در محتوای src یا URL مطلق
+                if ('{%' in original_content or '%}' in original_content or 
+                    '{{' in original_content or '}}' in original_content or 
+                    is_absolute_url(original_content)):
+                    search_results.append(f'{filename}:{line_num} ---> src="{original_content}" (has {{%}}، {{}} یا URL مطلق)')
+                    continue
+
+                # تغییر src به قالب {% static '...' %}
+                new_content = f'{{% static \'{original_content}\' %}}'
+                # جایگزینی محتوای جدید در خط
+                new_src_attribute = f'src="{new_content}"'
+                line = re.sub(r'src\s*=\s*["\']([^"\']+)["\']', new_src_attribute, line, count=1)
+                search_results.append(f'{filename}:{line_num} ---> Updated src="{new_content}"')
+                modified = True
 
-    # الگوی regex برای پیدا کردن تگ‌های <link> با ویژگی href
-    link_tag_regex = re.compile(r'<link\b[^>]*href\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
-    # الگوی regex برای پیدا کردن تگ‌های <script> با ویژگی src
-    script_tag_regex = re.compile(r'<script\b[^>]*src\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
-    # الگوی regex برای پیدا کردن تگ‌های <img> با ویژگی src
-    img_tag_regex = re.compile(r'<img\b[^>]*src\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+        # جستجوی متن مشابه در خط
+        if search_sim_text in line:
+            search_sim_results.append(f'{filename}:{line_num} ---> Not Updated{line.strip()}')
+
+        # به‌روزرسانی خط اگر تغییر کرده باشد
+        if line != original_line:
+            lines[line_num - 1] = line
+
+    return modified, search_results, search_sim_results
+
+# فایل گزارش JSONL؛ هر خط یک رکورد (بازنویسی، رد شدن، متن مشابه، ...)
+REPORT_PATH = 'changer_report.jsonl'
+
+# ویژگی‌هایی که در هر تگ به {% static %} تبدیل می‌شوند
+STATIC_ATTRIBUTES = {
+    'link': ('href',),
+    'script': ('src',),
+    'img': ('src', 'srcset'),
+    'source': ('src', 'srcset'),
+}
+
+# تگ‌هایی که محتوایشان متن خام است و داخلشان دنبال تگ گشته نمی‌شود
+RAW_TEXT_TAGS = ('script', 'style')
+
+# تگ‌های Django که همه‌جا (بین ویژگی‌ها و داخل مقدار آن‌ها) دست‌نخورده رد می‌شوند
+DJANGO_TAG_PATTERN = r'\{%.*?%\}|\{\{.*?\}\}|\{\#.*?\#\}'
+ATTRIBUTE_NAME_PATTERN = r'[^\s"\'>/={]+'
+# مقدار ویژگی؛ گروه‌های dq/sq/uq در الگوی ویژگی هدف نام‌گذاری می‌شوند
+ATTRIBUTE_VALUE_PATTERN = r"""(?:
+    "(?P<dq>[^"{]*(?:(?:%(django)s|\{)[^"{]*)*)"
+  | '(?P<sq>[^'{]*(?:(?:%(django)s|\{)[^'{]*)*)'
+  | (?P<uq>[^\s"'>]+)
+)""" % {'django': DJANGO_TAG_PATTERN}
+UNNAMED_VALUE_PATTERN = re.sub(r'\(\?P<\w+>', '(?:', ATTRIBUTE_VALUE_PATTERN)
+STATIC_ATTRIBUTE_NAMES = r'(?:href|srcset|src)(?![^\s"\'>/={])'
+TARGET_TAGS = 'link|script|img|source|style'
+
+# یک پیمایش روی کل متن که فقط روی ابتدای تگ‌های مورد نظر و کامنت‌ها (HTML، {# #} و
+# {% comment %}) می‌ایستد؛ شروع الگو با [<{] و نگاه به کاراکتر بعدی باعث می‌شود
+# متن عادی و بقیه تگ‌ها داخل خود موتور regex سریع رد شوند
+token_regex = re.compile(
+    r'[<{](?=[lsiLSI!#%%])(?:(?P<tag>(?i:%s))(?=[\s/>])|(?P<comment>!--|\#|%%\s*comment\b))' % TARGET_TAGS,
+)
+# ادامه تگ بعد از نامش تا >؛ تگ‌های Django بین ویژگی‌ها و داخل مقدارها مجازند.
+# کمیت‌سنج possessive (*+) جلوی backtracking روی تگ ناقص را می‌گیرد.
+start_tag_regex = re.compile(r"""
+    (?P<attrs>(?:\s*(?:%(django)s | %(name)s(?:\s*=\s*%(value)s)? | /))*+)
+    \s*>""" % {'django': DJANGO_TAG_PATTERN, 'name': ATTRIBUTE_NAME_PATTERN, 'value': UNNAMED_VALUE_PATTERN},
+    re.VERBOSE)
+# پایان کامنت بر اساس اولین کاراکتر بعد از < یا {
+comment_end_regexes = {
+    '!': re.compile(r'-->'),
+    '#': re.compile(r'#\}'),
+    '%': re.compile(r'\{%\s*endcomment\s*%\}'),
+}
+# ویژگی بعدی href/src/srcset داخل بخش ویژگی‌های یک تگ؛ بقیه ویژگی‌ها یکجا رد می‌شوند
+static_attribute_regex = re.compile(r"""
+    (?:\s*(?:%(django)s | (?!%(static)s)%(name)s(?:\s*=\s*%(unnamed)s)? | /))*+
+    \s*(?P<name>%(static)s)(?:\s*=\s*%(value)s)?
+    """ % {'django': DJANGO_TAG_PATTERN, 'static': STATIC_ATTRIBUTE_NAMES, 'name': ATTRIBUTE_NAME_PATTERN,
+           'unnamed': UNNAMED_VALUE_PATTERN, 'value': ATTRIBUTE_VALUE_PATTERN},
+    re.IGNORECASE | re.VERBOSE)
+raw_text_end_regexes = {tag: re.compile(rf'</{tag}\s*>', re.IGNORECASE) for tag in RAW_TEXT_TAGS}
+
+# آدرس نسبی ساده بدون تگ Django، پروتکل یا کوتیشن؛ بیشتر آدرس‌ها همین‌جا تأیید می‌شوند
+plain_url_regex = re.compile(r"""(?!//)[^\s{}'"\\#:]+\Z""")
+
+def static_skip_reason(url):
+    """دلیل تبدیل نشدن یک آدرس به {% static %} یا None"""
+    if plain_url_regex.match(url):
+        return None
+    if not url:
+        return 'empty'
+    if '{%' in url or '%}' in url or '{{' in url or '}}' in url:
+        return 'template tag'
+    if is_absolute_url(url) or url.startswith(('#', 'mailto:', 'tel:', 'javascript:')):
+        return 'absolute url'
+    if "'" in url or '\\' in url:
+        return 'quote in url'
+    return None
+
+def rewrite_srcset(value):
+    """هر آدرس srcset جدا تبدیل می‌شود؛ خروجی (مقدار جدید یا None، دلیل رد شدن)"""
+    candidates = []
+    for candidate in value.split(','):
+        parts = candidate.split(None, 1)
+        if not parts:
+            return None, 'empty'
+        reason = static_skip_reason(parts[0])
+        if reason:
+            return None, reason
+        candidates.append(' '.join([f"{{% static '{parts[0]}' %}}"] + parts[1:]))
+    return ', '.join(candidates), None
+
+def rewrite_text(text, filename, search_sim_text='some_similar_text'):
+    """
+    کل متن یک قالب را در یک پیمایش پردازش می‌کند و href/src/srcset تگ‌های
+    <link>، <script>، <img> و <source> را به {% static '...' %} تبدیل می‌کند.
+    تگ‌های چندخطی و چند تگ در یک خط درست پردازش می‌شوند و تگ‌های Django،
+    کامنت‌ها و محتوای <script>/<style> دست نمی‌خورند.
+    خروجی: (متن جدید، لیست رکوردهای گزارش)
+    """
+    records = []
+    out = []
+    copied = 0  # متن تا این نقطه به out منتقل شده است
+    line = 1
+    line_pos = 0
+    has_rewrite = False
+
+    def line_at(pos):
+        nonlocal line, line_pos
+        line += text.count('\n', line_pos, pos)
+        line_pos = pos
+        return line
+
+    pos = 0
+    while True:
+        match = token_regex.search(text, pos)
+        if not match:
+            break
+        pos = match.end()
+        comment = match.group('comment')
+        if comment:
+            closing = comment_end_regexes[comment[0]].search(text, pos)
+            # {# #} یک‌خطی است؛ کامنت بسته‌نشده فقط از روی شروعش رد می‌شود
+            if closing and (comment != '#' or '\n' not in text[pos:closing.start()]):
+                pos = closing.end()
+            continue
+
+        tag = match.group('tag').lower()
+        match = start_tag_regex.match(text, pos)
+        if not match:
+            records.append({'file': filename, 'line': line_at(pos), 'tag': tag, 'action': 'skipped', 'reason': 'malformed tag'})
+            continue
+        pos = match.end()
+
+        targets = STATIC_ATTRIBUTES.get(tag, ())
+        attrs_pos, attrs_end = match.start('attrs'), match.end('attrs')
+        while targets:
+            attribute = static_attribute_regex.match(text, attrs_pos, attrs_end)
+            if not attribute:
+                break
+            attrs_pos = attribute.end()
+            name = attribute.group('name').lower()
+            if name not in targets:
+                continue
+            # lastgroup نام گروه مقدار (dq/sq/uq) است یا name اگر ویژگی مقدار نداشته باشد
+            group = attribute.lastgroup
+            value = '' if group == 'name' else attribute.group(group)
+            if name == 'srcset':
+                new_value, reason = rewrite_srcset(value)
+            else:
+                reason = static_skip_reason(value)
+                new_value = None if reason else f"{{% static '{value}' %}}"
+            record_line = line_at(attribute.start('name'))
+            if reason:
+                records.append({'file': filename, 'line': record_line, 'tag': tag, 'attr': name, 'value': value,
+                                'action': 'skipped', 'reason': reason})
+                continue
+            out.append(text[copied:attribute.start(group)])
+            # مقدار بدون کوتیشن باید کوتیشن بگیرد چون {% static %} فاصله دارد
+            out.append(f'"{new_value}"' if group == 'uq' else new_value)
+            copied = attribute.end(group)
+            has_rewrite = True
+            records.append({'file': filename, 'line': record_line, 'tag': tag, 'attr': name, 'value': value,
+                            'action': 'rewritten', 'new': new_value})
+
+        # محتوای script/style تا تگ پایانی‌اش رد می‌شود
+        if tag in RAW_TEXT_TAGS and not match.group().endswith('/>'):
+            closing = raw_text_end_regexes[tag].search(text, pos)
+            pos = closing.end() if closing else len(text)
+
+    out.append(text[copied:])
+    new_text = ''.join(out)
+
+    if has_rewrite and not re.search(r'\{%\s*load\b[^%]*\bstatic\b', new_text):
+        records.append({'file': filename, 'line': 1, 'action': 'warning', 'reason': 'missing {% load static %}'})
+
+    # جستجوی متن مشابه؛ هر خط فقط یک بار گزارش می‌شود
+    if search_sim_text:
+        found = text.find(search_sim_text)
+        last_line_end = -1
+        while found != -1:
+            line_start = text.rfind('\n', 0, found) + 1
+            line_end = text.find('\n', found)
+            line_end = len(text) if line_end == -1 else line_end
+            if line_start > last_line_end:
+                records.append({
+                    'file': filename, 'line': text.count('\n', 0, found) + 1, 'action': 'similar',
+                    'text': text[line_start:line_end].strip(),
+                })
+                last_line_end = line_end
+            found = text.find(search_sim_text, line_end)
+
+    return new_text, records
+
+def write_report(records, report_path=REPORT_PATH):
+    with open(report_path, 'w', encoding='utf-8') as report:
+        for record in records:
+            report.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def modify_href_src_in_files(txt_files, search_sim_text='some_similar_text', report_path=REPORT_PATH):
+    """
+    این تابع فایل‌های .txt را با rewrite_text پردازش می‌کند تا href تگ‌های <link>،
+    src تگ‌های <script> و src/srcset تگ‌های <img> و <source> را به قالب {% static '...' %} تغییر دهد
+    مگر اینکه قبلاً شامل {% static %}، {{ ... }} باشند یا URL مطلق باشد.
+    همچنین متن مشابه را جستجو می‌کند و همه نتایج را در گزارش JSONL ذخیره می‌کند.
+    """
+    records = []
+    found_any = False
 
     for txt_file in txt_files:
         filename = os.path.basename(txt_file)
         try:
-            with open(txt_file, 'r', encoding='utf-8', errors='ignore') as file:
-                lines = file.readlines()
+            with open(txt_file, 'r', encoding='utf-8', errors='surrogateescape', newline='') as file:
+                text = file.read()
         except Exception as e:
             print(f'خطا در باز کردن فایل {txt_file}: {e}')
             continue
 
-        modified = False  # علامت برای بررسی تغییرات
-
-        # پردازش هر خط در فایل
-        for line_num, line in enumerate(lines, start=1):
-            original_line = line  # نگهداری نسخه اصلی خط برای مقایسه
-
-            # پردازش ویژگی href در تگ‌های <link>
-            if '<link' in line:
-                matches = link_tag_regex.finditer(line)
-                for match in matches:
-                    original_content = match.group(1)
-
-                    # بررسی وجود قالب‌های Django در محتوای href یا URL مطلق
-                    if ('{%' in original_content or '%}' in original_content or 
-                        '{{' in original_content or '}}' in original_content or 
-                        is_absolute_url(original_content)):
-                        search_results.append(f'{filename}:{line_num} ---> href="{original_content}" (has {{%}}، {{}} یا URL مطلق)')
-                        continue
-
-                    # تغییر href به قالب {% static '...' %}
-                    new_content = f'{{% static \'{original_content}\' %}}'
-                    # جایگزینی محتوای جدید در خط
-                    new_href_attribute = f'href="{new_content}"'
-                    line = re.sub(r'href\s*=\s*["\']([^"\']+)["\']', new_href_attribute, line, count=1)
-                    search_results.append(f'{filename}:{line_num} ---> Updated href="{new_content}"')
-                    modified = True
-                    found_any = True
-
-            # پردازش ویژگی src در تگ‌های <script>
-            if '<script' in line:
-                matches = script_tag_regex.finditer(line)
-                for match in matches:
-                    original_content = match.group(1)
-
-                    # بررسی وجود قالب‌های Django در محتوای src یا URL مطلق
-                    if ('{%' in original_content or '%}' in original_content or 
-                        '{{' in original_content or '}}' in original_content or 
-                        is_absolute_url(original_content)):
-                        search_results.append(f'{filename}:{line_num} ---> src="{original_content}" (has {{%}}، {{}} یا URL مطلق)')
-                        continue
-
-                    # تغییر src به قالب {% static '...' %}
-                    new_content = f'{{% static \'{original_content}\' %}}'
-                    # جایگزینی محتوای جدید در خط
-                    new_src_attribute = f'src="{new_content}"'
-                    line = re.sub(r'src\s*=\s*["\']([^"\']+)["\']', new_src_attribute, line, count=1)
-                    search_results.append(f'{filename}:{line_num} ---> Updated src="{new_content}"')
-                    modified = True
-                    found_any = True
-
-            # پردازش ویژگی src در تگ‌های <img>
-            if '<img' in line:
-                matches = img_tag_regex.finditer(line)
-                for match in matches:
-                    original_content = match.group(1)
-
-                    # بررسی وجود قالب‌های Django در محتوای src یا URL مطلق
-                    if ('{%' in original_content or '%}' in original_content or 
-                        '{{' in original_content or '}}' in original_content or 
-                        is_absolute_url(original_content)):
-                        search_results.append(f'{filename}:{line_num} ---> src="{original_content}" (has {{%}}، {{}} یا URL مطلق)')
-                        continue
-
-                    # تغییر src به قالب {% static '...' %}
-                    new_content = f'{{% static \'{original_content}\' %}}'
-                    # جایگزینی محتوای جدید در خط
-                    new_src_attribute = f'src="{new_content}"'
-                    line = re.sub(r'src\s*=\s*["\']([^"\']+)["\']', new_src_attribute, line, count=1)
-                    search_results.append(f'{filename}:{line_num} ---> Updated src="{new_content}"')
-                    modified = True
-                    found_any = True
-
-            # جستجوی متن مشابه در خط
-            if search_sim_text in line:
-                search_sim_results.append(f'{filename}:{line_num} ---> Not Updated{line.strip()}')
-
-            # به‌روزرسانی خط اگر تغییر کرده باشد
-            if line != original_line:
-                lines[line_num - 1] = line
+        new_text, file_records = rewrite_text(text, filename, search_sim_text)
+        records.extend(file_records)
 
         # نوشتن تغییرات در فایل اگر تغییراتی اعمال شده باشد
-        if modified:
+        if new_text != text:
+            found_any = True
             try:
-                with open(txt_file, 'w', encoding='utf-8', errors='ignore') as file:
-                    file.writelines(lines)
+                with open(txt_file, 'w', encoding='utf-8', errors='surrogateescape', newline='') as file:
+                    file.write(new_text)
                 print(f'تغییرات در {txt_file} اعمال شد.')
             except Exception as e:
                 print(f'خطا در نوشتن به فایل {txt_file}: {e}')
 
-    # نوشتن نتایج تغییرات href و src در search_result.txt
-    if search_results:
-        with open('search_result.txt', 'w', encoding='utf-8') as search_result:
-            for result in search_results:
-                search_result.write(f"{result}\n")
-
-    # نوشتن نتایج جستجوی متن مشابه در search_sim.txt
-    if search_sim_results:
-        with open('search_sim.txt', 'w', encoding='utf-8') as search_sim:
-            for sim_result in search_sim_results:
-                search_sim.write(f"{sim_result}\n")
+    if records:
+        write_report(records, report_path)
 
-    if not found_any and not search_sim_results:
+    if not found_any and not records:
         print('nop, no one is here')
 
-def find_and_modify_files(directory_path):
+def find_and_modify_files(directory_path, search_sim_text='some_similar_text', report_path=REPORT_PATH):
     """
     این تابع اصلی است که فایل‌ها را به .txt تغییر نام می‌دهد، ویژگی‌های href و src را تغییر می‌دهد،
     متون مشابه را جستجو می‌کند، و پس از آن نام فایل‌ها را به فرمت اصلی بازمی‌گرداند.
@@ -195,18 +398,431 @@ def find_and_modify_files(directory_path):
     txt_files, original_extensions = convert_to_txt(directory_path)
 
     # تغییر ویژگی‌های href و src در فایل‌های .txt و جستجوی متون مشابه
-    modify_href_src_in_files(txt_files, search_sim_text='some_similar_text')  # می‌توانید 'some_similar_text' را تغییر دهید
+    modify_href_src_in_files(txt_files, search_sim_text=search_sim_text, report_path=report_path)
 
     # بازگرداندن فایل‌ها به پسوند اصلی
     revert_to_original_format(original_extensions)
 
+# پسوند فایل‌هایی که در حالت افزایشی پردازش می‌شوند
+TEMPLATE_EXTENSIONS = ('.html', '.htm', '.txt')
+# فایل مانیفست: برای هر قالب mtime، اندازه و هش محتوا بعد از آخرین پردازش
+MANIFEST_PATH = '.changer_manifest.json'
+MANIFEST_VERSION = 2
+# پیشوند فایل‌های موقت نوشتن اتمی تا در پیمایش بعدی نادیده گرفته شوند
+TEMP_PREFIX = '.changer-'
+
+def is_template_file(filename):
+    return filename.endswith(TEMPLATE_EXTENSIONS) and not filename.startswith(TEMP_PREFIX)
+
+def iter_template_files(directory_path):
+    """مسیر فایل‌های قالب زیر directory_path را بدون تغییر نام برمی‌گرداند"""
+    for root, dirs, files in os.walk(directory_path):
+        dirs.sort()
+        for filename in sorted(files):
+            if is_template_file(filename):
+                yield os.path.join(root, filename)
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding='utf-8') as handle:
+            manifest = json.load(handle)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        print(f'مانیفست {manifest_path} خراب است؛ همه فایل‌ها دوباره پردازش می‌شوند.')
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+def atomic_write(path, data):
+    """
+    محتوا را در یک فایل موقت کنار فایل اصلی می‌نویسد و با os.replace جایگزین می‌کند؛
+    اگر برنامه وسط کار متوقف شود فایل اصلی یا نسخه قدیمی است یا نسخه کامل جدید.
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix='.tmp', dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+def save_manifest(manifest_path, files):
+    data = json.dumps({'version': MANIFEST_VERSION, 'files': files}, ensure_ascii=False, indent=1, sort_keys=True)
+    temp_path = f'{manifest_path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        handle.write(data)
+    os.replace(temp_path, manifest_path)
+
+def process_file(task):
+    """
+    یک فایل را در جا پردازش می‌کند (اجرا در پروسه‌های کارگر).
+    task = (مسیر فایل، مسیر نسبی، هش قبلی یا None، متن مشابه)
+    اگر هش محتوا با هش قبلی برابر باشد (فقط mtime عوض شده) فایل بازنویسی نمی‌شود.
+    """
+    path, relpath, previous_hash, search_sim_text = task
+    try:
+        with open(path, 'rb') as handle:
+            data = handle.read()
+        digest = hashlib.sha256(data).hexdigest()
+        records = []
+        status = 'unchanged'
+        if digest != previous_hash:
+            # surrogateescape تا بایت‌های غیر UTF-8 بدون تغییر بازنویسی شوند
+            text = data.decode('utf-8', 'surrogateescape')
+            new_text, records = rewrite_text(text, relpath, search_sim_text)
+            status = 'scanned'
+            if new_text != text:
+                data = new_text.encode('utf-8', 'surrogateescape')
+                digest = hashlib.sha256(data).hexdigest()
+                atomic_write(path, data)
+                status = 'modified'
+        stat = os.stat(path)
+    except OSError as e:
+        return relpath, 'error', [{'file': relpath, 'action': 'error', 'reason': str(e)}], None
+    entry = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}
+    return relpath, status, records, entry
+
+def find_and_modify_files_incremental(directory_path, jobs=None, manifest_path=MANIFEST_PATH, full=False,
+                                      search_sim_text='some_similar_text', report_path=REPORT_PATH, paths=None):
+    """
+    حالت افزایشی: فایل‌ها تغییر نام داده نمی‌شوند و فقط قالب‌هایی که از اجرای قبلی
+    (طبق مانیفست) تغییر کرده‌اند، به‌صورت موازی در یک process pool پردازش می‌شوند.
+    اگر paths داده شود فقط همین فایل‌ها بررسی می‌شوند و بقیه مانیفست دست نمی‌خورد.
+    خروجی: لیست مسیرهای نسبی فایل‌هایی که بازنویسی شدند.
+    """
+    previous = {} if full else load_manifest(manifest_path)
+    files = {} if paths is None else dict(previous)
+    tasks = []
+    for path in iter_template_files(directory_path) if paths is None else paths:
+        relpath = os.path.relpath(path, directory_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # فایل حذف شده است
+            files.pop(relpath, None)
+            continue
+        entry = previous.get(relpath)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            files[relpath] = entry
+            continue
+        tasks.append((path, relpath, entry and entry['sha256'], search_sim_text))
+
+    records = []
+    modified = []
+    if len(tasks) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(tasks) // ((jobs or os.cpu_count() or 1) * 4))
+            results = list(executor.map(process_file, tasks, chunksize=chunksize))
+    else:
+        results = [process_file(task) for task in tasks]
+
+    for relpath, status, file_records, entry in results:
+        records.extend(file_records)
+        if entry is None:
+            files.pop(relpath, None)
+            print(f'خطا در پردازش {relpath}: {file_records[0]["reason"]}')
+            continue
+        files[relpath] = entry
+        if status == 'modified':
+            modified.append(relpath)
+            print(f'تغییرات در {relpath} اعمال شد.')
+
+    save_manifest(manifest_path, files)
+
+    if records:
+        write_report(records, report_path)
+
+    if tasks or paths is None:
+        print(f'{len(tasks)} فایل از {len(files)} پردازش شد، {len(modified)} فایل تغییر کرد.')
+    return modified
+
+# ثابت‌های inotify از <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+inotify_event = struct.Struct('iIII')
+
+# در مجموعه تغییرات به معنی «همه فایل‌ها دوباره بررسی شوند» (مثلاً بعد از سرریز صف inotify)
+RESCAN = None
+
+class InotifyWatcher:
+    """
+    تغییرات قالب‌ها را با inotify (از طریق ctypes) دریافت می‌کند؛ در حالت بیکار
+    پروسه در select می‌خوابد و هیچ CPU مصرف نمی‌کند.
+    """
+
+    def __init__(self, directory_path):
+        path = ctypes.util.find_library('c')
+        self.libc = ctypes.CDLL(path, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError('inotify در این سیستم وجود ندارد')
+        self.directory_path = directory_path
+        self.fd = None
+        self._start()
+
+    def _start(self):
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 ناموفق بود')
+        self.watches = {}
+        for root, dirs, files in os.walk(self.directory_path):
+            self._add_watch(root)
+
+    def _add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), INOTIFY_MASK)
+        if wd >= 0:
+            self.watches[wd] = path
+
+    def wait(self, timeout):
+        """تا timeout ثانیه (None یعنی نامحدود) منتظر تغییر می‌ماند؛ خروجی مجموعه مسیرها"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        rebuild = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = inotify_event.unpack_from(data, offset)
+            offset += inotify_event.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                changed.add(RESCAN)
+                continue
+            directory = self.watches.get(wd)
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if directory is None:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # پوشه جدید؛ پوشه‌های داخلش هم باید دیده شوند و قالب‌هایش پردازش شوند
+                    for root, dirs, files in os.walk(path):
+                        self._add_watch(root)
+                    changed.update(iter_template_files(path))
+                elif mask & IN_MOVED_FROM:
+                    # مسیر watchهای پوشه جابه‌جاشده دیگر معتبر نیست
+                    rebuild = True
+            elif name and is_template_file(name):
+                changed.add(path)
+        if rebuild:
+            self.close()
+            self._start()
+            changed.add(RESCAN)
+        return changed
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+class PollingWatcher:
+    """جایگزین inotify: هر interval ثانیه mtime و اندازه قالب‌ها را مقایسه می‌کند"""
+
+    def __init__(self, directory_path, interval=1.0):
+        self.directory_path = directory_path
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for path in iter_template_files(self.directory_path):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if remaining > 0:
+                time.sleep(remaining)
+            snapshot = self._scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+def make_watcher(directory_path, interval=1.0, polling=False):
+    if not polling:
+        try:
+            return InotifyWatcher(directory_path)
+        except (OSError, AttributeError, TypeError):
+            pass
+    return PollingWatcher(directory_path, interval)
+
+def watch(directory_path, debounce=0.5, interval=1.0, polling=False, **options):
+    """
+    حالت --watch: بعد از یک پردازش افزایشی کامل، منتظر تغییر قالب‌ها می‌ماند و بعد از
+    debounce ثانیه سکوت (مثلاً چند ذخیره پشت سر هم) فقط فایل‌های تغییرکرده را پردازش می‌کند.
+    بازنویسی‌های خود برنامه دوباره پردازش نمی‌شوند چون mtime و اندازه‌شان در مانیفست ثبت شده است.
+    """
+    find_and_modify_files_incremental(directory_path, **options)
+    watcher = make_watcher(directory_path, interval, polling)
+    print(f'در حال پایش {directory_path} با {type(watcher).__name__} (برای توقف Ctrl+C)...')
+    try:
+        while True:
+            changed = watcher.wait(None)
+            # جمع کردن رویدادهای پشت سر هم تا debounce ثانیه سکوت
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+            if RESCAN in changed:
+                find_and_modify_files_incremental(directory_path, **options)
+            elif changed:
+                find_and_modify_files_incremental(directory_path, paths=sorted(changed), **options)
+    except KeyboardInterrupt:
+        print('پایش متوقف شد.')
+    finally:
+        watcher.close()
+
+# قطعه‌هایی که قالب‌های ساختگی بنچمارک از ترکیب آن‌ها ساخته می‌شوند
+CORPUS_SNIPPETS = (
+    '<link rel="stylesheet" href="css/style-{n}.css">\n',
+    '<script src="js/app-{n}.js"></script>\n',
+    '<img src="images/book-{n}.png" alt="{{{{ book.title }}}}" class="img-cover">\n',
+    # تگ چندخطی که نسخه خط‌به‌خط نمی‌بیند
+    '<img class="card"\n     src="images/card-{n}.png"\n     srcset="images/card-{n}.png 1x, images/card-{n}@2x.png 2x">\n',
+    # دو تگ در یک خط
+    '<link rel="icon" href="favicon-{n}.ico"><link rel="preload" href="fonts/f-{n}.woff2">\n',
+    '<a href="{{% url \'core:shop\' %}}">فروشگاه</a> <img src="{{% static \'images/logo.png\' %}}">\n',
+    '<script src="https://cdn.example.com/lib-{n}.js"></script>\n',
+    '<script>var html = \'<img src="inline-{n}.png">\';</script>\n',
+    '<!-- <img src="old-{n}.png"> -->\n',
+    '{{% if user.is_authenticated %}}<p class="user">{{{{ user.username }}}}</p>{{% endif %}}\n',
+    '<div class="card"><h3 class="card-title">کتاب {n}</h3><p>some_similar_text</p></div>\n',
+)
+# خطوط معمولی قالب که تگ مورد نظری ندارند؛ در قالب‌های واقعی پروژه بیشتر خطوط از این نوع‌اند
+CORPUS_MARKUP = (
+    '<div class="container">\n',
+    '  <section class="section shop" aria-label="shop {n}">\n',
+    '    <a href="{{% url \'core:book_detail\' {n} %}}" class="card-link">{{{{ book.title }}}}</a>\n',
+    '    <p class="card-text">لورم ایپسوم متن ساختگی با تولید سادگی نامفهوم از صنعت چاپ {n}</p>\n',
+    '  <ul class="nav-list"><li class="nav-item"><a href="#" class="nav-link">{n}</a></li></ul>\n',
+    '  <button class="btn btn-primary" data-book="{{{{ book.id }}}}">افزودن</button>\n',
+    '{{% for genre in genres %}}<span class="badge">{{{{ genre.name }}}}</span>{{% endfor %}}\n',
+    '</div>\n',
+)
+
+def generate_corpus(directory_path, count, lines_per_file=120, tag_ratio=0.1, seed=0):
+    """
+    count قالب ساختگی با ترکیب تصادفی (ولی تکرارپذیر) قطعه‌ها می‌سازد؛
+    tag_ratio سهم خطوطی است که از CORPUS_SNIPPETS (تگ‌های مورد نظر) انتخاب می‌شوند.
+    """
+    import random
+    rng = random.Random(seed)
+    for index in range(count):
+        folder = os.path.join(directory_path, f'app{index % 20}')
+        os.makedirs(folder, exist_ok=True)
+        body = ''.join(
+            rng.choice(CORPUS_SNIPPETS if rng.random() < tag_ratio else CORPUS_MARKUP).format(n=rng.randrange(1000))
+            for _ in range(lines_per_file)
+        )
+        with open(os.path.join(folder, f'page{index}.html'), 'w', encoding='utf-8') as handle:
+            handle.write('{% extends "parent/base.html" %}\n{% load static %}\n' + body)
+
+def run_benchmark(count):
+    """
+    نسخه قدیمی (rewrite_lines) و نسخه جدید (rewrite_text) را روی یک مجموعه ساختگی
+    از قالب‌ها مقایسه می‌کند. خواندن فایل‌ها بیرون از زمان‌گیری است تا فقط خود موتورها مقایسه شوند.
+    """
+    with tempfile.TemporaryDirectory(prefix='changer-bench-') as directory_path:
+        generate_corpus(directory_path, count)
+        texts = []
+        for path in iter_template_files(directory_path):
+            with open(path, encoding='utf-8', newline='') as handle:
+                texts.append((os.path.relpath(path, directory_path), handle.read()))
+    total_bytes = sum(len(text.encode('utf-8')) for _, text in texts)
+    print(f'{len(texts)} قالب، {total_bytes / 1024 / 1024:.1f} مگابایت')
+
+    started = time.perf_counter()
+    legacy_outputs = []
+    legacy_rewrites = 0
+    for relpath, text in texts:
+        lines = text.splitlines(keepends=True)
+        _, results, _ = rewrite_lines(lines, relpath)
+        legacy_rewrites += sum(' ---> Updated ' in result for result in results)
+        legacy_outputs.append(''.join(lines))
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    outputs = []
+    rewrites = 0
+    for relpath, text in texts:
+        new_text, records = rewrite_text(text, relpath)
+        rewrites += sum(record['action'] == 'rewritten' for record in records)
+        outputs.append(new_text)
+    new_time = time.perf_counter() - started
+
+    differing = sum(old != new for old, new in zip(legacy_outputs, outputs))
+    for name, elapsed, count_rewrites in (('regex خط‌به‌خط', legacy_time, legacy_rewrites), ('tokenizer', new_time, rewrites)):
+        print(f'{name:>16}: {elapsed:.3f} ثانیه، {len(texts) / elapsed:.0f} قالب در ثانیه، {count_rewrites} آدرس تبدیل شد')
+    print(f'سرعت نسبی: {legacy_time / new_time:.2f}x، خروجی {differing} قالب با نسخه قدیمی فرق دارد')
+
 # فراخوانی اصلی برنامه
 if __name__ == "__main__":
-    # تعریف مسیر دایرکتوری
-    directory_path = 'templates'  # به مسیر صحیح خود تغییر دهید
+    parser = argparse.ArgumentParser(description='تبدیل آدرس‌های فایل‌های استاتیک قالب‌ها به {% static %}')
+    parser.add_argument('directory', nargs='?', default='templates')  # به مسیر صحیح خود تغییر دهید
+    parser.add_argument('--incremental', action='store_true',
+                        help='پردازش در جا و موازی فقط فایل‌های تغییرکرده با کمک مانیفست')
+    parser.add_argument('--jobs', type=int, default=None, help='تعداد پروسه‌ها (پیش‌فرض: تعداد CPU)')
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--full', action='store_true', help='نادیده گرفتن مانیفست و پردازش همه فایل‌ها')
+    parser.add_argument('--search-sim-text', default='some_similar_text')
+    parser.add_argument('--report', default=REPORT_PATH, help='مسیر گزارش JSONL')
+    parser.add_argument('--watch', action='store_true',
+                        help='پایش دائمی پوشه و پردازش افزایشی فایل‌های تغییرکرده')
+    parser.add_argument('--debounce', type=float, default=0.5, help='ثانیه سکوت قبل از پردازش تغییرات')
+    parser.add_argument('--poll', action='store_true', help='استفاده از polling به‌جای inotify')
+    parser.add_argument('--interval', type=float, default=1.0, help='فاصله polling به ثانیه')
+    parser.add_argument('--benchmark', type=int, nargs='?', const=2000, metavar='COUNT',
+                        help='مقایسه موتور قدیمی و جدید روی COUNT قالب ساختگی (پیش‌فرض 2000)')
+    args = parser.parse_args()
+    directory_path = args.directory
 
     # بررسی وجود دایرکتوری 
-    if not os.path.isdir(directory_path): 
+    if args.benchmark:
+        run_benchmark(args.benchmark)
+    elif not os.path.isdir(directory_path): 
         print(f'دایرکتوری {directory_path} وجود ندارد.') 
+    elif args.watch:
+        watch(directory_path, debounce=args.debounce, interval=args.interval, polling=args.poll,
+              jobs=args.jobs, manifest_path=args.manifest, search_sim_text=args.search_sim_text,
+              report_path=args.report)
+    elif args.incremental:
+        find_and_modify_files_incremental(directory_path, jobs=args.jobs, manifest_path=args.manifest,
+                                          full=args.full, search_sim_text=args.search_sim_text,
+                                          report_path=args.report)
     else: 
-        find_and_modify_files(directory_path)
+        find_and_modify_files(directory_path, search_sim_text=args.search_sim_text, report_path=args.report)
@@ -0,0 +1,16 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+
+from core.query_budget import query_budget
+from .models import FavoriteBook
+
+
+# نسخه async ویوهای accounts برای مسیر ASGI (config.urls_asgi)
+@login_required
+@query_budget(5)
+async def favorites_view(request):
+    user = await request.auser()
+    favorites = FavoriteBook.objects.filter(user=user).select_related('book__author')
+    favorite_books = [favorite async for favorite in favorites.aiterator()]
+    return await sync_to_async(render)(request, 'accounts/favorites.html', {'favorite_books': favorite_books})
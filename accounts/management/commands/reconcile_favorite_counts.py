@@ -0,0 +1,51 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.counters import UPDATE_BATCH_SIZE, favorite_counts
+from accounts.models import FavoriteBook
+from core.cache import bump_catalog_version
+from products.models import Book, BookListing
+
+
+class Command(BaseCommand):
+    help = 'Book.favorite_count را دقیقاً از روی جدول علاقه‌مندی‌ها دوباره محاسبه می‌کند'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        # تغییرات مانده در بافر این پروسه اول اعمال می‌شوند
+        favorite_counts.flush()
+
+        counts = (FavoriteBook.objects.using(using).filter(book=OuterRef('pk'))
+                  .order_by().values('book').annotate(n=Count('pk')).values('n'))
+        wrong = (Book.objects.using(using)
+                 .annotate(actual=Coalesce(Subquery(counts), 0))
+                 .exclude(favorite_count=F('actual'))
+                 .values_list('pk', 'actual'))
+
+        groups = defaultdict(list)
+        for book_id, actual in wrong.iterator(chunk_size=2000):
+            groups[actual].append(book_id)
+
+        now = timezone.now()
+        fixed = 0
+        for actual, book_ids in groups.items():
+            for start in range(0, len(book_ids), UPDATE_BATCH_SIZE):
+                batch = book_ids[start:start + UPDATE_BATCH_SIZE]
+                with transaction.atomic(using=using):
+                    fixed += Book.objects.using(using).filter(pk__in=batch).update(
+                        favorite_count=actual, updated_at=now,
+                    )
+                    BookListing.objects.using(using).filter(book_id__in=batch).update(
+                        favorite_count=actual, updated_at=now,
+                    )
+        if fixed:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'شمارنده {fixed} کتاب اصلاح شد.'))
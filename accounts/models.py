@@ -11,10 +11,32 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} Profile"
 
+class FavoriteBookQuerySet(models.QuerySet):
+    def book_ids_for(self, user, books):
+        """شناسه کتاب‌های علاقه‌مندی کاربر از بین کتاب‌های داده‌شده (مثلاً یک صفحه) با یک کوئری"""
+        if not user.is_authenticated:
+            return set()
+        book_ids = [getattr(book, 'pk', book) for book in books]
+        if not book_ids:
+            return set()
+        return set(self.filter(user=user, book_id__in=book_ids).values_list('book_id', flat=True))
+
+    async def abook_ids_for(self, user, books):
+        if not user.is_authenticated:
+            return set()
+        book_ids = [getattr(book, 'pk', book) for book in books]
+        if not book_ids:
+            return set()
+        rows = self.filter(user=user, book_id__in=book_ids).values_list('book_id', flat=True)
+        return {book_id async for book_id in rows.aiterator()}
+
+
 class FavoriteBook(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = FavoriteBookQuerySet.as_manager()
     
     class Meta:
         unique_together = ('user', 'book')
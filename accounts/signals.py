@@ -0,0 +1,23 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.deletion import in_bulk_delete
+from .counters import favorite_counts
+from .models import FavoriteBook
+
+
+@receiver(post_save, sender=FavoriteBook)
+def count_favorite_added(sender, instance, created, raw, using, **kwargs):
+    if created and not raw:
+        transaction.on_commit(partial(favorite_counts.add, [instance.book_id], 1, using), using=using)
+
+
+@receiver(post_delete, sender=FavoriteBook)
+def count_favorite_removed(sender, instance, using, **kwargs):
+    # وقتی خود کتاب حذف می‌شود شمارنده‌ای برای به‌روزرسانی نمی‌ماند
+    if in_bulk_delete():
+        return
+    transaction.on_commit(partial(favorite_counts.add, [instance.book_id], -1, using), using=using)
@@ -1,3 +1,123 @@
+import json
+from datetime import date
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+
+from core.query_budget import assert_max_queries
+from products.models import Book
+from .models import FavoriteBook
+from .views import FAVORITES_BATCH_LIMIT
+
+
+# سشن و کاربر، savepoint تراکنش، کتاب‌های موجود، علاقه‌مندی‌های فعلی، یک درج و یک حذف گروهی؛
+# مستقل از تعداد عملیات
+FAVORITES_BATCH_QUERIES = 10
+
+
+def make_book(title='کتاب'):
+    return Book.objects.create(
+        title=title, description='', price=100000, pages=100,
+        publication_date=date(2020, 1, 1), quantity=1,
+    )
+
+
+class FavoritesBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='pw')
+        cls.books = [make_book(f'کتاب {i}') for i in range(60)]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _batch(self, operations):
+        return self.client.post(reverse('accounts:favorites_batch'), json.dumps({'operations': operations}),
+                                content_type='application/json')
+
+    def _favorite_ids(self):
+        return set(FavoriteBook.objects.filter(user=self.user).values_list('book_id', flat=True))
+
+    def test_adds_and_removes_in_one_request(self):
+        kept, dropped, new = self.books[:3]
+        FavoriteBook.objects.create(user=self.user, book=kept)
+        FavoriteBook.objects.create(user=self.user, book=dropped)
+
+        response = self._batch([
+            {'action': 'add', 'book_id': new.pk},
+            {'action': 'add', 'book_id': kept.pk},
+            {'action': 'remove', 'book_id': dropped.pk},
+        ])
+
+        self.assertEqual(response.json(), {'status': 'ok', 'added': [new.pk], 'removed': [dropped.pk], 'missing': []})
+        self.assertEqual(self._favorite_ids(), {kept.pk, new.pk})
+
+    def test_last_operation_for_a_book_wins(self):
+        book = self.books[0]
+
+        response = self._batch([{'action': 'add', 'book_id': book.pk}, {'action': 'remove', 'book_id': book.pk}])
+
+        self.assertEqual(response.json()['removed'], [])
+        self.assertEqual(self._favorite_ids(), set())
+
+        self._batch([{'action': 'remove', 'book_id': book.pk}, {'action': 'add', 'book_id': str(book.pk)}])
+        self.assertEqual(self._favorite_ids(), {book.pk})
+
+    def test_unknown_ids_are_reported_and_ignored(self):
+        book = self.books[0]
+        unknown = Book.objects.order_by('-pk').first().pk + 1000
+
+        response = self._batch([
+            {'action': 'add', 'book_id': book.pk},
+            {'action': 'add', 'book_id': unknown},
+            {'action': 'remove', 'book_id': unknown + 1},
+        ])
+
+        self.assertEqual(response.json(), {'status': 'ok', 'added': [book.pk], 'removed': [], 'missing': [unknown]})
+        self.assertEqual(self._favorite_ids(), {book.pk})
+
+    def test_malformed_requests_change_nothing(self):
+        bodies = [
+            'not json',
+            json.dumps({}),
+            json.dumps({'operations': None}),
+            json.dumps({'operations': [{'action': 'toggle', 'book_id': self.books[0].pk}]}),
+            json.dumps({'operations': [{'action': 'add'}]}),
+            json.dumps({'operations': [{'action': 'add', 'book_id': 'abc'}]}),
+            json.dumps({'operations': [{'action': 'add', 'book_id': self.books[0].pk}] * (FAVORITES_BATCH_LIMIT + 1)}),
+        ]
+        for body in bodies:
+            with self.subTest(body=body[:60]):
+                response = self.client.post(reverse('accounts:favorites_batch'), body, content_type='application/json')
+                self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(self._favorite_ids(), set())
+
+    def test_get_is_not_allowed(self):
+        self.assertEqual(self.client.get(reverse('accounts:favorites_batch')).status_code, 405)
+
+    def test_anonymous_user_is_redirected_to_login(self):
+        self.client.logout()
+
+        response = self._batch([{'action': 'add', 'book_id': self.books[0].pk}])
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(reverse('accounts:login')))
+        self.assertFalse(FavoriteBook.objects.exists())
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        to_add, to_remove = self.books[:30], self.books[30:]
+        for book in to_remove:
+            FavoriteBook.objects.create(user=self.user, book=book)
 
-# Create your tests here.
+        counts = []
+        # اول یک کتاب، بعد 29 کتاب دیگر از هر طرف
+        for start, end in ((0, 1), (1, 30)):
+            operations = ([{'action': 'add', 'book_id': book.pk} for book in to_add[start:end]]
+                          + [{'action': 'remove', 'book_id': book.pk} for book in to_remove[start:end]])
+            with self.subTest(size=end - start), assert_max_queries(FAVORITES_BATCH_QUERIES) as counter:
+                response = self._batch(operations)
+            self.assertEqual(len(response.json()['added']), end - start)
+            self.assertEqual(len(response.json()['removed']), end - start)
+            counts.append(counter.count)
+        self.assertEqual(counts[0], counts[1])
@@ -10,4 +10,5 @@ urlpatterns = [
     path('profile/', views.profile_view, name='profile'),
     path('favorites/', views.favorites_view, name='favorites'),
     path('toggle-favorite/', views.toggle_favorite, name='toggle_favorite'),
+    path('favorites/batch/', views.favorites_batch, name='favorites_batch'),
 ]
\ No newline at end of file
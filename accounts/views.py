@@ -3,10 +3,14 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
+from core.query_budget import query_budget
 from products.models import Book
+from .counters import favorite_counts
 from .models import UserProfile, FavoriteBook
+from functools import partial
 import json
 
 def login_view(request):
@@ -53,8 +57,9 @@ def profile_view(request):
     return render(request, 'accounts/profile.html', {'profile': profile})
 
 @login_required
+@query_budget(5)
 def favorites_view(request):
-    favorite_books = FavoriteBook.objects.filter(user=request.user).select_related('book')
+    favorite_books = FavoriteBook.objects.filter(user=request.user).select_related('book__author')
     return render(request, 'accounts/favorites.html', {'favorite_books': favorite_books})
 
 @login_required
@@ -78,4 +83,51 @@ def toggle_favorite(request):
     except Book.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'کتاب یافت نشد'})
     except Exception as e:
-        return JsonResponse({'status': 'error', 'message': 'خطا در پردازش درخواست'})
\ No newline at end of file
+        return JsonResponse({'status': 'error', 'message': 'خطا در پردازش درخواست'})
+
+
+# حداکثر تعداد عملیات در یک درخواست گروهی
+FAVORITES_BATCH_LIMIT = 500
+
+
+@login_required
+@require_POST
+def favorites_batch(request):
+    """
+    چند عملیات افزودن/حذف علاقه‌مندی را در یک تراکنش اعمال می‌کند:
+    {"operations": [{"action": "add", "book_id": 1}, {"action": "remove", "book_id": 2}]}
+    اگر برای یک کتاب چند عملیات آمده باشد، آخرین آن‌ها اعمال می‌شود.
+    """
+    try:
+        operations = json.loads(request.body)['operations']
+        if len(operations) > FAVORITES_BATCH_LIMIT:
+            return JsonResponse({'status': 'error', 'message': 'تعداد عملیات بیش از حد مجاز است'})
+        actions = {}
+        for operation in operations:
+            if operation['action'] not in ('add', 'remove'):
+                raise ValueError(operation['action'])
+            actions[int(operation['book_id'])] = operation['action']
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'status': 'error', 'message': 'درخواست نامعتبر است'})
+
+    add_ids = {book_id for book_id, action in actions.items() if action == 'add'}
+    remove_ids = {book_id for book_id, action in actions.items() if action == 'remove'}
+    favorites = FavoriteBook.objects.filter(user=request.user)
+    with transaction.atomic():
+        existing = set(Book.objects.filter(pk__in=add_ids).values_list('pk', flat=True))
+        added = existing - favorites.book_ids_for(request.user, existing)
+        FavoriteBook.objects.bulk_create(
+            [FavoriteBook(user=request.user, book_id=book_id) for book_id in added],
+            ignore_conflicts=True,
+        )
+        # bulk_create سیگنال post_save نمی‌فرستد؛ حذف‌ها از طریق سیگنال شمرده می‌شوند
+        transaction.on_commit(partial(favorite_counts.add, added, 1))
+        removed = favorites.book_ids_for(request.user, remove_ids)
+        favorites.filter(book_id__in=removed).delete()
+
+    return JsonResponse({
+        'status': 'ok',
+        'added': sorted(added),
+        'removed': sorted(removed),
+        'missing': sorted(add_ids - existing),
+    })
@@ -1,3 +1,27 @@
 from django.contrib import admin
+from .models import Cart, CartItem, Reservation, ReservationItem
 
-# Register your models here.
+
+class CartItemInline(admin.TabularInline):
+    model = CartItem
+    raw_id_fields = ('book',)
+    extra = 0
+
+
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at')
+    inlines = [CartItemInline]
+
+
+class ReservationItemInline(admin.TabularInline):
+    model = ReservationItem
+    raw_id_fields = ('book',)
+    extra = 0
+
+
+@admin.register(Reservation)
+class ReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'created_at', 'expires_at')
+    list_filter = ('status',)
+    inlines = [ReservationItemInline]
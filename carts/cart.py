@@ -0,0 +1,145 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Least
+
+from products.models import Book
+from .models import Cart, CartItem
+
+
+CART_SESSION_KEY = 'cart'
+CART_ID_SESSION_KEY = 'cart_id'
+
+# فیلدهایی که صفحه سبد خرید از کتاب لازم دارد
+CART_BOOK_FIELDS = ('id', 'title', 'price', 'quantity', 'image', 'image_variants', 'author__first_name', 'author__last_name')
+
+
+def clamp_quantity(quantity):
+    return max(0, min(int(quantity), settings.CART_MAX_QUANTITY))
+
+
+class SessionCart:
+    """سبد خرید کاربر مهمان به‌صورت {book_id: quantity} در session؛ افزودن کالا کوئری ندارد"""
+
+    def __init__(self, request):
+        self.session = request.session
+
+    def lines(self):
+        return {int(book_id): quantity for book_id, quantity in self.session.get(CART_SESSION_KEY, {}).items()}
+
+    def _save(self, lines):
+        self.session[CART_SESSION_KEY] = {str(book_id): quantity for book_id, quantity in lines.items()}
+
+    def add(self, book_id, quantity=1):
+        lines = self.lines()
+        lines[book_id] = clamp_quantity(lines.get(book_id, 0) + quantity)
+        self._save(lines)
+
+    def set(self, book_id, quantity):
+        lines = self.lines()
+        quantity = clamp_quantity(quantity)
+        if quantity:
+            lines[book_id] = quantity
+        else:
+            lines.pop(book_id, None)
+        self._save(lines)
+
+    def clear(self):
+        self.session.pop(CART_SESSION_KEY, None)
+
+
+class DatabaseCart:
+    """سبد خرید کاربر واردشده در Cart/CartItem؛ شناسه سبد در session نگه داشته می‌شود"""
+
+    def __init__(self, request):
+        self.session = request.session
+        self.user = request.user
+
+    @property
+    def cart_id(self):
+        cart_id = self.session.get(CART_ID_SESSION_KEY)
+        if cart_id is None:
+            cart_id = Cart.objects.get_or_create(user=self.user)[0].pk
+            self.session[CART_ID_SESSION_KEY] = cart_id
+        return cart_id
+
+    def lines(self):
+        return dict(CartItem.objects.filter(cart_id=self.cart_id).values_list('book_id', 'quantity'))
+
+    def add(self, book_id, quantity=1):
+        items = CartItem.objects.filter(cart_id=self.cart_id, book_id=book_id)
+        if not items.update(quantity=Least(F('quantity') + quantity, settings.CART_MAX_QUANTITY)):
+            self.set(book_id, quantity)
+
+    def set(self, book_id, quantity):
+        quantity = clamp_quantity(quantity)
+        if not quantity:
+            CartItem.objects.filter(cart_id=self.cart_id, book_id=book_id).delete()
+            return
+        # کتاب ناموجود با IntegrityError کلید خارجی رد می‌شود
+        with transaction.atomic():
+            CartItem.objects.bulk_create(
+                [CartItem(cart_id=self.cart_id, book_id=book_id, quantity=quantity)],
+                update_conflicts=True, unique_fields=['cart', 'book'], update_fields=['quantity'],
+            )
+
+    def clear(self):
+        CartItem.objects.filter(cart_id=self.cart_id).delete()
+
+
+def get_cart(request):
+    if request.user.is_authenticated:
+        return DatabaseCart(request)
+    return SessionCart(request)
+
+
+def cart_lines(cart):
+    """
+    ردیف‌های سبد همراه با کتاب، قیمت و موجودی فعلی. همه کتاب‌ها با یک in_bulk خوانده
+    می‌شوند، پس تعداد کوئری به تعداد ردیف‌های سبد بستگی ندارد.
+    """
+    quantities = cart.lines()
+    books = Book.objects.select_related('author').only(*CART_BOOK_FIELDS).in_bulk(list(quantities))
+    lines = []
+    for book_id, quantity in quantities.items():
+        book = books.get(book_id)
+        if book is None:
+            # کتاب حذف شده است
+            continue
+        lines.append({
+            'book': book,
+            'quantity': quantity,
+            'in_stock': quantity <= book.quantity,
+            'total': book.price * quantity,
+        })
+    return lines
+
+
+def cart_summary(lines):
+    return {
+        'item_count': sum(line['quantity'] for line in lines),
+        'subtotal': sum((line['total'] for line in lines), Decimal(0)),
+    }
+
+
+def merge_session_cart(request, user):
+    """بعد از ورود، ردیف‌های سبد مهمان به سبد ماندگار کاربر اضافه می‌شوند"""
+    lines = SessionCart(request).lines()
+    request.session.pop(CART_ID_SESSION_KEY, None)
+    if not lines:
+        return
+    with transaction.atomic():
+        cart = Cart.objects.get_or_create(user=user)[0]
+        valid_ids = set(Book.objects.filter(pk__in=list(lines)).values_list('pk', flat=True))
+        existing = {item.book_id: item for item in cart.items.filter(book_id__in=valid_ids)}
+        for book_id, item in existing.items():
+            item.quantity = clamp_quantity(item.quantity + lines[book_id])
+        CartItem.objects.bulk_update(existing.values(), ['quantity'])
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, book_id=book_id, quantity=lines[book_id])
+            for book_id in valid_ids - set(existing)
+        )
+    request.session[CART_ID_SESSION_KEY] = cart.pk
+    SessionCart(request).clear()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from carts.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = 'رزروهای منقضی‌شده را آزاد و موجودی آن‌ها را به انبار برمی‌گرداند (برای اجرا با cron)'
+
+    def handle(self, *args, **options):
+        released = release_expired()
+        self.stdout.write(self.style.SUCCESS(f'{released} رزرو آزاد شد.'))
@@ -1,3 +1,60 @@
+from django.contrib.auth.models import User
 from django.db import models
+from products.models import Book
 
-# Create your models here.
+
+class Cart(models.Model):
+    """سبد خرید ماندگار کاربر واردشده؛ سبد کاربر مهمان فقط در session است"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} Cart"
+
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'book'], name='unique_cart_book'),
+        ]
+
+    def __str__(self):
+        return f"{self.cart.user.username} - {self.book_id} x {self.quantity}"
+
+
+class Reservation(models.Model):
+    """موجودی رزروشده برای یک سفارش؛ اگر تا expires_at تکمیل نشود به انبار برمی‌گردد"""
+    ACTIVE = 'active'
+    COMPLETED = 'completed'
+    RELEASED = 'released'
+    STATUS_CHOICES = [
+        (ACTIVE, 'فعال'),
+        (COMPLETED, 'تکمیل‌شده'),
+        (RELEASED, 'آزادشده'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reservations')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=ACTIVE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_status_expiry'),
+        ]
+
+    def __str__(self):
+        return f"Reservation {self.pk} ({self.status})"
+
+
+class ReservationItem(models.Model):
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='items')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.reservation_id} - {self.book_id} x {self.quantity}"
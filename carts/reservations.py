@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products.models import Book, BookListing
+from .models import Reservation, ReservationItem
+
+
+class OutOfStock(Exception):
+    def __init__(self, book_ids):
+        super().__init__(book_ids)
+        self.book_ids = book_ids
+
+
+class ReservationExpired(Exception):
+    pass
+
+
+def reserve(lines, user=None, ttl=None):
+    """
+    موجودی همه ردیف‌های {book_id: quantity} را در یک تراکنش کم می‌کند. هر ردیف با
+    UPDATE ... SET quantity = quantity - n WHERE quantity >= n کم می‌شود، پس دو خرید
+    هم‌زمان هیچ‌وقت بیش از موجودی نمی‌فروشند. اگر حتی یک ردیف کافی نباشد کل تراکنش
+    برمی‌گردد و OutOfStock با شناسه کتاب‌های ناموجود بالا می‌رود.
+    صفحات و کارت‌های کش‌شده موجودی نشان نمی‌دهند، پس updated_at و نسخه کاتالوگ دست
+    نمی‌خورند؛ وگرنه هر فروش کل کش مهمان و کارت‌ها را دور می‌ریخت.
+    """
+    lines = {book_id: quantity for book_id, quantity in lines.items() if quantity > 0}
+    if not lines:
+        raise ValueError('empty reservation')
+    ttl = ttl or timedelta(minutes=settings.RESERVATION_TTL_MINUTES)
+
+    with transaction.atomic():
+        short = []
+        # ترتیب ثابت تا دو تراکنش هم‌زمان ردیف‌ها را برعکس هم قفل نکنند
+        for book_id in sorted(lines):
+            quantity = lines[book_id]
+            if not Book.objects.filter(pk=book_id, quantity__gte=quantity).update(quantity=F('quantity') - quantity):
+                short.append(book_id)
+                continue
+            BookListing.objects.filter(book_id=book_id).update(quantity=F('quantity') - quantity)
+        if short:
+            # خطا داخل atomic کم‌شدن ردیف‌های قبلی را هم برمی‌گرداند
+            raise OutOfStock(short)
+
+        reservation = Reservation.objects.create(user=user, expires_at=timezone.now() + ttl)
+        ReservationItem.objects.bulk_create(
+            ReservationItem(reservation=reservation, book_id=book_id, quantity=quantity)
+            for book_id, quantity in lines.items()
+        )
+    return reservation
+
+
+def _restock(reservation_id):
+    items = ReservationItem.objects.filter(reservation_id=reservation_id).values_list('book_id', 'quantity')
+    for book_id, quantity in sorted(items):
+        Book.objects.filter(pk=book_id).update(quantity=F('quantity') + quantity)
+        BookListing.objects.filter(book_id=book_id).update(quantity=F('quantity') + quantity)
+
+
+def release(reservation_id):
+    """رزرو فعال را لغو و موجودی را برمی‌گرداند؛ برای رزروی که قبلاً بسته شده کاری نمی‌کند"""
+    with transaction.atomic():
+        # تغییر وضعیت شرطی است تا آزادسازی و تکمیل هم‌زمان موجودی را دو بار برنگردانند
+        if not Reservation.objects.filter(pk=reservation_id, status=Reservation.ACTIVE).update(status=Reservation.RELEASED):
+            return False
+        _restock(reservation_id)
+    return True
+
+
+def complete(reservation_id):
+    """رزرو را نهایی می‌کند؛ رزرو منقضی یا آزادشده قابل تکمیل نیست"""
+    completed = Reservation.objects.filter(
+        pk=reservation_id, status=Reservation.ACTIVE, expires_at__gt=timezone.now(),
+    ).update(status=Reservation.COMPLETED)
+    if not completed:
+        raise ReservationExpired(reservation_id)
+
+
+def release_expired(now=None):
+    """همه رزروهای منقضی را آزاد می‌کند و تعداد آن‌ها را برمی‌گرداند"""
+    now = now or timezone.now()
+    expired = Reservation.objects.filter(status=Reservation.ACTIVE, expires_at__lte=now)
+    return sum(release(reservation_id) for reservation_id in list(expired.values_list('pk', flat=True)))
@@ -1,3 +1,153 @@
-from django.test import TestCase
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core.cache import catalog_version
+from products.models import Book, BookListing
+from .models import CartItem, Reservation, ReservationItem
+from .reservations import OutOfStock, ReservationExpired, complete, release, release_expired, reserve
+
+
+def make_book(quantity, title='کتاب'):
+    return Book.objects.create(
+        title=title, description='', price=100000, pages=100,
+        publication_date=date(2020, 1, 1), quantity=quantity,
+    )
+
+
+class ReservationTests(TestCase):
+    def test_multi_line_reservation_is_all_or_nothing(self):
+        available = make_book(quantity=5)
+        sold_out = make_book(quantity=1)
+
+        with self.assertRaises(OutOfStock) as raised:
+            reserve({available.pk: 2, sold_out.pk: 2})
+
+        self.assertEqual(raised.exception.book_ids, [sold_out.pk])
+        available.refresh_from_db()
+        self.assertEqual(available.quantity, 5)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_expired_reservation_returns_stock_once(self):
+        book = make_book(quantity=3)
+        reservation = reserve({book.pk: 2}, ttl=timedelta(minutes=-1))
+
+        self.assertEqual(release_expired(), 1)
+        self.assertEqual(release_expired(), 0)
+        self.assertFalse(release(reservation.pk))
+        book.refresh_from_db()
+        self.assertEqual(book.quantity, 3)
+        with self.assertRaises(ReservationExpired):
+            complete(reservation.pk)
+
+    def test_completed_reservation_keeps_stock(self):
+        book = make_book(quantity=3)
+        reservation = reserve({book.pk: 2})
+        complete(reservation.pk)
+
+        self.assertFalse(release(reservation.pk))
+        book.refresh_from_db()
+        self.assertEqual(book.quantity, 1)
+
+    def test_stock_changes_keep_cached_cards_and_pages(self):
+        book = make_book(quantity=3)
+        touched = book.updated_at
+
+        for change in (lambda: reserve({book.pk: 2}), lambda: release(Reservation.objects.get().pk)):
+            version = catalog_version()
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            book.refresh_from_db()
+            self.assertEqual(book.updated_at, touched)
+            self.assertEqual(BookListing.objects.get(book=book).updated_at, touched)
+            self.assertEqual(catalog_version(), version)
+        self.assertEqual(book.quantity, 3)
+
+
+class CartAddCsrfTests(TestCase):
+    def setUp(self):
+        self.book = make_book(quantity=5)
+        self.client = Client(enforce_csrf_checks=True)
+        self.user = User.objects.create_user('reader', password='pw')
+        self.client.force_login(self.user)
+
+    def _add(self, **headers):
+        return self.client.post(reverse('carts:cart_add'), {'book_id': self.book.pk},
+                                content_type='application/json', **headers)
+
+    def test_cross_site_post_is_rejected(self):
+        response = self.client.post(reverse('carts:cart_add'), f'{{"book_id": {self.book.pk}}}',
+                                    content_type='text/plain')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_token_from_csrf_cookie_is_accepted(self):
+        self.assertEqual(self.client.get(reverse('carts:csrf_cookie')).status_code, 204)
+        token = self.client.cookies['csrftoken'].value
+
+        response = self._add(HTTP_X_CSRFTOKEN=token)
+
+        self.assertEqual(response.json()['status'], 'added')
+        self.assertEqual(CartItem.objects.get(book=self.book).quantity, 1)
+
+
+class CartUpdateTests(TransactionTestCase):
+    # کلید خارجی در SQLite تا commit بررسی نمی‌شود؛ داخل تراکنش TestCase خطا پیش نمی‌آید
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='pw')
+        self.client.force_login(self.user)
+
+    def test_deleted_book_shows_message_instead_of_error(self):
+        book = make_book(quantity=5)
+        book_id = book.pk
+        book.delete()
+
+        response = self.client.post(reverse('carts:cart_update'), {'book_id': book_id, 'quantity': 2}, follow=True)
+
+        self.assertRedirects(response, reverse('carts:cart'))
+        self.assertEqual([str(message) for message in response.context['messages']], ['کتاب یافت نشد'])
+        self.assertFalse(CartItem.objects.exists())
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+    STOCK = 50
+    WORKERS = 16
+    ATTEMPTS = 200
+
+    def setUp(self):
+        if connection.vendor == 'sqlite':
+            if connection.settings_dict['NAME'] == ':memory:' or 'mode=memory' in str(connection.settings_dict['NAME']):
+                self.skipTest('needs a file-based SQLite test database')
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+        self.book = make_book(quantity=self.STOCK)
+
+    def _checkout(self, _):
+        try:
+            reserve({self.book.pk: 1})
+            return True
+        except OutOfStock:
+            return False
+        finally:
+            connection.close()
+
+    def test_parallel_checkouts_never_oversell(self):
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as executor:
+            results = list(executor.map(self._checkout, range(self.ATTEMPTS)))
+        elapsed = time.monotonic() - started
+
+        self.book.refresh_from_db()
+        reserved = ReservationItem.objects.filter(book=self.book).aggregate(total=Sum('quantity'))['total']
+        self.assertEqual(results.count(True), self.STOCK)
+        self.assertEqual(self.book.quantity, 0)
+        self.assertEqual(reserved, self.STOCK)
+        # 200 تلاش روی یک ردیف داغ باید در چند ثانیه تمام شود، نه در حد timeout قفل SQLite
+        self.assertLess(elapsed, 10, f'{self.ATTEMPTS / elapsed:.0f} checkouts/sec')
@@ -0,0 +1,15 @@
+from django.urls import path
+from . import views
+
+app_name = 'carts'
+
+urlpatterns = [
+    path('', views.cart_view, name='cart'),
+    path('add/', views.cart_add, name='cart_add'),
+    path('csrf/', views.csrf_cookie, name='csrf_cookie'),
+    path('update/', views.cart_update, name='cart_update'),
+    path('checkout/', views.checkout, name='checkout'),
+    path('reservations/<int:reservation_id>/', views.reservation_view, name='reservation'),
+    path('reservations/<int:reservation_id>/confirm/', views.reservation_confirm, name='reservation_confirm'),
+    path('reservations/<int:reservation_id>/cancel/', views.reservation_cancel, name='reservation_cancel'),
+]
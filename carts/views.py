@@ -1,3 +1,115 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_GET, require_POST
+from core.query_budget import query_budget
+from products.models import Book
+from .cart import cart_lines, cart_summary, get_cart
+from .models import Reservation
+from .reservations import OutOfStock, ReservationExpired, complete, release, reserve
+import json
 
-# Create your views here.
+
+@query_budget(5)
+def cart_view(request):
+    lines = cart_lines(get_cart(request))
+    context = {
+        'lines': lines,
+        'cart_max_quantity': settings.CART_MAX_QUANTITY,
+        **cart_summary(lines),
+    }
+    return render(request, 'core/cart.html', context)
+
+
+# صفحه‌های فروشگاه برای مهمان‌ها از کش مشترک و بدون توکن CSRF سرو می‌شوند و نمی‌توانند
+# کوکی بگذارند؛ اسکریپت صفحه اگر کوکی csrftoken نداشت آن را از این آدرس می‌گیرد
+@ensure_csrf_cookie
+@require_GET
+def csrf_cookie(request):
+    return HttpResponse(status=204)
+
+
+@require_POST
+def cart_add(request):
+    try:
+        data = json.loads(request.body)
+        book_id = int(data.get('book_id'))
+        quantity = int(data.get('quantity', 1))
+        if book_id <= 0 or quantity <= 0:
+            raise ValueError(book_id)
+    except (ValueError, TypeError):
+        return JsonResponse({'status': 'error', 'message': 'درخواست نامعتبر است'})
+
+    try:
+        get_cart(request).add(book_id, quantity)
+    except IntegrityError:
+        return JsonResponse({'status': 'error', 'message': 'کتاب یافت نشد'})
+    return JsonResponse({'status': 'added', 'message': 'کتاب به سبد خرید اضافه شد'})
+
+
+@require_POST
+def cart_update(request):
+    """تغییر تعداد یک ردیف از صفحه سبد خرید؛ تعداد صفر ردیف را حذف می‌کند"""
+    try:
+        book_id = int(request.POST.get('book_id'))
+        quantity = int(request.POST.get('quantity', 0))
+    except (ValueError, TypeError):
+        messages.error(request, 'درخواست نامعتبر است')
+        return redirect('carts:cart')
+    try:
+        get_cart(request).set(book_id, quantity)
+    except IntegrityError:
+        # کتاب در این فاصله حذف شده؛ مثل cart_add
+        messages.error(request, 'کتاب یافت نشد')
+    return redirect('carts:cart')
+
+
+@login_required
+@require_POST
+def checkout(request):
+    """موجودی همه ردیف‌های سبد را یکجا رزرو می‌کند"""
+    cart = get_cart(request)
+    lines = cart.lines()
+    if not lines:
+        return redirect('carts:cart')
+    try:
+        reservation = reserve(lines, user=request.user)
+    except OutOfStock as e:
+        titles = Book.objects.filter(pk__in=e.book_ids).values_list('title', flat=True)
+        messages.error(request, 'موجودی این کتاب‌ها کافی نیست: ' + '، '.join(titles))
+        return redirect('carts:cart')
+    cart.clear()
+    return redirect('carts:reservation', reservation_id=reservation.pk)
+
+
+@login_required
+def reservation_view(request, reservation_id):
+    reservation = get_object_or_404(Reservation, pk=reservation_id, user=request.user)
+    items = reservation.items.select_related('book')
+    return render(request, 'core/reservation.html', {'reservation': reservation, 'items': items})
+
+
+@login_required
+@require_POST
+def reservation_confirm(request, reservation_id):
+    reservation = get_object_or_404(Reservation, pk=reservation_id, user=request.user)
+    try:
+        complete(reservation.pk)
+    except ReservationExpired:
+        messages.error(request, 'مهلت این رزرو تمام شده است؛ لطفاً دوباره سفارش دهید.')
+    else:
+        messages.success(request, 'سفارش شما ثبت شد.')
+    return redirect('carts:reservation', reservation_id=reservation.pk)
+
+
+@login_required
+@require_POST
+def reservation_cancel(request, reservation_id):
+    reservation = get_object_or_404(Reservation, pk=reservation_id, user=request.user)
+    if release(reservation.pk):
+        messages.success(request, 'رزرو لغو شد.')
+    return redirect('carts:cart')
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -51,10 +52,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.asgi_urlconf_middleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
 
+# زیر ASGI صفحات کاتالوگ و علاقه‌مندی‌ها نسخه async ویوها را اجرا می‌کنند (core.middleware)
+ASGI_URLCONF = 'config.urls_asgi'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -76,13 +81,108 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# روی هر اتصال تازه اجرا می‌شود و فقط همان اتصال را تنظیم می‌کند. حالت WAL (که خواننده‌ها و
+# نویسنده را از هم جدا می‌کند و با آن synchronous=NORMAL امن است) در خود فایل ذخیره می‌شود و
+# یک بار با migration core.0001_sqlite_wal روشن می‌شود؛ busy_timeout به‌جای خطای فوری
+# database is locked صبر می‌کند
+SQLITE_INIT_COMMAND = ';'.join([
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-20000',
+])
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # اتصال‌ها بین درخواست‌ها نگه داشته می‌شوند تا pragmaها و کش صفحات SQLite هدر نروند
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+            # تراکنش از اول قفل نوشتن را می‌گیرد؛ ارتقای قفل خواندن به نوشتن وسط تراکنش
+            # در WAL بدون صبر کردن به busy_timeout خطای locked می‌دهد
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # دیتابیس تست روی دیسک (تست‌های هم‌زمانی با چند thread و WAL) ولی بیرون از پروژه
+        'TEST': {'NAME': Path(tempfile.gettempdir()) / 'library_web_test.sqlite3'},
+    },
+    # کپی فقط‌خواندنی برای صفحات فروشگاه؛ با دستور sync_replica از default به‌روز می‌شود
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND + ';PRAGMA query_only=1',
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['core.replica.CatalogReplicaRouter']
+
+# تست‌ها کش جدا در حافظه دارند و پوشه cache/ پروژه را نمی‌نویسند
+TEST_RUNNER = 'core.test_runner.LocMemCacheTestRunner'
+
+
+# Cache
+# کش فایلی بین همه پروسه‌های سرور مشترک است تا باطل شدن کش صفحات فروشگاه به همه برسد.
+# FileBasedCache بعد از MAX_ENTRIES با هر set پوشه را می‌شمارد و بخشی تصادفی را پاک می‌کند؛
+# برای همین نسخه‌های کاتالوگ/replica (default) از صفحات کامل (pages) جدا هستند تا پر شدن
+# صفحات آن‌ها را پاک نکند. کارت کتاب‌ها کلیدشان updated_at را دارد و به باطل کردن بین
+# پروسه‌ها نیاز ندارند، پس در حافظه هر پروسه (cards) می‌مانند.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'pages',
+        # حدود 70KB برای هر صفحه؛ با پر شدن یک‌چهارم قدیمی‌ها پاک می‌شود
+        'OPTIONS': {'MAX_ENTRIES': 5000, 'CULL_FREQUENCY': 4},
+    },
+    'cards': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'book-cards',
+        # 24 کارت در هر صفحه؛ حدود 2KB برای هر کارت
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
 }
 
+# aliasهای CACHES برای صفحات کامل فروشگاه و کارت کتاب‌ها
+CATALOG_PAGE_CACHE = 'pages'
+
+BOOK_CARD_CACHE = 'cards'
+
+CATALOG_PAGE_CACHE_TIMEOUT = 300
+
+BOOK_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# تعداد کتاب‌هایی که حذف گروهی در هر تراکنش پاک می‌کند
+BOOK_DELETE_CHUNK_SIZE = 500
+
+# بازه قیمتی که کمتر از این تعداد کتاب دارد با ایندکس قیمت خوانده و مرتب می‌شود؛ بازه پهن‌تر
+# با ایندکس فیلد مرتب‌سازی (core.filters.filter_price). روی 100 هزار کتاب دو روش حدود 1500 کتاب برابرند
+PRICE_INDEX_MAX_ROWS = 2000
+
+# فاصله (ثانیه) اعمال تغییرات favorite_count از بافر حافظه؛ صفر یعنی اعمال فوری
+FAVORITE_COUNT_FLUSH_INTERVAL = 5
+
+# هر چند ثانیه ایندکس پیشنهادهای جستجو در پس‌زمینه از نو ساخته شود تا تغییرات پروسه‌های دیگر
+# (و favorite_count) را ببیند؛ تغییرات همین پروسه با سیگنال فوراً اعمال می‌شوند. صفر یعنی هرگز
+SUGGESTION_INDEX_MAX_AGE = 600
+
+# حداکثر تعداد یک کتاب در سبد خرید
+CART_MAX_QUANTITY = 10
+
+# مدت نگه داشتن موجودی رزروشده تا تکمیل سفارش (دقیقه)
+RESERVATION_TTL_MINUTES = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -123,6 +223,15 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
+# کش هش تصاویر بهینه‌شده optimize_static_images؛ فایل نقطه‌دار را collectstatic کپی نمی‌کند
+STATIC_IMAGE_CACHE = BASE_DIR / 'static' / 'images' / '.optimized.json'
+
+# collectstatic نام‌های هش‌شده و نسخه‌های .gz می‌سازد؛ core.static.serve آن‌ها را با کش بلندمدت می‌فرستد
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.static.CompressedManifestStaticFilesStorage'},
+}
+
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -0,0 +1,37 @@
+"""
+URLهای مسیر ASGI: همان config.urls که ویوهای دارای نسخه async با آن نسخه جایگزین شده‌اند.
+نام و namespace مسیرها تغییر نمی‌کند، پس reverse و قالب‌ها در هر دو مسیر یکسان‌اند.
+"""
+from django.urls import URLResolver, include, path
+
+from accounts import async_views as accounts_async_views
+from core import async_views as core_async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+
+# {app_name: {نام مسیر: ویو async}}
+ASYNC_VIEWS = {
+    'core': {
+        'index': core_async_views.index,
+        'shop': core_async_views.shop,
+    },
+    'accounts': {
+        'favorites': accounts_async_views.favorites_view,
+    },
+}
+
+
+def _with_async_views(resolver, views):
+    patterns = [
+        path(str(pattern.pattern), views[pattern.name], name=pattern.name) if pattern.name in views else pattern
+        for pattern in resolver.url_patterns
+    ]
+    return path(str(resolver.pattern), include((patterns, resolver.app_name), namespace=resolver.namespace))
+
+
+urlpatterns = [
+    _with_async_views(pattern, ASYNC_VIEWS[pattern.app_name])
+    if isinstance(pattern, URLResolver) and pattern.app_name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
@@ -0,0 +1,66 @@
+"""
+نسخه async صفحات کاتالوگ برای اجرا زیر ASGI (config.urls_asgi). منطق فیلتر و queryset
+با views مشترک است؛ فقط اجرای کوئری‌ها با ORM async است و کوئری‌های مستقل با
+asyncio.gather هم‌زمان فرستاده می‌شوند.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+from accounts.models import FavoriteBook
+from products.models import BookListing, Genre
+from .cache import catalog_page_cache
+from .pagination import KeysetPaginator
+from .query_budget import query_budget
+from .replica import catalog_reads
+from .views import BOOK_CARD_FIELDS, BOOKS_PER_PAGE, shop_books, shop_filters
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset.aiterator()]
+
+
+# نام ویوها با views یکی است تا صفحه کش‌شده بین مسیر WSGI و ASGI مشترک باشد
+@catalog_page_cache
+@catalog_reads
+@query_budget(4)
+async def index(request):
+    books = BookListing.objects.only(*BOOK_CARD_FIELDS)
+    books, user = await asyncio.gather(
+        KeysetPaginator(books, 'title', BOOKS_PER_PAGE).apage(request.GET.get('cursor')),
+        request.auser(),
+    )
+    favorite_ids = await FavoriteBook.objects.abook_ids_for(user, books)
+    return await sync_to_async(render)(request, 'core/index.html', {'books': books, 'favorite_ids': sorted(favorite_ids)})
+
+
+@catalog_page_cache
+@catalog_reads
+@query_budget(10)
+async def shop(request):
+    filters = shop_filters(request.GET)
+    genres, user = await asyncio.gather(_alist(Genre.objects.all()), request.auser())
+    # filter_price پهنای بازه قیمت را با یک کوئری همگام می‌سنجد
+    books, catalog_facets = await sync_to_async(shop_books)(filters, genres)
+
+    paginator = KeysetPaginator(books, filters['sort_by'], BOOKS_PER_PAGE)
+    books, genre_counts, price_buckets = await asyncio.gather(
+        paginator.apage(request.GET.get('cursor')),
+        sync_to_async(catalog_facets.genres)(),
+        sync_to_async(catalog_facets.price_buckets)(),
+    )
+    favorite_ids = await FavoriteBook.objects.abook_ids_for(user, books)
+
+    for genre in genres:
+        genre.facet_count = genre_counts.get(genre.id, 0)
+
+    context = {
+        'books': books,
+        'favorite_ids': sorted(favorite_ids),
+        'genres': genres,
+        'price_buckets': price_buckets,
+        **filters,
+        'sort_by': paginator.sort_by,
+    }
+    return await sync_to_async(render)(request, 'core/shop.html', context)
@@ -0,0 +1,97 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache, caches
+from django.http import HttpResponse
+from django.utils.http import urlencode
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# فقط این پارامترها روی خروجی صفحات فروشگاه اثر دارند؛ بقیه (مثل utm) در کلید کش نمی‌آیند
+CATALOG_QUERY_PARAMS = ('search', 'min_price', 'max_price', 'genre', 'sort', 'cursor')
+
+
+def _new_version():
+    # مقدار اولیه بر اساس زمان است تا بعد از پاک شدن کش با نسخه‌های قبلی یکی نشود
+    return time.time_ns() // 1000
+
+
+def catalog_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, _new_version, timeout=None)
+
+
+def bump_catalog_version():
+    """همه صفحات کش‌شده فروشگاه را با بالا بردن نسخه کاتالوگ باطل می‌کند"""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, _new_version(), timeout=None)
+
+
+def catalog_page_key(request, view_name, version=None):
+    params = sorted(
+        (name, request.GET[name]) for name in CATALOG_QUERY_PARAMS if request.GET.get(name)
+    )
+    digest = hashlib.md5(urlencode(params).encode()).hexdigest()
+    return f'catalog:page:{view_name}:{version or catalog_version()}:{digest}'
+
+
+def _bypasses_page_cache(request, user):
+    return request.method not in ('GET', 'HEAD') or user.is_authenticated or len(messages.get_messages(request))
+
+
+def _is_shareable(request, response):
+    # صفحه‌ای که کوکی یا توکن CSRF مخصوص همین کاربر دارد نباید بین کاربران به اشتراک گذاشته شود
+    return (response.status_code == 200 and not response.streaming and not response.cookies
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+
+
+def catalog_page_cache(view):
+    """
+    کش کامل صفحه برای کاربران مهمان. برای کاربران واردشده، درخواست‌های غیر GET و
+    صفحاتی که پیام (messages) در صف دارند کش دور زده می‌شود.
+    نسخه sync و async یک ویو (هم‌نام) کلید کش مشترک دارند.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            # پیام‌ها از سشن خوانده می‌شوند که API همگام دارد
+            if await sync_to_async(_bypasses_page_cache)(request, user):
+                return await view(request, *args, **kwargs)
+
+            key = await sync_to_async(catalog_page_key)(request, view.__name__)
+            cached = await caches[settings.CATALOG_PAGE_CACHE].aget(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = await view(request, *args, **kwargs)
+            if _is_shareable(request, response):
+                await caches[settings.CATALOG_PAGE_CACHE].aset(key, (response.content, response['Content-Type']), settings.CATALOG_PAGE_CACHE_TIMEOUT)
+            return response
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if _bypasses_page_cache(request, request.user):
+            return view(request, *args, **kwargs)
+
+        key = catalog_page_key(request, view.__name__)
+        cached = caches[settings.CATALOG_PAGE_CACHE].get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view(request, *args, **kwargs)
+        if _is_shareable(request, response):
+            caches[settings.CATALOG_PAGE_CACHE].set(key, (response.content, response['Content-Type']), settings.CATALOG_PAGE_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
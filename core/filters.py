@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.db.models.functions import Cast
+
+from products.listing import filter_by_genres
+from products.models import BookListing, Genre
+from products.search import search_books
+
+
+def _price_range_is_narrow(books, bounds):
+    """شمارش محدود روی ایندکس (price, id)؛ حداکثر PRICE_INDEX_MAX_ROWS ردیف ایندکس خوانده می‌شود"""
+    limit = settings.PRICE_INDEX_MAX_ROWS
+    rows = books.model._default_manager.using(books.db).filter(
+        **{f'price__{lookup}': value for lookup, value in bounds.items()}
+    ).values('pk')[:limit]
+    return rows.count() < limit
+
+
+def filter_price(books, min_price, max_price, sort_field):
+    """
+    فیلتر بازه قیمت. SQLite بدون آمار برای هر بازه‌ای ایندکس (price, id) را انتخاب می‌کند، کل
+    بازه را می‌خواند و دوباره مرتب می‌کند. وقتی مرتب‌سازی روی قیمت نیست و بازه پهن است، ستون
+    داخل CAST می‌آید تا ایندکس فیلد مرتب‌سازی به ترتیب پیمایش شود و با رسیدن به یک صفحه
+    متوقف شود؛ بازه باریک با همان ایندکس قیمت ارزان‌تر است.
+    """
+    bounds = {}
+    if min_price:
+        bounds['gte'] = min_price
+    if max_price:
+        bounds['lte'] = max_price
+    if not bounds:
+        return books
+    price = 'price'
+    if sort_field != 'price' and not _price_range_is_narrow(books, bounds):
+        books = books.alias(price_unindexed=Cast('price', books.model._meta.get_field('price')))
+        price = 'price_unindexed'
+    return books.filter(**{f'{price}__{lookup}': value for lookup, value in bounds.items()})
+
+
+def filter_genre(books, genre_name, genre_ids=None):
+    """روی BookListing از ستون genres و بدون join؛ روی Book با join جدول ژانرها"""
+    if books.model is BookListing:
+        if genre_ids is None:
+            genre_ids = Genre.objects.using(books.db).filter(name=genre_name).values_list('pk', flat=True)
+        return filter_by_genres(books, genre_ids)
+    return books.filter(genre__name=genre_name)
+
+
+def filter_managed_books(books, params):
+    """
+    جستجو، فیلتر قیمت و ژانر و مرتب‌سازی صفحه مدیریت کتاب‌ها.
+    بین صفحه مدیریت و خروجی گرفتن مشترک است تا خروجی دقیقاً همان لیست صفحه باشد.
+    """
+    search_query = params.get('search', '')
+    if search_query:
+        books = search_books(books, search_query)
+
+    sort_by = params.get('sort') or ('relevance' if search_query else 'title')
+
+    min_price = params.get('min_price')
+    max_price = params.get('max_price')
+    books = filter_price(books, min_price, max_price, 'price' if sort_by in ('price_asc', 'price_desc') else sort_by)
+
+    genre_filter = params.get('genre')
+    if genre_filter:
+        books = filter_genre(books, genre_filter)
+
+    if sort_by == 'relevance' and 'search_rank' in books.query.annotations:
+        books = books.order_by('search_rank', 'pk')
+    elif sort_by == 'price_asc':
+        books = books.order_by('price')
+    elif sort_by == 'price_desc':
+        books = books.order_by('-price')
+    elif sort_by == 'date_asc':
+        books = books.order_by('publication_date')
+    elif sort_by == 'date_desc':
+        books = books.order_by('-publication_date')
+    elif sort_by == 'popular':
+        books = books.order_by('-favorite_count', 'pk')
+    else:
+        books = books.order_by('title')
+
+    filters = {
+        'search_query': search_query,
+        'min_price': min_price,
+        'max_price': max_price,
+        'genre_filter': genre_filter,
+        'sort_by': sort_by,
+    }
+    return books, filters
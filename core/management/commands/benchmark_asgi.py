@@ -0,0 +1,222 @@
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts.models import FavoriteBook
+from products import facets, listing, search
+from products.management.commands.benchmark_catalog_queries import seed_catalog
+from products.models import Book
+from .benchmark_sqlite_concurrency import percentile
+
+
+HOST = 'benchmark.local'
+
+PATHS = [
+    '/',
+    '/shop/',
+    '/shop/?sort=price_desc&min_price=50000&max_price=150000',
+    '/shop/?search=%D8%AF%D8%B1%DB%8C%D8%A7',
+    '/accounts/favorites/',
+]
+
+# کش جدا تا صفحات کش‌شده یا نسخه replica پروژه روی نتیجه اثر نگذارند
+BENCHMARK_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'benchmark-{alias}'}
+    for alias in ('default', 'pages', 'cards')
+}
+
+
+@contextmanager
+def benchmark_database(prefix):
+    """
+    دیتابیس default موقتاً یک فایل خالی در پوشه موقت است (ویوها فقط default را می‌خوانند)
+    و کش جدا و میزبان benchmark فعال‌اند. بعد از خروج همه چیز به حالت قبل برمی‌گردد.
+    """
+    database = connections.databases['default']
+    original_name = database['NAME']
+    directory = tempfile.mkdtemp(prefix=prefix)
+    connections['default'].close()
+    database['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+    try:
+        with override_settings(CACHES=BENCHMARK_CACHES, ALLOWED_HOSTS=[HOST]):
+            call_command('migrate', verbosity=0)
+            yield
+    finally:
+        connections.close_all()
+        database['NAME'] = original_name
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def prepare_catalog():
+    """seed_catalog با bulk_create کار می‌کند؛ لیستینگ، ایندکس جستجو و شمارنده‌ها یک‌جا ساخته می‌شوند"""
+    listing.rebuild()
+    search.rebuild_index()
+    facets.rebuild()
+
+
+def wsgi_environ(url, cookie):
+    parts = urlsplit(url)
+    return {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def asgi_scope(url, cookie):
+    parts = urlsplit(url)
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+
+
+class Command(BaseCommand):
+    help = ('صفحه اصلی، فروشگاه و علاقه‌مندی‌ها را روی یک کاتالوگ ساختگی با تعداد زیادی درخواست هم‌زمان '
+            'یک بار از مسیر WSGI (ویوهای sync در threadها) و یک بار از مسیر ASGI (ویوهای async) اجرا و '
+            'تعداد در ثانیه و تأخیر را مقایسه می‌کند. handlerهای جنگو مستقیم و بدون سرور وب صدا زده می‌شوند.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=20000)
+        parser.add_argument('--concurrency', type=int, default=64, help='تعداد درخواست‌های هم‌زمان')
+        parser.add_argument('--requests', type=int, default=300, help='تعداد درخواست هر مسیر در هر حالت')
+        parser.add_argument('--path', action='append', help=f'پیش‌فرض: {", ".join(PATHS)}'.replace('%', '%%'))
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database('asgi-benchmark-'):
+            cookie = self._prepare(options)
+            results = [
+                (url, self._measure_wsgi(url, cookie, options), self._measure_asgi(url, cookie, options))
+                for url in options['path'] or PATHS
+            ]
+
+        self.stdout.write(f'\n{"path":<56} {"mode":<5} {"req/s":>7} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7}')
+        for url, *modes in results:
+            for mode, (latencies, errors, seconds) in zip(('wsgi', 'asgi'), modes):
+                self.stdout.write(
+                    f'{url:<56} {mode:<5} {len(latencies) / seconds:>7.0f} {percentile(latencies, 0.5) * 1000:>8.1f} '
+                    f'{percentile(latencies, 0.95) * 1000:>8.1f} {errors:>7}'
+                )
+
+    def _prepare(self, options):
+        rng = random.Random(options['seed'])
+        seed_catalog('default', options['books'], rng)
+        prepare_catalog()
+
+        # کاربر واردشده: صفحات از کش کامل صفحه رد می‌شوند و علاقه‌مندی‌ها هم خوانده می‌شوند
+        user = User.objects.create_user('benchmark', password='benchmark')
+        book_ids = list(Book.objects.values_list('pk', flat=True))
+        FavoriteBook.objects.bulk_create(
+            FavoriteBook(user=user, book_id=book_id) for book_id in rng.sample(book_ids, min(30, len(book_ids)))
+        )
+        client = Client()
+        client.force_login(user)
+        connections.close_all()
+        return '; '.join(f'{name}={morsel.value}' for name, morsel in client.cookies.items())
+
+    def _measure_wsgi(self, url, cookie, options):
+        application = get_wsgi_application()
+
+        def request(_):
+            status = []
+            started = time.perf_counter()
+            response = application(wsgi_environ(url, cookie), lambda code, headers: status.append(code))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return time.perf_counter() - started, status[0].startswith('200')
+
+        # یک درخواست گرم‌کردن (بارگذاری قالب‌ها و میان‌افزارها) بیرون از زمان‌گیری
+        request(None)
+        # مثل سرور WSGI چندنخی: هر thread یک درخواست در هر لحظه
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            started = time.perf_counter()
+            outcomes = list(pool.map(request, range(options['requests'])))
+            seconds = time.perf_counter() - started
+            # اتصال‌های دیتابیس threadهای pool قبل از بسته شدن آن‌ها آزاد می‌شوند
+            list(pool.map(lambda _: connections.close_all(), range(options['concurrency'])))
+        return self._report('wsgi', url, outcomes, seconds)
+
+    def _measure_asgi(self, url, cookie, options):
+        application = get_asgi_application()
+
+        async def request(limit):
+            async with limit:
+                done = asyncio.Event()
+                messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+                status = []
+
+                async def receive():
+                    if messages:
+                        return messages.pop()
+                    await done.wait()
+                    return {'type': 'http.disconnect'}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        status.append(message['status'])
+
+                started = time.perf_counter()
+                try:
+                    await application(asgi_scope(url, cookie), receive, send)
+                finally:
+                    done.set()
+                return time.perf_counter() - started, status == [200]
+
+        async def run():
+            limit = asyncio.Semaphore(options['concurrency'])
+            await request(limit)
+            started = time.perf_counter()
+            outcomes = await asyncio.gather(*(request(limit) for _ in range(options['requests'])))
+            return outcomes, time.perf_counter() - started
+
+        outcomes, seconds = asyncio.run(run())
+        return self._report('asgi', url, outcomes, seconds)
+
+    def _report(self, mode, url, outcomes, seconds):
+        latencies = [latency for latency, ok in outcomes if ok]
+        errors = len(outcomes) - len(latencies)
+        self.stdout.write(f'{mode} {url}: {len(outcomes)} درخواست در {seconds:.1f} ثانیه ({errors} خطا)')
+        return latencies, errors, seconds
@@ -0,0 +1,157 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from core.pagination import SORT_FIELDS, KeysetPaginator
+from core.replica import copy_database
+from core.views import BOOKS_PER_PAGE
+from products.management.commands.benchmark_catalog_queries import FILTERS, seed_catalog, shop_queryset
+from products import listing
+from products.models import Book
+
+
+PRIMARY = 'concurrency_primary'
+REPLICA = 'concurrency_replica'
+
+# تنظیمات قبلی پروژه: ژورنال rollback و بدون pragma
+ROLLBACK_OPTIONS = {'init_command': 'PRAGMA journal_mode=DELETE'}
+
+MODES = ('rollback', 'wal', 'wal+replica')
+
+SORTS = [sort_by for sort_by in SORT_FIELDS if sort_by != 'relevance']
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Worker(threading.Thread):
+    def __init__(self, target, deadline, seed):
+        super().__init__(daemon=True)
+        self.target = target
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.locked = 0
+
+    def run(self):
+        try:
+            while time.monotonic() < self.deadline:
+                started = time.perf_counter()
+                try:
+                    self.target(self.rng)
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    self.locked += 1
+                    continue
+                self.latencies.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('خواندن صفحات فروشگاه و نوشتن هم‌زمان روی SQLite را با ژورنال rollback، با WAL و '
+            'با WAL و replica مقایسه می‌کند: تعداد در ثانیه، تأخیر و خطاهای database is locked')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=20000)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--batch', type=int, default=200, help='تعداد ردیف‌های هر تراکنش نوشتن')
+        parser.add_argument('--mode', choices=MODES, action='append', help='پیش‌فرض: همه حالت‌ها')
+
+    def handle(self, *args, **options):
+        results = []
+        for mode in options['mode'] or MODES:
+            directory = tempfile.mkdtemp(prefix='sqlite-concurrency-')
+            try:
+                results.append((mode, self._run_mode(mode, directory, options)))
+            finally:
+                for alias in (PRIMARY, REPLICA):
+                    if alias in connections.databases:
+                        connections[alias].close()
+                        del connections[alias]
+                        del connections.databases[alias]
+                shutil.rmtree(directory, ignore_errors=True)
+
+        self.stdout.write(f'\n{"mode":<12} {"reads/s":>9} {"read p50/p95 ms":>17} {"writes/s":>9} '
+                          f'{"write p95 ms":>13} {"locked":>7}')
+        for mode, (reads, read_locked, writes, write_locked, seconds) in results:
+            self.stdout.write(
+                f'{mode:<12} {len(reads) / seconds:>9.0f} '
+                f'{percentile(reads, 0.5) * 1000:>8.1f}/{percentile(reads, 0.95) * 1000:<8.1f} '
+                f'{len(writes) / seconds:>9.0f} {percentile(writes, 0.95) * 1000:>13.1f} '
+                f'{read_locked + write_locked:>7}'
+            )
+
+    def _register(self, alias, path, mode):
+        database = dict(connections.databases['default'], NAME=path)
+        database['OPTIONS'] = dict(ROLLBACK_OPTIONS) if mode == 'rollback' else dict(database['OPTIONS'])
+        if alias == REPLICA:
+            database['OPTIONS'] = {'init_command': settings.DATABASES['replica']['OPTIONS']['init_command']}
+        connections.databases[alias] = database
+
+    def _run_mode(self, mode, directory, options):
+        primary_path = os.path.join(directory, 'primary.sqlite3')
+        self._register(PRIMARY, primary_path, mode)
+        call_command('migrate', verbosity=0, database=PRIMARY)
+        seed_catalog(PRIMARY, options['books'], random.Random(0))
+        listing.rebuild(using=PRIMARY)
+        connections[PRIMARY].close()
+
+        read_alias = PRIMARY
+        if mode == 'wal+replica':
+            replica_path = os.path.join(directory, 'replica.sqlite3')
+            copy_database(primary_path, replica_path)
+            self._register(REPLICA, replica_path, mode)
+            read_alias = REPLICA
+
+        ids = list(Book.objects.using(PRIMARY).values_list('pk', flat=True))
+        connections[PRIMARY].close()
+
+        def read(rng):
+            sort_by = rng.choice(SORTS)
+            books = shop_queryset(read_alias, rng.choice(list(FILTERS.values())), sort_by)
+            list(KeysetPaginator(books, sort_by, BOOKS_PER_PAGE).page())
+
+        def write(rng):
+            # مثل flush شمارنده علاقه‌مندی‌ها: یک تراکنش کوتاه روی چند صد ردیف
+            with transaction.atomic(using=PRIMARY):
+                Book.objects.using(PRIMARY).filter(pk__in=rng.sample(ids, options['batch'])).update(
+                    favorite_count=F('favorite_count') + 1,
+                )
+
+        deadline = time.monotonic() + options['seconds']
+        readers = [Worker(read, deadline, seed) for seed in range(options['readers'])]
+        writers = [Worker(write, deadline, 1000 + seed) for seed in range(options['writers'])]
+        started = time.monotonic()
+        for worker in readers + writers:
+            worker.start()
+        for worker in readers + writers:
+            worker.join()
+        seconds = time.monotonic() - started
+
+        reads = [latency for worker in readers for latency in worker.latencies]
+        writes = [latency for worker in writers for latency in worker.latencies]
+        read_locked = sum(worker.locked for worker in readers)
+        write_locked = sum(worker.locked for worker in writers)
+        self.stdout.write(
+            f'{mode}: {len(reads)} خواندن و {len(writes)} نوشتن در {seconds:.1f} ثانیه '
+            f'({read_locked + write_locked} خطای locked، میانه خواندن {statistics.median(reads or [0]) * 1000:.1f} ms)'
+        )
+        return reads, read_locked, writes, write_locked, seconds
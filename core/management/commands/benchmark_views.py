@@ -0,0 +1,253 @@
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+from urllib.parse import urlencode
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import FavoriteBook
+from core.pagination import SORT_FIELDS
+from core.query_budget import count_queries
+from products import facets, listing, search
+from products.management.commands.benchmark_catalog_queries import FILTERS, WORDS, seed_catalog
+from products.models import Book
+from .benchmark_asgi import HOST, benchmark_database, prepare_catalog
+
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+SEARCH_FILTERS = {
+    'search': {'search': WORDS[1]},
+    'search+price': {'search': WORDS[1], 'min_price': '50000', 'max_price': '150000'},
+}
+
+MANAGEMENT_FILTERS = ('none', 'search', 'price+genre')
+
+# کتاب‌هایی که سناریوی حذف گروهی پیدا و پاک می‌کند؛ این کلمه در عنوان کتاب‌های ساختگی نیست
+DELETE_MARKER = 'حذفی'
+
+# اختلاف زمانی کمتر از این (میلی‌ثانیه) نویز اندازه‌گیری حساب می‌شود، نه پسرفت
+MIN_TIME_REGRESSION_MS = 2.0
+
+
+class Scenario:
+    def __init__(self, name, url, method='get', data=None, setup=None, verify=None):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.data = data or {}
+        self.setup = setup
+        self.verify = verify
+
+    def prepare(self, client):
+        if self.setup:
+            self.setup(client)
+
+    def run(self, client):
+        started = time.perf_counter()
+        response = getattr(client, self.method)(self.url, self.data)
+        size = len(b''.join(response.streaming_content) if response.streaming else response.content)
+        elapsed = time.perf_counter() - started
+        # بررسی نتیجه بیرون از زمان‌گیری؛ سناریویی که کار واقعی نکرده عدد بی‌معنا می‌دهد
+        if self.verify:
+            self.verify()
+        return elapsed, response.status_code, size
+
+
+class Command(BaseCommand):
+    help = ('روی یک کاتالوگ ساختگی (10k/100k/1m کتاب با نویسنده، ناشر، ژانر و علاقه‌مندی) زمان، تعداد کوئری، '
+            'اوج حافظه و حجم پاسخ index، همه ترکیب‌های مرتب‌سازی و فیلتر shop، book_management، '
+            'favorites_view و book_delete_filtered را اندازه می‌گیرد. نتیجه JSON است و با --compare '
+            'با یک خط پایه مقایسه و پسرفت‌ها گزارش می‌شوند.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=SIZES, default='10k')
+        parser.add_argument('--books', type=int, help='تعداد دلخواه کتاب به‌جای --size')
+        parser.add_argument('--repeat', type=int, default=5, help='تعداد اجرای زمان‌گیری هر سناریو (بعد از یک اجرای گرم‌کردن)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', action='append', help='فقط سناریوهایی که نامشان این عبارت را دارد')
+        parser.add_argument('--delete-batch', type=int, default=200, help='تعداد کتاب‌های هر اجرای حذف گروهی')
+        parser.add_argument('--output', help='مسیر فایل JSON نتایج')
+        parser.add_argument('--compare', help='فایل JSON خط پایه برای مقایسه')
+        parser.add_argument('--time-tolerance', type=float, default=0.25, help='کندی مجاز نسبت به خط پایه (0.25 یعنی 25٪)')
+        parser.add_argument('--memory-tolerance', type=float, default=0.25)
+        parser.add_argument('--size-tolerance', type=float, default=0.05)
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as handle:
+                baseline = json.load(handle)
+
+        books = options['books'] or SIZES[options['size']]
+        with benchmark_database('views-benchmark-'), override_settings(DEBUG=False):
+            rng = random.Random(options['seed'])
+            started = time.monotonic()
+            meta = self._seed(books, rng)
+            self.stdout.write(f'{books} کتاب در {time.monotonic() - started:.1f} ثانیه ساخته شد.')
+
+            client = Client(HTTP_HOST=HOST)
+            client.force_login(User.objects.get(username='benchmark'))
+            results = {}
+            for scenario in self._scenarios(options):
+                results[scenario.name] = self._measure(client, scenario, options['repeat'])
+                result = results[scenario.name]
+                self.stdout.write(
+                    f'{scenario.name:<40} {result["time_ms"]:>9.1f} ms {result["queries"]:>4} q '
+                    f'{result["peak_memory_kb"]:>9.0f} KB {result["response_bytes"]:>10} B  {result["status"]}'
+                )
+
+        report = {
+            'meta': dict(meta, repeat=options['repeat'], seed=options['seed'], created=timezone.now().isoformat(),
+                         python=platform.python_version(), django=django.get_version(), sqlite=sqlite3.sqlite_version),
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, ensure_ascii=False, indent=2)
+            self.stdout.write(f'نتایج در {options["output"]} ذخیره شد.')
+
+        if baseline is not None:
+            regressions = self._compare(baseline, report, options)
+            if regressions:
+                raise CommandError(f'{regressions} پسرفت نسبت به {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS('پسرفتی نسبت به خط پایه دیده نشد.'))
+
+    def _seed(self, books, rng):
+        authors, publishers = max(1, books // 20), max(10, books // 500)
+        seed_catalog('default', books, rng, authors=authors, publishers=publishers)
+        prepare_catalog()
+
+        user = User.objects.create_superuser('benchmark', password='benchmark')
+        users = [user] + User.objects.bulk_create(User(username=f'reader{i}') for i in range(100))
+        book_ids = list(Book.objects.values_list('pk', flat=True))
+        FavoriteBook.objects.bulk_create(
+            FavoriteBook(user=reader, book_id=book_id)
+            for reader in users
+            for book_id in rng.sample(book_ids, min(100 if reader is user else 20, len(book_ids)))
+        )
+        return {'books': books, 'authors': authors, 'publishers': publishers, 'users': len(users),
+                'favorites': FavoriteBook.objects.count()}
+
+    def _scenarios(self, options):
+        scenarios = [Scenario('index', '/')]
+        for filter_name, params in {**FILTERS, **SEARCH_FILTERS}.items():
+            for sort_by in SORT_FIELDS:
+                scenarios.append(Scenario(f'shop:{filter_name}:{sort_by}', '/shop/', data=dict(params, sort=sort_by)))
+        for filter_name in MANAGEMENT_FILTERS:
+            params = {**FILTERS, **SEARCH_FILTERS}[filter_name]
+            scenarios.append(Scenario(f'book_management:{filter_name}', '/book-management/', data=params))
+        scenarios.append(Scenario('favorites_view', '/accounts/favorites/'))
+
+        def doomed_books(client):
+            self._top_up_doomed_books(options['delete_batch'])
+            # book_delete_filtered همه فیلترهای آخرین جستجوی صفحه مدیریت را از سشن می‌خواند و
+            # صفحه مدیریت فیلترهای خالی را پاک نمی‌کند؛ فیلترهای سناریوهای قبلی باید حذف شوند
+            session = client.session
+            for key in ('last_search', 'last_min_price', 'last_max_price', 'last_genre'):
+                session.pop(key, None)
+            session.save()
+            client.get('/book-management/?' + urlencode({'search': DELETE_MARKER}))
+
+        def deleted(expected):
+            def verify():
+                count = options['delete_batch'] - Book.objects.filter(title__startswith=DELETE_MARKER).count()
+                if count != expected:
+                    raise CommandError(f'حذف گروهی {count} کتاب حذف کرد؛ انتظار {expected} بود')
+            return verify
+
+        # حذف آخر از همه اجرا می‌شود تا کاتالوگ سناریوهای دیگر دست نخورد
+        scenarios.append(Scenario('book_delete_filtered:dry_run', '/book-delete-filtered/', 'post',
+                                  {'dry_run': '1'}, setup=doomed_books, verify=deleted(0)))
+        scenarios.append(Scenario('book_delete_filtered', '/book-delete-filtered/', 'post',
+                                  setup=doomed_books, verify=deleted(options['delete_batch'])))
+
+        if options['only']:
+            scenarios = [s for s in scenarios if any(part in s.name for part in options['only'])]
+        return scenarios
+
+    def _top_up_doomed_books(self, count):
+        missing = count - Book.objects.filter(title__startswith=DELETE_MARKER).count()
+        if missing <= 0:
+            return
+        books = Book.objects.bulk_create(
+            Book(title=f'{DELETE_MARKER} {i}', description='', price=Decimal(100000), pages=100, quantity=1,
+                 publication_date=date(2000, 1, 1))
+            for i in range(missing)
+        )
+        book_ids = [book.pk for book in books]
+        search.reindex_books(book_ids)
+        facets.book_deltas(book_ids, +1)
+        listing.refresh_listings(book_ids)
+
+    def _measure(self, client, scenario, repeat):
+        # اجرای اول گرم‌کردن است (کش کارت کتاب‌ها، قالب‌ها)
+        times = []
+        for run in range(repeat + 1):
+            scenario.prepare(client)
+            elapsed = scenario.run(client)[0]
+            if run:
+                times.append(elapsed)
+
+        # کوئری‌ها و حافظه در یک اجرای جدا شمرده می‌شوند تا tracemalloc زمان را خراب نکند
+        scenario.prepare(client)
+        tracemalloc.start()
+        try:
+            with count_queries() as counter:
+                _, status, size = scenario.run(client)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'method': scenario.method.upper(),
+            'url': scenario.url + ('?' + urlencode(scenario.data) if scenario.data and scenario.method == 'get' else ''),
+            'status': status,
+            'time_ms': statistics.median(times) * 1000 if times else 0.0,
+            'time_ms_min': min(times) * 1000 if times else 0.0,
+            'queries': counter.count,
+            'peak_memory_kb': peak / 1024,
+            'response_bytes': size,
+        }
+
+    def _compare(self, baseline, report, options):
+        if baseline['meta'].get('books') != report['meta']['books']:
+            self.stdout.write(self.style.WARNING(
+                f'اندازه کاتالوگ خط پایه ({baseline["meta"].get("books")}) با این اجرا ({report["meta"]["books"]}) فرق دارد.'
+            ))
+        regressions = 0
+        self.stdout.write(f'\n{"scenario":<40} {"time ms":>17} {"queries":>9} {"memory KB":>19} {"bytes":>21}')
+        for name, result in report['results'].items():
+            base = baseline['results'].get(name)
+            if base is None:
+                self.stdout.write(f'{name:<40} (در خط پایه نیست)')
+                continue
+            problems = []
+            if (result['time_ms'] > base['time_ms'] * (1 + options['time_tolerance'])
+                    and result['time_ms'] - base['time_ms'] > MIN_TIME_REGRESSION_MS):
+                problems.append('time')
+            if result['queries'] > base['queries']:
+                problems.append('queries')
+            if result['peak_memory_kb'] > base['peak_memory_kb'] * (1 + options['memory_tolerance']):
+                problems.append('memory')
+            if result['response_bytes'] > base['response_bytes'] * (1 + options['size_tolerance']):
+                problems.append('size')
+            if result['status'] != base['status']:
+                problems.append('status')
+            regressions += bool(problems)
+            line = (f'{name:<40} {base["time_ms"]:>7.1f} → {result["time_ms"]:>7.1f} '
+                    f'{base["queries"]:>3} → {result["queries"]:>3} '
+                    f'{base["peak_memory_kb"]:>8.0f} → {result["peak_memory_kb"]:>8.0f} '
+                    f'{base["response_bytes"]:>9} → {result["response_bytes"]:>9}')
+            self.stdout.write(self.style.ERROR(f'{line}  پسرفت: {", ".join(problems)}') if problems else line)
+        return regressions
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.filters import filter_managed_books
+from products.deletion import delete_books
+from products.models import Book
+
+
+class Command(BaseCommand):
+    help = 'حذف گروهی کتاب‌ها با همان فیلترهای صفحه مدیریت، به‌صورت تکه‌تکه و با تراکنش‌های کوتاه'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--search', default='')
+        parser.add_argument('--min-price')
+        parser.add_argument('--max-price')
+        parser.add_argument('--genre')
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--dry-run', action='store_true', help='فقط تعداد کتاب‌های قابل حذف را نشان می‌دهد')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        params = {
+            'search': options['search'],
+            'min_price': options['min_price'],
+            'max_price': options['max_price'],
+            'genre': options['genre'],
+        }
+        books, _ = filter_managed_books(Book.objects.using(options['database']), params)
+        total = books.count()
+        if options['dry_run']:
+            self.stdout.write(f'{total} کتاب با این فیلترها حذف خواهند شد.')
+            return
+
+        started = time.monotonic()
+
+        def progress(deleted):
+            self.stdout.write(f'{deleted}/{total} کتاب حذف شد ({time.monotonic() - started:.1f} ثانیه)')
+
+        deleted = delete_books(books, chunk_size=options['chunk_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'{deleted} کتاب حذف شد.'))
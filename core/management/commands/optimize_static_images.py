@@ -0,0 +1,74 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.static_images import (
+    OPTIMIZABLE_EXTENSIONS, file_digest, load_cache, optimize_image, save_cache, webp_name,
+)
+
+
+class Command(BaseCommand):
+    help = 'فشرده‌سازی تصاویر PNG/JPG پوشه static و ساخت نسخه WebP آن‌ها با چند پروسه'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='پوشه تصاویر (پیش‌فرض: static/images)')
+        parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help='پردازش دوباره حتی برای فایل‌های تغییرنکرده')
+
+    def handle(self, *args, **options):
+        root = options['path'] or os.path.join(settings.STATICFILES_DIRS[0], 'images')
+        if not os.path.isdir(root):
+            raise CommandError(f'پوشه {root} وجود ندارد.')
+        cache_path = settings.STATIC_IMAGE_CACHE
+        cache = {} if options['force'] else load_cache(cache_path)
+
+        tasks = []
+        skipped = 0
+        webp_sources = {}
+        for directory, dirs, files in os.walk(root):
+            dirs.sort()
+            for filename in sorted(files):
+                if not filename.lower().endswith(OPTIMIZABLE_EXTENSIONS):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                other = webp_sources.setdefault(webp_name(name), name)
+                if other != name:
+                    self.stderr.write(f'{name}: نسخه WebP آن با {other} یکی می‌شود؛ رد شد.')
+                    continue
+                entry = cache.get(name)
+                # کلید کش هش محتوای فعلی فایل است؛ خروجی بهینه‌شده قبلی دوباره پردازش نمی‌شود
+                if entry and entry['sha256'] == file_digest(path) and (
+                        not entry['webp'] or os.path.exists(webp_name(path))):
+                    skipped += 1
+                    continue
+                tasks.append((name, path))
+
+        started = time.monotonic()
+        before_total = after_total = webp_total = failed = 0
+        with ProcessPoolExecutor(max_workers=options['jobs']) as executor:
+            for name, before, after, webp_size, error in executor.map(optimize_image, tasks):
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                before_total += before
+                after_total += after
+                webp_total += webp_size or after
+                cache[name] = {'sha256': file_digest(os.path.join(root, name)), 'webp': webp_size is not None}
+                webp = f'، WebP {webp_size // 1024} KB' if webp_size else ''
+                self.stdout.write(f'{name}: {before // 1024} KB → {after // 1024} KB{webp}')
+
+        # فایل‌های حذف‌شده از کش پاک می‌شوند
+        cache = {name: entry for name, entry in cache.items() if os.path.exists(os.path.join(root, name))}
+        save_cache(cache_path, cache)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(tasks) - failed} تصویر در {elapsed:.1f} ثانیه بهینه شد ({skipped} بدون تغییر، {failed} خطا). '
+            f'صرفه‌جویی: {(before_total - after_total) / 1024:.0f} KB در فایل‌های اصلی، '
+            f'{(before_total - webp_total) / 1024:.0f} KB برای مرورگرهای پشتیبان WebP.'
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from core.cache import catalog_version
+from core.replica import REPLICA_VERSION_KEY, sync_replica
+
+
+class Command(BaseCommand):
+    help = 'کپی دیتابیس اصلی در replica فقط‌خواندنی صفحات فروشگاه، یک بار یا به‌صورت دوره‌ای'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='هر چند ثانیه نسخه کاتالوگ بررسی شود (0: فقط یک بار)')
+        parser.add_argument('--force', action='store_true', help='کپی حتی اگر replica به‌روز باشد')
+
+    def handle(self, *args, **options):
+        force = options['force']
+        while True:
+            if force or cache.get(REPLICA_VERSION_KEY) != catalog_version():
+                started = time.monotonic()
+                version = sync_replica()
+                self.stdout.write(f'replica با نسخه {version} کاتالوگ به‌روز شد ({time.monotonic() - started:.2f} ثانیه).')
+            elif not options['interval']:
+                self.stdout.write('replica به‌روز است.')
+            force = False
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,22 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+
+@sync_and_async_middleware
+def asgi_urlconf_middleware(get_response):
+    """
+    زیر ASGI (زنجیره async میان‌افزارها) درخواست‌ها با ASGI_URLCONF مسیریابی می‌شوند تا
+    صفحات کاتالوگ به نسخه async ویوها برسند؛ زیر WSGI هیچ کاری نمی‌کند.
+    """
+    if not iscoroutinefunction(get_response):
+        return get_response
+
+    urlconf = getattr(settings, 'ASGI_URLCONF', None)
+
+    async def middleware(request):
+        if urlconf:
+            request.urlconf = urlconf
+        return await get_response(request)
+
+    return markcoroutinefunction(middleware)
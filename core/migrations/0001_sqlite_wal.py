@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:30
+
+from django.db import migrations
+
+
+# journal_mode در خود فایل دیتابیس ذخیره می‌شود، پس یک بار کافی است و نباید در init_command هر اتصال باشد
+def enable_wal(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+
+
+def disable_wal(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=DELETE')
+
+
+class Migration(migrations.Migration):
+
+    # SQLite حالت ژورنال را داخل تراکنش عوض نمی‌کند
+    atomic = False
+
+    dependencies = []
+
+    operations = [
+        migrations.RunPython(enable_wal, disable_wal, elidable=True),
+    ]
@@ -0,0 +1,149 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+# فیلد مرتب‌سازی و جهت آن برای هر حالت sort؛ id همیشه به‌عنوان tiebreak استفاده می‌شود
+SORT_FIELDS = {
+    'title': ('title', False),
+    'price_asc': ('price', False),
+    'price_desc': ('price', True),
+    'date_asc': ('publication_date', False),
+    'date_desc': ('publication_date', True),
+    'popular': ('favorite_count', True),
+    # امتیاز bm25 جستجوی متنی؛ فقط وقتی queryset آن را annotate کرده باشد معتبر است
+    'relevance': ('search_rank', False),
+}
+
+DEFAULT_SORT = 'title'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk, backwards=False):
+    """مقدار فیلد مرتب‌سازی و pk آخرین ردیف را به یک رشته امن برای URL تبدیل می‌کند"""
+    payload = json.dumps([str(value), pk, int(backwards)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk, backwards = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(pk), bool(backwards)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    صفحه‌بندی بر اساس cursor به‌جای OFFSET؛ هر صفحه با یک شرط WHERE روی
+    (فیلد مرتب‌سازی، id) شروع می‌شود، پس هزینه صفحه‌های عمیق با صفحه اول برابر است.
+    """
+
+    def __init__(self, queryset, sort_by, per_page):
+        if sort_by not in SORT_FIELDS or not self._has_field(queryset, SORT_FIELDS[sort_by][0]):
+            sort_by = DEFAULT_SORT
+        self.queryset = queryset
+        self.sort_by = sort_by
+        self.per_page = per_page
+        self.field, self.descending = SORT_FIELDS[sort_by]
+        if self.field in queryset.query.annotations:
+            self.field_object = queryset.query.annotations[self.field].output_field
+        else:
+            self.field_object = queryset.model._meta.get_field(self.field)
+
+    @staticmethod
+    def _has_field(queryset, name):
+        if name in queryset.query.annotations:
+            return True
+        try:
+            queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return True
+
+    def _ordering(self, descending):
+        prefix = '-' if descending else ''
+        return [prefix + self.field, prefix + 'pk']
+
+    def _after(self, value, pk, descending):
+        op = 'lt' if descending else 'gt'
+        # شرط اضافه field >= value (یا <=) تکراری است ولی به SQLite اجازه می‌دهد از ایندکس
+        # (فیلد، id) مستقیم به cursor بپرد؛ OR تنها، اسکن ایندکس را از ابتدا شروع می‌کند
+        return Q(**{f'{self.field}__{op}e': value}) & (
+            Q(**{f'{self.field}__{op}': value}) |
+            Q(**{self.field: value, f'pk__{op}': pk})
+        )
+
+    def _cursor_for(self, obj, backwards=False):
+        return encode_cursor(getattr(obj, self.field), obj.pk, backwards)
+
+    def page_queryset(self, cursor=None):
+        """queryset مرتب‌شده صفحه (بدون LIMIT)، cursor معتبر و جهت حرکت"""
+        backwards = False
+        queryset = self.queryset
+        if cursor:
+            try:
+                raw_value, pk, backwards = decode_cursor(cursor)
+                value = self.field_object.to_python(raw_value)
+            except (InvalidCursor, ValidationError):
+                # cursor نامعتبر یا دستکاری‌شده: از صفحه اول شروع می‌کنیم
+                cursor, backwards = None, False
+            else:
+                # در حرکت به عقب، ترتیب برعکس می‌شود و نتیجه دوباره معکوس می‌گردد
+                queryset = queryset.filter(self._after(value, pk, self.descending != backwards))
+
+        queryset = queryset.order_by(*self._ordering(self.descending != backwards))
+        return queryset, cursor, backwards
+
+    def page(self, cursor=None):
+        queryset, cursor, backwards = self.page_queryset(cursor)
+        return self._page(list(queryset[:self.per_page + 1]), cursor, backwards)
+
+    async def apage(self, cursor=None):
+        queryset, cursor, backwards = self.page_queryset(cursor)
+        rows = [row async for row in queryset[:self.per_page + 1].aiterator()]
+        return self._page(rows, cursor, backwards)
+
+    def _page(self, rows, cursor, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = bool(rows), has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor) and bool(rows)
+
+        next_cursor = self._cursor_for(rows[-1]) if rows and has_next else None
+        previous_cursor = self._cursor_for(rows[0], backwards=True) if rows and has_previous else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
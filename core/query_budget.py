@@ -0,0 +1,96 @@
+import logging
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# داخل strict_query_budgets() عبور از بودجه به‌جای هشدار، خطا می‌دهد (برای تست‌ها)
+_strict = ContextVar('query_budget_strict', default=False)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    """تعداد کوئری‌های اجراشده روی همه اتصال‌های دیتابیس را می‌شمارد"""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+@contextmanager
+def strict_query_budgets():
+    token = _strict.set(True)
+    try:
+        yield
+    finally:
+        _strict.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries, label='block'):
+    """
+    کمک‌کننده تست: اگر داخل بلوک بیش از max_queries کوئری اجرا شود تست شکست می‌خورد.
+    بودجه اعلام‌شده ویوهای داخل بلوک هم سخت‌گیرانه بررسی می‌شود.
+    """
+    with strict_query_budgets(), count_queries() as counter:
+        yield counter
+    if counter.count > max_queries:
+        raise QueryBudgetExceeded(f'{label} ran {counter.count} queries (budget {max_queries})')
+
+
+def query_budget(max_queries):
+    """
+    بودجه تعداد کوئری یک ویو. در محیط عادی عبور از بودجه فقط لاگ هشدار می‌دهد؛
+    در تست‌ها (strict_query_budgets / assert_max_queries) یا با QUERY_BUDGET_STRICT خطا می‌دهد.
+    """
+    def decorator(view):
+        def check(request, counter):
+            if counter.count > max_queries:
+                message = (f'{view.__module__}.{view.__name__} ran {counter.count} queries '
+                           f'(budget {max_queries}) for {request.get_full_path()}')
+                if _strict.get() or getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+
+        if iscoroutinefunction(view):
+            # اتصال‌ها بین کانتکست async و threadهای sync_to_async مشترک‌اند، پس شمارش همان است
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                with count_queries() as counter:
+                    response = await view(request, *args, **kwargs)
+                check(request, counter)
+                return response
+
+            async_wrapper.query_budget = max_queries
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with count_queries() as counter:
+                response = view(request, *args, **kwargs)
+            check(request, counter)
+            return response
+
+        wrapper.query_budget = max_queries
+        return wrapper
+
+    return decorator
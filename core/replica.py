@@ -0,0 +1,117 @@
+import os
+import sqlite3
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import catalog_version
+
+
+REPLICA_DATABASE = 'replica'
+
+# نسخه کاتالوگی که آخرین کپی replica از روی آن گرفته شده
+REPLICA_VERSION_KEY = 'catalog:replica_version'
+
+# مدل‌های این اپ‌ها داده کاتالوگ‌اند؛ بقیه (کاربر، سشن، سبد خرید) همیشه از default خوانده می‌شوند
+CATALOG_APPS = ('products',)
+
+# داخل catalog_reads کوئری‌های خواندن کاتالوگ به replica می‌روند
+_use_replica = ContextVar('catalog_replica_reads', default=False)
+
+
+def replica_is_current():
+    """replica فقط وقتی استفاده می‌شود که از آخرین تغییر کاتالوگ عقب نباشد"""
+    if REPLICA_DATABASE not in settings.DATABASES:
+        return False
+    if not os.path.exists(settings.DATABASES[REPLICA_DATABASE]['NAME']):
+        return False
+    return cache.get(REPLICA_VERSION_KEY) == catalog_version()
+
+
+def catalog_reads(view):
+    """
+    خواندن‌های کاتالوگ در درخواست‌های GET این view از replica انجام می‌شود تا با
+    نوشتن‌های default رقابت نکنند. اگر replica عقب باشد همه چیز از default خوانده می‌شود،
+    پس صفحه‌ای که بعد از bump_catalog_version کش می‌شود هیچ‌وقت داده کهنه ندارد.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not await sync_to_async(replica_is_current)():
+                return await view(request, *args, **kwargs)
+            # sync_to_async کانتکست را کپی می‌کند؛ کوئری‌های ORM async هم این پرچم را می‌بینند
+            token = _use_replica.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not replica_is_current():
+            return view(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+class CatalogReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and model._meta.app_label in CATALOG_APPS:
+            return REPLICA_DATABASE
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == REPLICA_DATABASE:
+            # رابطه‌های شیئی که از replica آمده بیرون از catalog_reads از default خوانده می‌شوند
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # replica فقط‌خواندنی است؛ شیء خوانده‌شده از آن هم در default ذخیره می‌شود
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == REPLICA_DATABASE:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_DATABASE}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # اسکیمای replica همراه داده با sync_replica کپی می‌شود
+        if db == REPLICA_DATABASE:
+            return False
+        return None
+
+
+def sync_replica(using=DEFAULT_DB_ALIAS):
+    """
+    کل دیتابیس را با backup API در replica کپی می‌کند. replica در حالت WAL است، پس
+    خواننده‌های باز حین کپی همان snapshot قبلی را می‌بینند و منتظر نمی‌مانند.
+    خروجی نسخه کاتالوگی است که replica حالا با آن برابر است.
+    """
+    # نسخه پیش از کپی خوانده می‌شود؛ تغییری که حین کپی برسد در sync بعدی می‌آید
+    version = catalog_version()
+    copy_database(settings.DATABASES[using]['NAME'], settings.DATABASES[REPLICA_DATABASE]['NAME'])
+    cache.set(REPLICA_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def copy_database(source_path, target_path):
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path, timeout=30)
+    try:
+        target.execute('PRAGMA journal_mode=WAL')
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
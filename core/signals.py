@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from products.deletion import in_bulk_delete
+from products.models import Author, Book, Genre, Publisher
+from .cache import bump_catalog_version
+
+
+def invalidate_catalog_pages(sender, using, **kwargs):
+    if kwargs.get('action', '').startswith('pre_') or in_bulk_delete():
+        return
+    # بعد از commit تا درخواستی که هم‌زمان داده قدیمی را می‌خواند آن را زیر نسخه جدید کش نکند
+    transaction.on_commit(bump_catalog_version, using=using)
+
+
+for model in (Book, Author, Publisher, Genre):
+    post_save.connect(invalidate_catalog_pages, sender=model, dispatch_uid=f'catalog_pages_save_{model.__name__}')
+    post_delete.connect(invalidate_catalog_pages, sender=model, dispatch_uid=f'catalog_pages_delete_{model.__name__}')
+m2m_changed.connect(invalidate_catalog_pages, sender=Book.genre.through, dispatch_uid='catalog_pages_genres')
@@ -0,0 +1,121 @@
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .export import re_accepts_gzip
+
+
+# فایل‌های متنی که فشرده‌سازی رویشان اثر دارد؛ تصاویر و فونت‌های woff2 از قبل فشرده‌اند
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico', '.ttf', '.eot')
+
+# فایل‌های کوچک‌تر از این ارزش فشرده‌سازی ندارند
+GZIP_MIN_SIZE = 256
+
+# نام هش‌شده ManifestStaticFilesStorage مثل style.3f2a9c1b0d4e.css
+re_hashed_name = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def gzip_file(path):
+    """نسخه .gz فایل را کنارش می‌سازد؛ اگر فشرده‌سازی کمکی نکند چیزی نوشته نمی‌شود"""
+    gz_path = f'{path}.gz'
+    data = Path(path).read_bytes()
+    if len(data) < GZIP_MIN_SIZE:
+        return None
+    # mtime=0 تا خروجی برای محتوای یکسان همیشه یکی باشد
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) >= len(data) * 0.95:
+        return None
+    temp_path = f'{gz_path}.tmp'
+    Path(temp_path).write_bytes(compressed)
+    os.replace(temp_path, gz_path)
+    return gz_path
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic نام‌های هش‌شده می‌سازد و برای فایل‌های متنی نسخه .gz هم می‌نویسد تا
+    serve بدون فشرده‌سازی در هر درخواست، فایل آماده را بفرستد.
+    """
+
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        names = set()
+        for name in paths:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                names.add(name)
+                hashed_name = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+                if hashed_name:
+                    names.add(hashed_name)
+        # نسخه هش‌شده با محتوای تغییرنکرده دوباره فشرده نمی‌شود
+        todo = [name for name in names if not (re_hashed_name.search(name) and self.exists(f'{name}.gz'))]
+        # zlib حین فشرده‌سازی GIL را آزاد می‌کند؛ threadها واقعاً موازی کار می‌کنند
+        with ThreadPoolExecutor() as executor:
+            for name, gz_path in zip(todo, executor.map(gzip_file, (self.path(name) for name in todo))):
+                if gz_path:
+                    yield f'{name}.gz', f'{name}.gz', True
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # فایل هنوز collectstatic نشده (مثلاً در تست‌ها)؛ همان نام ساده برگردانده می‌شود
+            return name
+
+
+def serve(request, path):
+    """
+    فایل‌های STATIC_ROOT را می‌فرستد: نسخه .gz اگر مرورگر gzip بپذیرد و برای
+    نام‌های هش‌شده هدر کش یک‌ساله immutable (محتوای آن نام هیچ‌وقت عوض نمی‌شود).
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    serve_path = full_path
+    gzipped = False
+    if re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')) and os.path.isfile(f'{full_path}.gz'):
+        serve_path = f'{full_path}.gz'
+        gzipped = True
+
+    stat = os.stat(serve_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(serve_path, 'rb'), content_type=content_type or 'application/octet-stream')
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        elif encoding:
+            response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if re_hashed_name.search(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        # نام ساده ممکن است با collectstatic بعدی عوض شود
+        response['Cache-Control'] = 'public, max-age=60'
+    if path.endswith(COMPRESSIBLE_EXTENSIONS):
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from io import BytesIO
+
+from PIL import Image
+
+
+OPTIMIZABLE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# برای PNG اول WebP بدون افت امتحان می‌شود؛ اگر از خود فایل کوچک‌تر نشد (مثلاً PNG پالتی)
+# و برای منبع JPEG که خودش با افت است، WebP با کیفیت بالا ساخته می‌شود
+WEBP_LOSSLESS = {'lossless': True, 'method': 6}
+WEBP_LOSSY = {'quality': 85, 'method': 6}
+
+
+def webp_name(name):
+    return f'{os.path.splitext(name)[0]}.webp'
+
+
+def file_digest(path):
+    with open(path, 'rb') as handle:
+        return hashlib.sha256(handle.read()).hexdigest()
+
+
+def _write_atomic(path, data):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as handle:
+        handle.write(data)
+    os.replace(temp_path, path)
+
+
+def _recompress(image, path):
+    """
+    همان تصویر با فشرده‌سازی بهتر و بدون افت، یا None. JPEG دوباره کدگذاری نمی‌شود (حتی با
+    quality='keep' پیکسل‌ها عوض می‌شوند و هر اجرا بدترشان می‌کند)؛ فقط jpegtran بدون decode
+    کدگذاری هافمن را بهینه می‌کند و اگر نصب نباشد فایل دست نمی‌خورد.
+    """
+    if image.format == 'PNG':
+        buffer = BytesIO()
+        options = {}
+        if image.info.get('icc_profile'):
+            options['icc_profile'] = image.info['icc_profile']
+        if 'transparency' in image.info:
+            options['transparency'] = image.info['transparency']
+        image.save(buffer, 'PNG', optimize=True, **options)
+        return buffer.getvalue()
+    jpegtran = shutil.which('jpegtran')
+    if jpegtran is None:
+        return None
+    result = subprocess.run([jpegtran, '-copy', 'all', '-optimize', '-progressive', path],
+                            capture_output=True, check=True)
+    return result.stdout
+
+
+def _same_pixels(image, data):
+    """خروجی فقط وقتی جای فایل اصلی را می‌گیرد که پیکسل به پیکسل با آن یکی باشد"""
+    with Image.open(BytesIO(data)) as candidate:
+        candidate.load()
+        return (candidate.mode == image.mode and candidate.size == image.size
+                and candidate.getpalette() == image.getpalette() and candidate.tobytes() == image.tobytes())
+
+
+def optimize_image(task):
+    """
+    اجرا در پروسه کارگر: فایل را اگر بدون افت کوچک‌تر شود در جا بازنویسی می‌کند و نسخه WebP را کنارش می‌سازد.
+    خروجی: (نام، حجم قبل، حجم بعد، حجم WebP یا None، خطا)
+    """
+    name, path = task
+    try:
+        before = os.path.getsize(path)
+        with Image.open(path) as image:
+            image.load()
+            data = _recompress(image, path)
+            after = before
+            if data is not None and len(data) < before and _same_pixels(image, data):
+                _write_atomic(path, data)
+                after = len(data)
+
+            source = image
+            if image.mode not in ('RGB', 'RGBA'):
+                has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+                source = image.convert('RGBA' if has_alpha else 'RGB')
+            buffer = BytesIO()
+            if image.format == 'PNG':
+                source.save(buffer, 'WEBP', **WEBP_LOSSLESS)
+            if buffer.tell() == 0 or buffer.tell() >= after:
+                buffer = BytesIO()
+                source.save(buffer, 'WEBP', **WEBP_LOSSY)
+
+        webp_path = webp_name(path)
+        webp_size = None
+        # WebP بزرگ‌تر از اصل فایده‌ای ندارد؛ <picture> در نبودش به همان img برمی‌گردد
+        if buffer.tell() < after:
+            _write_atomic(webp_path, buffer.getvalue())
+            webp_size = buffer.tell()
+        elif os.path.exists(webp_path):
+            os.remove(webp_path)
+        return name, before, after, webp_size, None
+    except Exception as e:
+        return name, None, None, None, str(e)
+
+
+def load_cache(path):
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(cache, handle, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
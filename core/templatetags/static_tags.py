@@ -0,0 +1,29 @@
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from core.static_images import webp_name
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def has_static(path):
+    return finders.find(path) is not None
+
+
+@register.simple_tag
+def static_picture(path, **attrs):
+    """
+    <img> تصویر static؛ اگر optimize_static_images نسخه WebP ساخته باشد داخل <picture>
+    با یک <source> از نوع image/webp قرار می‌گیرد. ویژگی‌ها (alt، class، ...) به img می‌رسند.
+    """
+    img = format_html('<img src="{}"{}>', static(path), flatatt(attrs))
+    webp = webp_name(path)
+    if has_static(webp):
+        return format_html('<picture><source srcset="{}" type="image/webp">{}</picture>', static(webp), img)
+    return img
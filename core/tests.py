@@ -1,3 +1,165 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from accounts.models import FavoriteBook
+from core.pagination import SORT_FIELDS, KeysetPaginator
+from products.models import Author, Book, Genre, Publisher
+from .query_budget import QueryBudgetExceeded, assert_max_queries, query_budget
+from .static_images import optimize_image
+from .views import BOOKS_PER_PAGE, shop_books, shop_filters
+
+
+# کش خالی در حافظه تا هر درخواست خود ویو را اجرا کند، نه کش کامل صفحه
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'query-budget-{alias}'}
+    for alias in ('default', 'pages', 'cards')
+}
+
+# خواندن سشن و کاربر در میان‌افزارها برای کاربر واردشده؛ جزو بودجه خود ویو نیست
+SESSION_QUERIES = 2
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryBudgetTests(TestCase):
+    """
+    بودجه کوئری ویوهای اصلی روی کاتالوگی بزرگ‌تر از یک صفحه. تعداد کوئری نباید با تعداد
+    کتاب‌ها، ژانرها یا علاقه‌مندی‌ها زیاد شود.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        genres = [Genre.objects.create(name=f'ژانر {i}') for i in range(4)]
+        publishers = [Publisher.objects.create(name=f'ناشر {i}') for i in range(3)]
+        authors = [
+            Author.objects.create(first_name=f'نویسنده {i}', last_name='آزمایشی', bio='', birth_date=date(1950, 1, 1))
+            for i in range(5)
+        ]
+        cls.user = User.objects.create_superuser('reader', password='reader')
+        for i in range(40):
+            book = Book.objects.create(
+                title=f'کتاب دریا فانوس {i}' if i == 15 else f'کتاب دریا {i}', description='توضیح', price=40000 + i * 5000, pages=100,
+                publication_date=date(2000 + i % 20, 1, 1), quantity=i % 4,
+                author=authors[i % len(authors)], publisher=publishers[i % len(publishers)],
+            )
+            book.genre.set(genres[:1 + i % len(genres)])
+            FavoriteBook.objects.create(user=cls.user, book=book)
+        # ژانر آخر فقط روی یک‌چهارم کتاب‌هاست؛ کتاب 15 در همه فیلترهای تست‌ها هست و در صفحه اول می‌آید
+        cls.genre = genres[-1]
+        cls.book = Book.objects.get(title__contains='فانوس')
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+
+    def get(self, budget, url, data=None):
+        with assert_max_queries(budget, label=url):
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_index(self):
+        self.get(4, reverse('core:index'))
+
+    def test_index_logged_in(self):
+        self.client.force_login(self.user)
+        self.get(4 + SESSION_QUERIES, reverse('core:index'))
+
+    def filters(self):
+        # هر ترکیب کتاب self.book را برمی‌گرداند تا فیلتری که هیچ نتیجه‌ای ندارد از بودجه رد نشود
+        return [
+            {'search': 'فانوس'},
+            {'min_price': '50000', 'max_price': '150000'},
+            {'genre': self.genre.name},
+            {'search': 'دریا', 'min_price': '50000', 'max_price': '150000', 'genre': self.genre.name},
+        ]
+
+    def test_shop(self):
+        for params in [{}] + self.filters():
+            for sort_by in SORT_FIELDS:
+                with self.subTest(sort=sort_by, **params):
+                    response = self.get(10, reverse('core:shop'), dict(params, sort=sort_by))
+                    if params:
+                        self.assertContains(response, self.book.title)
+                    else:
+                        self.assertEqual(len(response.context['books']), BOOKS_PER_PAGE)
+
+    def test_shop_next_page(self):
+        response = self.get(10, reverse('core:shop'), {'sort': 'price_desc'})
+        cursor = response.context['books'].next_cursor
+        self.assertTrue(cursor)
+        self.get(10, reverse('core:shop'), {'sort': 'price_desc', 'cursor': cursor})
+
+    def test_book_management(self):
+        self.client.force_login(self.user)
+        for params in [{}] + self.filters():
+            with self.subTest(**params):
+                response = self.get(8 + SESSION_QUERIES, reverse('core:book_management'), params)
+                self.assertContains(response, self.book.title)
+
+    def test_favorites_view(self):
+        self.client.force_login(self.user)
+        self.get(5 + SESSION_QUERIES, reverse('accounts:favorites'))
+
+    def plan(self, params):
+        books, _ = shop_books(shop_filters(params), list(Genre.objects.all()))
+        paginator = KeysetPaginator(books, params['sort'], BOOKS_PER_PAGE)
+        return paginator.page_queryset()[0][:BOOKS_PER_PAGE + 1].explain()
+
+    def test_each_sort_walks_its_listing_index(self):
+        indexes = {'title': 'listing_title_idx', 'price': 'listing_price_idx',
+                   'publication_date': 'listing_pubdate_idx', 'favorite_count': 'listing_favorites_idx'}
+        wide = {'min_price': '50000', 'max_price': '150000'}
+        for sort_by, (field, _) in SORT_FIELDS.items():
+            if sort_by == 'relevance':
+                continue
+            for params in ({}, wide):
+                with self.subTest(sort=sort_by, **params), self.settings(PRICE_INDEX_MAX_ROWS=10):
+                    plan = self.plan(dict(params, sort=sort_by))
+                    self.assertIn(indexes[field], plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_narrow_price_range_reads_the_price_index(self):
+        for sort_by in ('title', 'date_desc', 'popular'):
+            with self.subTest(sort=sort_by):
+                self.assertIn('listing_price_idx', self.plan({'min_price': '50000', 'max_price': '60000', 'sort': sort_by}))
+
+    def test_view_over_budget_fails_inside_assert_max_queries(self):
+        @query_budget(0)
+        def view(request):
+            return User.objects.count()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_max_queries(10):
+                view(RequestFactory().get('/'))
+
+
+class StaticImageTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _pixels(self, path):
+        with Image.open(path) as image:
+            return image.mode, image.size, image.tobytes()
+
+    def test_optimizing_twice_keeps_every_pixel(self):
+        image = Image.new('RGB', (64, 48))
+        image.putdata([((x * 37) % 256, (y * 53) % 256, (x * y) % 256) for y in range(48) for x in range(64)])
+        for name, options in (('photo.jpg', {'quality': 90}), ('icon.png', {})):
+            with self.subTest(name):
+                path = os.path.join(self.directory, name)
+                image.save(path, **options)
+                original = self._pixels(path)
+                for _ in range(2):
+                    _, before, after, _, error = optimize_image((name, path))
+                    self.assertIsNone(error)
+                    self.assertLessEqual(after, before)
+                    self.assertEqual(self._pixels(path), original)
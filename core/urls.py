@@ -11,6 +11,7 @@ urlpatterns = [
     path('book-edit/<int:book_id>/', views.book_edit, name='book_edit'),
     path('book-delete/<int:book_id>/', views.book_delete, name='book_delete'),
     path('book-delete-filtered/', views.book_delete_filtered, name='book_delete_filtered'),
+    path('book-export/', views.book_export, name='book_export'),
 ]
 
 
@@ -1,120 +1,116 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
-from products.models import Book, Author, Publisher, Genre
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from accounts.models import FavoriteBook
+from products.models import Book, BookListing, Author, Publisher, Genre
 from products.forms import BookForm
+from products.deletion import delete_books
+from products.facets import CatalogFacets
+from products.search import search_books
+from .cache import catalog_page_cache
+from .export import EXPORT_FORMATS, export_rows, re_accepts_gzip
+from .filters import filter_genre, filter_managed_books, filter_price
+from .pagination import DEFAULT_SORT, SORT_FIELDS, KeysetPaginator
+from .query_budget import query_budget
+from .replica import catalog_reads
 
+BOOKS_PER_PAGE = 24
 
+# فیلدهایی که کارت کتاب و cursor صفحه‌بندی لازم دارند (کلید را only() همیشه می‌خواند)
+BOOK_CARD_FIELDS = ('title', 'price', 'image', 'image_variants', 'publication_date', 'favorite_count', 'updated_at')
+
+
+@catalog_page_cache
+@catalog_reads
+@query_budget(4)
 def index(request):
-    books = Book.objects.all()
-    return render(request, 'core/index.html',{'books':books})
+    books = BookListing.objects.only(*BOOK_CARD_FIELDS)
+    books = KeysetPaginator(books, 'title', BOOKS_PER_PAGE).page(request.GET.get('cursor'))
+    favorite_ids = FavoriteBook.objects.book_ids_for(request.user, books)
+    return render(request, 'core/index.html',{'books':books, 'favorite_ids': sorted(favorite_ids)})
+
+def shop_filters(params):
+    """پارامترهای فیلتر صفحه فروشگاه؛ بین shop و نسخه async آن مشترک است"""
+    search_query = params.get('search', '')
+    return {
+        'search_query': search_query,
+        'min_price': params.get('min_price'),
+        'max_price': params.get('max_price'),
+        'genre_filter': params.get('genre'),
+        'sort_by': params.get('sort') or ('relevance' if search_query else 'title'),
+    }
+
+def shop_books(filters, genres):
+    """queryset کتاب‌های صفحه و شمارنده‌های فیلتر؛ فقط فیلتر قیمت یک شمارش کوچک اجرا می‌کند"""
+    books = BookListing.objects.only(*BOOK_CARD_FIELDS)
+    searched_books = None
+    if filters['search_query']:
+        books = search_books(books, filters['search_query'])
+        # شمارش ژانرهای نتایج جستجو به جدول واسط ژانرها نیاز دارد، پس روی Book انجام می‌شود
+        searched_books = search_books(Book.objects.all(), filters['search_query'])
+    
+    sort_field = SORT_FIELDS.get(filters['sort_by'], SORT_FIELDS[DEFAULT_SORT])[0]
+    books = filter_price(books, filters['min_price'], filters['max_price'], sort_field)
+    
+    genre_ids = None
+    if filters['genre_filter']:
+        genre_ids = [genre.id for genre in genres if genre.name == filters['genre_filter']]
+        books = filter_genre(books, filters['genre_filter'], genre_ids)
+    
+    catalog_facets = CatalogFacets(searched_books, filters['min_price'], filters['max_price'], genre_ids=genre_ids)
+    return books, catalog_facets
 
+@catalog_page_cache
+@catalog_reads
+@query_budget(10)
 def shop(request):
-    books = Book.objects.all()
+    filters = shop_filters(request.GET)
+    genres = list(Genre.objects.all())
+    books, catalog_facets = shop_books(filters, genres)
     
-    search_query = request.GET.get('search', '')
-    if search_query:
-        books = books.filter(
-            Q(title__icontains=search_query) | 
-            Q(author__first_name__icontains=search_query) |
-            Q(author__last_name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(publisher__name__icontains=search_query)
-        )
+    paginator = KeysetPaginator(books, filters['sort_by'], BOOKS_PER_PAGE)
+    books = paginator.page(request.GET.get('cursor'))
     
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    if min_price:
-        books = books.filter(price__gte=min_price)
-    if max_price:
-        books = books.filter(price__lte=max_price)
-    
-    genre_filter = request.GET.get('genre')
-    if genre_filter:
-        books = books.filter(genre__name=genre_filter)
-    
-    sort_by = request.GET.get('sort', 'title')
-    if sort_by == 'price_asc':
-        books = books.order_by('price')
-    elif sort_by == 'price_desc':
-        books = books.order_by('-price')
-    elif sort_by == 'date_asc':
-        books = books.order_by('publication_date')
-    elif sort_by == 'date_desc':
-        books = books.order_by('-publication_date')
-    else:
-        books = books.order_by('title')
-    
-    genres = Genre.objects.all()
+    genre_counts = catalog_facets.genres()
+    for genre in genres:
+        genre.facet_count = genre_counts.get(genre.id, 0)
     
     context = {
         'books': books,
+        'favorite_ids': sorted(FavoriteBook.objects.book_ids_for(request.user, books)),
         'genres': genres,
-        'search_query': search_query,
-        'min_price': min_price,
-        'max_price': max_price,
-        'genre_filter': genre_filter,
-        'sort_by': sort_by,
+        'price_buckets': catalog_facets.price_buckets(),
+        **filters,
+        'sort_by': paginator.sort_by,
     }
     return render(request, 'core/shop.html', context)
 
 @login_required
+@query_budget(8)
 def book_management(request):
     """صفحه مدیریت کتاب‌ها"""
-    books = Book.objects.all()
-    
-   
-    search_query = request.GET.get('search', '')
-    if search_query:
-        books = books.filter(
-            Q(title__icontains=search_query) | 
-            Q(author__first_name__icontains=search_query) |
-            Q(author__last_name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(publisher__name__icontains=search_query)
-        )
-        request.session['last_search'] = search_query
-    
-  
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    if min_price:
-        books = books.filter(price__gte=min_price)
-        request.session['last_min_price'] = min_price
-    if max_price:
-        books = books.filter(price__lte=max_price)
-        request.session['last_max_price'] = max_price
-    
-   
-    genre_filter = request.GET.get('genre')
-    if genre_filter:
-        books = books.filter(genre__name=genre_filter)
-        request.session['last_genre'] = genre_filter
-    
-   
-    sort_by = request.GET.get('sort', 'title')
-    if sort_by == 'price_asc':
-        books = books.order_by('price')
-    elif sort_by == 'price_desc':
-        books = books.order_by('-price')
-    elif sort_by == 'date_asc':
-        books = books.order_by('publication_date')
-    elif sort_by == 'date_desc':
-        books = books.order_by('-publication_date')
-    else:
-        books = books.order_by('title')
+    books, filters = filter_managed_books(BookListing.objects.all(), request.GET)
+
+    if filters['search_query']:
+        request.session['last_search'] = filters['search_query']
+    if filters['min_price']:
+        request.session['last_min_price'] = filters['min_price']
+    if filters['max_price']:
+        request.session['last_max_price'] = filters['max_price']
+    if filters['genre_filter']:
+        request.session['last_genre'] = filters['genre_filter']
     
     genres = Genre.objects.all()
     
     context = {
         'books': books,
         'genres': genres,
-        'search_query': search_query,
-        'min_price': min_price,
-        'max_price': max_price,
-        'genre_filter': genre_filter,
-        'sort_by': sort_by,
+        **filters,
     }
     
     return render(request, 'core/book_management.html', context)
@@ -125,7 +121,9 @@ def book_add(request):
     if request.method == 'POST':
         form = BookForm(request.POST, request.FILES)
         if form.is_valid():
-            book = form.save()
+            # کتاب، ژانرها و ردیف لیستینگ با هم commit می‌شوند
+            with transaction.atomic():
+                book = form.save()
             messages.success(request, f'کتاب "{book.title}" با موفقیت اضافه شد.')
             return redirect('core:book_management')
         else:
@@ -146,7 +144,8 @@ def book_edit(request, book_id):
     if request.method == 'POST':
         form = BookForm(request.POST, request.FILES, instance=book)
         if form.is_valid():
-            book = form.save()
+            with transaction.atomic():
+                book = form.save()
             messages.success(request, f'کتاب "{book.title}" با موفقیت ویرایش شد.')
             return redirect('core:book_management')
         else:
@@ -171,34 +170,46 @@ def book_delete(request, book_id):
     
     return render(request, 'core/book_delete_confirm.html', {'book': book})
 
+@login_required
+def book_export(request):
+    """خروجی CSV یا JSONL همان کتاب‌هایی که صفحه مدیریت با فیلترهای فعلی نشان می‌دهد"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    lines_for, content_type = EXPORT_FORMATS[fmt]
+    books, _ = filter_managed_books(Book.objects.all(), request.GET)
+
+    # خروجی به‌صورت جریان ساخته می‌شود؛ نه queryset و نه فایل کامل در حافظه نگه داشته نمی‌شوند
+    lines = (line.encode('utf-8') for line in lines_for(export_rows(books)))
+    filename = f'books-{timezone.localdate():%Y%m%d}.{fmt}'
+    accepts_gzip = re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if accepts_gzip:
+        lines = compress_sequence(lines)
+
+    response = StreamingHttpResponse(lines, content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if accepts_gzip:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
 @login_required
 def book_delete_filtered(request):
     """حذف کتاب‌های فیلتر شده"""
     if request.method == 'POST':
-     
-        search_query = request.session.get('last_search', '')
-        min_price = request.session.get('last_min_price')
-        max_price = request.session.get('last_max_price')
-        genre_filter = request.session.get('last_genre')
-        
-        books = Book.objects.all()
-        
-        if search_query:
-            books = books.filter(
-                Q(title__icontains=search_query) | 
-                Q(author__first_name__icontains=search_query) |
-                Q(author__last_name__icontains=search_query)
-            )
-        
-        if min_price:
-            books = books.filter(price__gte=min_price)
-        if max_price:
-            books = books.filter(price__lte=max_price)
-        if genre_filter:
-            books = books.filter(genre__name=genre_filter)
-        
-        deleted_count = books.count()
-        books.delete()
+        params = {
+            'search': request.session.get('last_search', ''),
+            'min_price': request.session.get('last_min_price'),
+            'max_price': request.session.get('last_max_price'),
+            'genre': request.session.get('last_genre'),
+        }
+        books, _ = filter_managed_books(Book.objects.all(), params)
+
+        if request.POST.get('dry_run'):
+            messages.info(request, f'{books.count()} کتاب با فیلترهای فعلی حذف خواهند شد.')
+            return redirect('core:book_management')
+
+        deleted_count = delete_books(books)
         
         messages.success(request, f'{deleted_count} کتاب با موفقیت حذف شدند.')
         return redirect('core:book_management')
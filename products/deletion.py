@@ -0,0 +1,55 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+
+from core.cache import bump_catalog_version
+from . import facets, search, suggestions
+from .models import Book
+
+
+# داخل delete_books سیگنال‌های هر کتاب کار نگهداری را انجام نمی‌دهند؛ هر تکه یکجا به‌روز می‌شود
+_bulk_delete = ContextVar('bulk_book_delete', default=False)
+
+
+def in_bulk_delete():
+    return _bulk_delete.get()
+
+
+def book_pk_chunks(books, chunk_size):
+    """شناسه کتاب‌های queryset را به ترتیب pk و در تکه‌های chunk_size تایی برمی‌گرداند"""
+    ids = books.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        chunk = list((ids if last is None else ids.filter(pk__gt=last))[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def delete_books(books, chunk_size=None, progress=None):
+    """
+    کتاب‌های queryset را تکه‌تکه و هر تکه در یک تراکنش کوتاه حذف می‌کند تا قفل نوشتن
+    SQLite بین تکه‌ها آزاد شود و حافظه فقط به اندازه یک تکه مصرف شود.
+    progress(deleted) بعد از هر تکه صدا زده می‌شود. خروجی تعداد کتاب‌های حذف‌شده است.
+    """
+    chunk_size = chunk_size or settings.BOOK_DELETE_CHUNK_SIZE
+    using = books.db
+    deleted = 0
+    for ids in book_pk_chunks(books, chunk_size):
+        token = _bulk_delete.set(True)
+        try:
+            with transaction.atomic(using=using):
+                # شمارنده‌ها باید پیش از پاک شدن ردیف‌ها و جدول واسط ژانرها کم شوند
+                facets.book_deltas(ids, -1, using=using)
+                search.unindex_books(ids, using=using)
+                suggestions.remove(suggestions.BOOK, ids, using=using)
+                _, per_model = Book.objects.using(using).filter(pk__in=ids).delete()
+                transaction.on_commit(bump_catalog_version, using=using)
+        finally:
+            _bulk_delete.reset(token)
+        deleted += per_model.get(Book._meta.label, 0)
+        if progress:
+            progress(deleted)
+    return deleted
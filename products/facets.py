@@ -0,0 +1,225 @@
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Book, FacetCount
+
+
+# مرز بازه‌های قیمت (تومان)؛ بازه i شامل قیمت‌های [PRICE_BUCKET_BOUNDS[i-1], PRICE_BUCKET_BOUNDS[i]) است
+PRICE_BUCKET_BOUNDS = (50000, 100000, 200000, 500000, 1000000)
+
+# کوچک‌ترین واحد قیمت (Book.price سه رقم اعشار دارد)
+PRICE_STEP = Decimal('0.001')
+
+
+def bucket_for(price):
+    return bisect_right(PRICE_BUCKET_BOUNDS, Decimal(price))
+
+
+def bucket_range(bucket):
+    """کران پایین (شامل) و بالا (غیرشامل) بازه؛ None یعنی بدون کران"""
+    low = PRICE_BUCKET_BOUNDS[bucket - 1] if bucket > 0 else None
+    high = PRICE_BUCKET_BOUNDS[bucket] if bucket < len(PRICE_BUCKET_BOUNDS) else None
+    return low, high
+
+
+def parse_price(value):
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def apply_deltas(deltas, using='default'):
+    """
+    تغییرات {(genre_id, bucket): delta} را با UPDATE اتمیک روی شمارنده‌ها اعمال می‌کند.
+    genre_id برابر None شمارنده کل کتاب‌های آن بازه قیمت است.
+    """
+    for (genre_id, bucket), delta in deltas.items():
+        if not delta:
+            continue
+        counters = FacetCount.objects.using(using).filter(genre_id=genre_id, bucket=bucket)
+        if counters.update(count=F('count') + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic(using=using):
+                FacetCount.objects.using(using).create(genre_id=genre_id, bucket=bucket, count=delta)
+        except IntegrityError:
+            counters.update(count=F('count') + delta)
+
+
+def pair_deltas(pairs, sign, using='default'):
+    """شمارنده ژانرها را برای جفت‌های (book_id, genre_id) اضافه‌شده یا حذف‌شده تغییر می‌دهد"""
+    pairs = list(pairs)
+    if not pairs:
+        return
+    prices = dict(Book.objects.using(using).filter(pk__in={book_id for book_id, _ in pairs}).values_list('pk', 'price'))
+    deltas = Counter()
+    for book_id, genre_id in pairs:
+        if book_id in prices:
+            deltas[genre_id, bucket_for(prices[book_id])] += sign
+    apply_deltas(deltas, using=using)
+
+
+def book_deltas(book_ids, sign, using='default'):
+    """
+    شمارنده‌ها را برای ورود یا خروج یکجای کتاب‌ها (مثلاً import یا حذف گروهی) تغییر می‌دهد.
+    برای حذف باید پیش از پاک شدن ردیف‌ها صدا زده شود.
+    """
+    book_ids = list(book_ids)
+    if not book_ids:
+        return
+    deltas = Counter()
+    prices = dict(Book.objects.using(using).filter(pk__in=book_ids).values_list('pk', 'price'))
+    for price in prices.values():
+        deltas[None, bucket_for(price)] += sign
+    through = Book.genre.through.objects.using(using).filter(book_id__in=book_ids)
+    for book_id, genre_id in through.values_list('book_id', 'genre_id'):
+        deltas[genre_id, bucket_for(prices[book_id])] += sign
+    apply_deltas(deltas, using=using)
+
+
+def rebuild(using='default'):
+    """همه شمارنده‌ها را از روی جداول اصلی دوباره محاسبه می‌کند"""
+    deltas = Counter()
+    for price in Book.objects.using(using).values_list('price', flat=True).iterator(chunk_size=2000):
+        deltas[None, bucket_for(price)] += 1
+    through = Book.genre.through.objects.using(using).values_list('genre_id', 'book__price')
+    for genre_id, price in through.iterator(chunk_size=2000):
+        deltas[genre_id, bucket_for(price)] += 1
+    with transaction.atomic(using=using):
+        FacetCount.objects.using(using).all().delete()
+        FacetCount.objects.using(using).bulk_create(
+            FacetCount(genre_id=genre_id, bucket=bucket, count=count)
+            for (genre_id, bucket), count in deltas.items()
+        )
+
+
+class CatalogFacets:
+    """
+    تعداد کتاب‌های هر ژانر و هر بازه قیمت برای فیلترهای فعلی فروشگاه.
+    بدون جستجو از شمارنده‌های از پیش محاسبه‌شده خوانده می‌شود و فقط بازه‌هایی که
+    فیلتر قیمت آن‌ها را نصفه پوشش می‌دهد با یک کوئری محدود دقیق شمرده می‌شوند.
+    با جستجو، شمارش روی همان مجموعه کوچک نتایج FTS انجام می‌شود.
+    """
+
+    def __init__(self, books=None, min_price=None, max_price=None, genre_ids=None, using='default'):
+        self.books = books
+        self.min_price = parse_price(min_price)
+        self.max_price = parse_price(max_price)
+        self.genre_ids = list(genre_ids) if genre_ids is not None else None
+        self.using = using
+
+    def _price_q(self, prefix=''):
+        q = Q()
+        if self.min_price is not None:
+            q &= Q(**{f'{prefix}price__gte': self.min_price})
+        if self.max_price is not None:
+            q &= Q(**{f'{prefix}price__lte': self.max_price})
+        return q
+
+    def _coverage(self):
+        """بازه‌هایی که کامل داخل فیلتر قیمت هستند و بازه‌هایی که بخشی از آن‌ها داخل است"""
+        full, partial = [], []
+        for bucket in range(len(PRICE_BUCKET_BOUNDS) + 1):
+            low, high = bucket_range(bucket)
+            if self.max_price is not None and low is not None and self.max_price < low:
+                continue
+            if self.min_price is not None and high is not None and self.min_price >= high:
+                continue
+            covers_low = self.min_price is None or (low is not None and self.min_price <= low)
+            covers_high = self.max_price is None or (high is not None and self.max_price >= high - PRICE_STEP)
+            (full if covers_low and covers_high else partial).append(bucket)
+        return full, partial
+
+    def _bucket_q(self, buckets, prefix=''):
+        q = Q()
+        for bucket in buckets:
+            low, high = bucket_range(bucket)
+            part = Q()
+            if low is not None:
+                part &= Q(**{f'{prefix}price__gte': low})
+            if high is not None:
+                part &= Q(**{f'{prefix}price__lt': high})
+            q |= part
+        return q
+
+    def genres(self):
+        """دیکشنری {genre_id: تعداد کتاب}"""
+        if self.books is not None:
+            rows = self.books.filter(self._price_q()).order_by().values('genre').annotate(n=Count('pk', distinct=True))
+            return {row['genre']: row['n'] for row in rows if row['genre'] is not None}
+
+        full, partial = self._coverage()
+        counts = Counter()
+        rows = (FacetCount.objects.using(self.using)
+                .filter(genre__isnull=False, bucket__in=full)
+                .values('genre_id').annotate(n=Sum('count')))
+        for row in rows:
+            counts[row['genre_id']] += row['n']
+        if partial:
+            rows = (Book.genre.through.objects.using(self.using)
+                    .filter(self._bucket_q(partial, 'book__'), self._price_q('book__'))
+                    .values('genre_id').annotate(n=Count('book_id')))
+            for row in rows:
+                counts[row['genre_id']] += row['n']
+        return dict(counts)
+
+    def price_buckets(self):
+        """فهرست بازه‌های قیمت همراه با تعداد کتاب‌ها با توجه به جستجو، ژانر و فیلتر قیمت"""
+        full, partial = self._coverage()
+        counts = Counter()
+        if self.books is not None:
+            books = self.books.filter(self._price_q())
+            if self.genre_ids is not None:
+                books = books.filter(genre__in=self.genre_ids)
+            buckets = full + partial
+            totals = books.order_by().aggregate(**{
+                f'bucket_{bucket}': Count('pk', filter=self._bucket_q([bucket]), distinct=True)
+                for bucket in buckets
+            }) if buckets else {}
+            for bucket in buckets:
+                counts[bucket] = totals[f'bucket_{bucket}']
+        else:
+            counters = FacetCount.objects.using(self.using).filter(bucket__in=full)
+            if self.genre_ids is None:
+                counters = counters.filter(genre__isnull=True)
+            else:
+                counters = counters.filter(genre_id__in=self.genre_ids)
+            for row in counters.values('bucket').annotate(n=Sum('count')):
+                counts[row['bucket']] += row['n']
+            if partial:
+                if self.genre_ids is None:
+                    prices = Book.objects.using(self.using).filter(self._bucket_q(partial), self._price_q())
+                    prices = prices.values_list('price', flat=True)
+                else:
+                    prices = (Book.genre.through.objects.using(self.using)
+                              .filter(self._bucket_q(partial, 'book__'), self._price_q('book__'),
+                                      genre_id__in=self.genre_ids)
+                              .values_list('book__price', flat=True))
+                for price in prices.iterator(chunk_size=2000):
+                    counts[bucket_for(price)] += 1
+
+        buckets = []
+        for bucket in full + partial:
+            low, high = bucket_range(bucket)
+            if high is not None:
+                high -= PRICE_STEP
+            # بازه نمایش‌داده‌شده همان اشتراک بازه با فیلتر فعلی است تا لینک همان تعداد را برگرداند
+            if self.min_price is not None:
+                low = self.min_price if low is None else max(low, self.min_price)
+            if self.max_price is not None:
+                high = self.max_price if high is None else min(high, self.max_price)
+            buckets.append({
+                'bucket': bucket,
+                'min_price': low,
+                'max_price': high,
+                'count': counts.get(bucket, 0),
+            })
+        buckets.sort(key=lambda b: b['bucket'])
+        return buckets
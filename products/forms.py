@@ -1,4 +1,5 @@
 from django import forms
+from .images import delete_variants, generate_variants
 from .models import Book, Author, Publisher, Genre
 
 class BookForm(forms.ModelForm):
@@ -190,6 +191,10 @@ class BookForm(forms.ModelForm):
                 print(f"هیچ ژانری برای کتاب '{instance.title}' اضافه نشد")
             
            
+            if 'image' in self.changed_data:
+                delete_variants(instance.image_variants)
+                instance.image_variants = generate_variants(instance.image.name) if instance.image else {}
+            
             instance.save()
         
         return instance
\ No newline at end of file
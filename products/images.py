@@ -0,0 +1,85 @@
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+
+# اندازه‌های ثابت نسخه‌های تصویر جلد (عرض، ارتفاع) با نسبت 4:5 کارت‌های فروشگاه
+IMAGE_VARIANTS = {
+    'thumb': (160, 200),
+    'card': (384, 480),
+    'detail': (768, 960),
+}
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+VARIANTS_DIR = 'Books/variants'
+
+
+def variant_name(image_name, variant, extension):
+    stem = posixpath.splitext(posixpath.basename(image_name))[0]
+    return f'{VARIANTS_DIR}/{stem}-{variant}.{extension}'
+
+
+def _flatten(image):
+    """حذف کانال شفافیت روی زمینه سفید، چون JPEG آن را پشتیبانی نمی‌کند"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_variants(image_name, storage=None):
+    """
+    از تصویر اصلی کتاب نسخه‌های WebP و JPEG در همه اندازه‌ها می‌سازد و در storage ذخیره می‌کند.
+    خروجی برای ذخیره در Book.image_variants است:
+    {'card': {'webp': {'name': ..., 'width': ..., 'height': ...}, 'jpeg': {...}}, ...}
+    """
+    storage = storage or default_storage
+    with storage.open(image_name, 'rb') as source:
+        image = Image.open(source)
+        image = _flatten(ImageOps.exif_transpose(image))
+
+    variants = {}
+    for variant, size in IMAGE_VARIANTS.items():
+        resized = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+        variants[variant] = {}
+        for fmt, (pil_format, extension, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            name = variant_name(image_name, variant, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(buffer.getvalue()))
+            variants[variant][fmt] = {'name': name, 'width': resized.width, 'height': resized.height}
+    return variants
+
+
+def delete_variants(variants, storage=None):
+    storage = storage or default_storage
+    for formats in (variants or {}).values():
+        for info in formats.values():
+            if storage.exists(info['name']):
+                storage.delete(info['name'])
+
+
+def init_worker():
+    # در پروسه‌های spawn شده (ویندوز/مک) Django باید دوباره راه‌اندازی شود
+    import django
+    django.setup()
+
+
+def build_variants_task(task):
+    """اجرا در پروسه کارگر؛ به دیتابیس دست نمی‌زند و فقط فایل‌ها را می‌سازد"""
+    book_id, image_name = task
+    try:
+        return book_id, generate_variants(image_name), None
+    except Exception as e:
+        return book_id, None, str(e)
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Book, BookListing
+
+
+# ستون‌هایی که از روی Book و جداول مرتبط ساخته می‌شوند (همه به‌جز کلید)
+LISTING_FIELDS = [field.name for field in BookListing._meta.concrete_fields if not field.primary_key]
+
+# محدودیت تعداد پارامترهای SQLite در هر کوئری
+_BATCH_SIZE = 500
+
+
+def _batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), _BATCH_SIZE):
+        yield ids[start:start + _BATCH_SIZE]
+
+
+def pack_genres(genres):
+    """ژانرها به شکل |id:name|...| تا فیلتر هر ژانر یک LIKE ساده روی همین ستون باشد"""
+    items = sorted((genre.name or '', genre.pk) for genre in genres)
+    if not items:
+        return ''
+    return '|' + '|'.join(f'{pk}:{name}' for name, pk in items) + '|'
+
+
+def filter_by_genres(listings, genre_ids):
+    """لیستینگ‌هایی که دست‌کم یکی از ژانرهای داده‌شده را دارند"""
+    q = Q()
+    for genre_id in genre_ids:
+        q |= Q(genres__contains=f'|{genre_id}:')
+    return listings.filter(q) if q else listings.none()
+
+
+def listing_for(book):
+    author = book.author
+    return BookListing(
+        book_id=book.pk,
+        title=book.title,
+        description=book.description,
+        author_name=f'{author.first_name} {author.last_name}'.strip() if author else '',
+        publisher_name=book.publisher.name if book.publisher else '',
+        genres=pack_genres(book.genre.all()),
+        price=book.price,
+        publication_date=book.publication_date,
+        quantity=book.quantity,
+        image=book.image.name or '',
+        image_variants=book.image_variants,
+        favorite_count=book.favorite_count,
+        updated_at=book.updated_at,
+    )
+
+
+def _build(book_ids, using):
+    books = (Book.objects.using(using).filter(pk__in=book_ids)
+             .select_related('author', 'publisher').prefetch_related('genre'))
+    return [listing_for(book) for book in books]
+
+
+def _save(rows, using):
+    BookListing.objects.using(using).bulk_create(
+        rows, update_conflicts=True, unique_fields=['book'], update_fields=LISTING_FIELDS,
+    )
+
+
+def refresh_listings(book_ids, using='default'):
+    """ردیف لیستینگ کتاب‌های داده‌شده را از روی جداول اصلی دوباره می‌سازد"""
+    with transaction.atomic(using=using):
+        for batch in _batches(book_ids):
+            rows = _build(batch, using)
+            _save(rows, using)
+            missing = set(batch) - {row.book_id for row in rows}
+            if missing:
+                BookListing.objects.using(using).filter(book_id__in=missing).delete()
+
+
+def rebuild(using='default', chunk_size=_BATCH_SIZE):
+    """
+    همه ردیف‌ها را با جداول اصلی مقایسه می‌کند و فقط ردیف‌های ناهماهنگ را بازنویسی می‌کند.
+    خروجی: (تعداد کتاب‌ها، ردیف‌های اصلاح‌شده، ردیف‌های اضافی حذف‌شده)
+    """
+    fields = [BookListing._meta.get_field(name) for name in LISTING_FIELDS]
+    total = repaired = 0
+    ids = Book.objects.using(using).order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        batch = list((ids if last is None else ids.filter(pk__gt=last))[:chunk_size])
+        if not batch:
+            break
+        last = batch[-1]
+        with transaction.atomic(using=using):
+            existing = BookListing.objects.using(using).in_bulk(batch)
+            drifted = [
+                row for row in _build(batch, using)
+                if row.book_id not in existing or any(
+                    field.value_from_object(row) != field.value_from_object(existing[row.book_id]) for field in fields
+                )
+            ]
+            _save(drifted, using)
+        total += len(batch)
+        repaired += len(drifted)
+    removed, _ = BookListing.objects.using(using).exclude(book__in=Book.objects.using(using).all()).delete()
+    return total, repaired, removed
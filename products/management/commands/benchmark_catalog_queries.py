@@ -0,0 +1,188 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from core.filters import filter_genre, filter_price
+from core.pagination import SORT_FIELDS, KeysetPaginator, encode_cursor
+from core.views import BOOK_CARD_FIELDS, BOOKS_PER_PAGE
+from products import listing
+from products.models import Author, Book, BookListing, Genre, Publisher
+
+
+BENCHMARK_DATABASE = 'catalog_benchmark'
+
+GENRE_NAMES = ['رمان', 'تاریخ', 'فلسفه', 'شعر', 'علمی', 'کودک', 'روانشناسی', 'هنر', 'اقتصاد', 'دینی',
+               'سفرنامه', 'زندگینامه', 'پلیسی', 'فانتزی', 'آموزشی', 'ورزشی', 'آشپزی', 'سیاسی', 'طنز', 'نمایشنامه']
+
+WORDS = ['شب', 'دریا', 'سایه', 'کوه', 'باران', 'خانه', 'راه', 'آتش', 'باد', 'ماه', 'سکوت', 'شهر',
+         'گل', 'خاک', 'آینه', 'پرنده', 'زمستان', 'رود', 'ستاره', 'قصه', 'نور', 'دیوار', 'باغ', 'سفر']
+
+FIRST_NAMES = ['علی', 'مریم', 'رضا', 'سارا', 'حسین', 'نرگس', 'محمد', 'لیلا', 'امیر', 'زهرا']
+
+LAST_NAMES = ['احمدی', 'رضایی', 'کریمی', 'موسوی', 'حسینی', 'صادقی', 'نوری', 'جعفری', 'رحیمی', 'کاظمی']
+
+# فیلترهای فروشگاه به همان شکلی که shop از پارامترهای URL می‌سازد
+FILTERS = {
+    'none': {},
+    'price': {'min_price': '50000', 'max_price': '150000'},
+    # حدود 0.2٪ کاتالوگ؛ با ایندکس قیمت خوانده می‌شود، نه ایندکس مرتب‌سازی
+    'narrow_price': {'min_price': '100000', 'max_price': '100000'},
+    'genre': {'genre': 'فلسفه'},
+    'price+genre': {'min_price': '50000', 'max_price': '150000', 'genre': 'فلسفه'},
+}
+
+
+def shop_queryset(using, params, sort_by):
+    """همان queryset صفحه فروشگاه (بدون جستجو) روی BookListing"""
+    books = BookListing.objects.using(using).only(*BOOK_CARD_FIELDS)
+    books = filter_price(books, params.get('min_price'), params.get('max_price'), SORT_FIELDS[sort_by][0])
+    if params.get('genre'):
+        books = filter_genre(books, params['genre'])
+    return books
+
+
+def seed_catalog(using, count, rng, authors=0, publishers=0):
+    """کتاب‌ها و ژانرهای ساختگی؛ با authors/publishers هر کتاب نویسنده و ناشر تصادفی هم می‌گیرد"""
+    genres = Genre.objects.using(using).bulk_create(Genre(name=name) for name in GENRE_NAMES)
+    start = date(1950, 1, 1)
+    author_ids = [author.pk for author in Author.objects.using(using).bulk_create(
+        Author(first_name=rng.choice(FIRST_NAMES), last_name=f'{rng.choice(LAST_NAMES)} {i}', bio='',
+               birth_date=start + timedelta(days=rng.randint(0, 20000)))
+        for i in range(authors)
+    )]
+    publisher_ids = [publisher.pk for publisher in Publisher.objects.using(using).bulk_create(
+        Publisher(name=f'نشر {rng.choice(WORDS)} {i}') for i in range(publishers)
+    )]
+    Through = Book.genre.through
+    with transaction.atomic(using=using):
+        for offset in range(0, count, 5000):
+            books = Book.objects.using(using).bulk_create(
+                Book(
+                    title=' '.join(rng.choices(WORDS, k=rng.randint(1, 4))) + f' {offset + i}',
+                    description='',
+                    price=Decimal(rng.randint(10, 500) * 1000),
+                    pages=rng.randint(50, 900),
+                    quantity=rng.randint(0, 20),
+                    publication_date=start + timedelta(days=rng.randint(0, 27000)),
+                    # چند کتاب محبوب و دم بلند کم‌طرفدار
+                    favorite_count=int(rng.paretovariate(1.5)) - 1,
+                    author_id=rng.choice(author_ids) if author_ids else None,
+                    publisher_id=rng.choice(publisher_ids) if publisher_ids else None,
+                )
+                for i in range(min(5000, count - offset))
+            )
+            Through.objects.using(using).bulk_create(
+                Through(book_id=book.pk, genre_id=genre.pk)
+                for book in books
+                for genre in rng.sample(genres, rng.randint(1, 3))
+            )
+
+
+def best_time(queryset, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = ('روی یک کاتالوگ ساختگی بزرگ در دیتابیس موقت، برای هر ترکیب فیلتر و مرتب‌سازی فروشگاه '
+            'EXPLAIN QUERY PLAN و زمان صفحه اول و یک صفحه عمیق را قبل و بعد از ایندکس‌های BookListing چاپ می‌کند')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=5, help='بهترین زمان از چند اجرا')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--analyze', action='store_true', help='اجرای ANALYZE پیش از هر مرحله')
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='catalog-benchmark-')
+        connections.databases[BENCHMARK_DATABASE] = dict(
+            connections.databases['default'], NAME=os.path.join(directory, 'benchmark.sqlite3'),
+        )
+        try:
+            self._run(options)
+        finally:
+            connections[BENCHMARK_DATABASE].close()
+            del connections[BENCHMARK_DATABASE]
+            del connections.databases[BENCHMARK_DATABASE]
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _run(self, options):
+        using = BENCHMARK_DATABASE
+        call_command('migrate', verbosity=0, database=using)
+
+        started = time.monotonic()
+        seed_catalog(using, options['books'], random.Random(options['seed']))
+        listing.rebuild(using=using)
+        self.stdout.write(f'{options["books"]} کتاب در {time.monotonic() - started:.1f} ثانیه ساخته شد.')
+
+        # وضعیت «قبل» لیستینگ فقط با کلید اصلی است
+        with connections[using].schema_editor() as editor:
+            for index in BookListing._meta.indexes:
+                editor.remove_index(BookListing, index)
+        before = self._measure('قبل از ایندکس‌ها', options)
+
+        started = time.monotonic()
+        with connections[using].schema_editor() as editor:
+            for index in BookListing._meta.indexes:
+                editor.add_index(BookListing, index)
+        self.stdout.write(f'ساخت ایندکس‌ها: {time.monotonic() - started:.2f} ثانیه')
+
+        after = self._measure('بعد از ایندکس‌ها', options)
+
+        self.stdout.write('\nزمان‌ها (میلی‌ثانیه؛ صفحه اول / صفحه میانی):')
+        self.stdout.write(f'{"filter":<12} {"sort":<10} {"before":>17} {"after":>17} {"speedup":>9}')
+        for key, (first, deep) in before.items():
+            new_first, new_deep = after[key]
+            speedup = (first + deep) / max(new_first + new_deep, 1e-6)
+            self.stdout.write(
+                f'{key[0]:<12} {key[1]:<10} {first:>8.2f}/{deep:<8.2f} {new_first:>8.2f}/{new_deep:<8.2f} {speedup:>8.1f}x'
+            )
+
+    def _measure(self, label, options):
+        using = BENCHMARK_DATABASE
+        if options['analyze']:
+            with connections[using].cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        self.stdout.write(f'\n===== {label} =====')
+        results = {}
+        for filter_name, params in FILTERS.items():
+            for sort_by in SORT_FIELDS:
+                if sort_by == 'relevance':
+                    # فقط همراه جستجوی متنی معنی دارد و از ایندکس FTS می‌خواند
+                    continue
+                paginator = KeysetPaginator(shop_queryset(using, params, sort_by), sort_by, BOOKS_PER_PAGE)
+                ordered, _, _ = paginator.page_queryset()
+                first = ordered[:BOOKS_PER_PAGE + 1]
+
+                # cursor ردیف وسط نتیجه، برای سنجش صفحه‌های عمیق
+                total = paginator.queryset.count()
+                deep = None
+                if total:
+                    obj = ordered[total // 2]
+                    deep, _, _ = paginator.page_queryset(encode_cursor(getattr(obj, paginator.field), obj.pk))
+                    deep = deep[:BOOKS_PER_PAGE + 1]
+
+                self.stdout.write(f'\n-- filter={filter_name} sort={sort_by} ({total} کتاب)')
+                self.stdout.write(first.explain())
+                if deep is not None:
+                    self.stdout.write('  صفحه میانی:')
+                    self.stdout.write(deep.explain())
+                results[filter_name, sort_by] = (
+                    best_time(first, options['repeat']),
+                    best_time(deep, options['repeat']) if deep is not None else 0.0,
+                )
+        return results
@@ -0,0 +1,58 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import bump_catalog_version
+from products import listing
+from products.images import build_variants_task, init_worker
+from products.models import Book
+
+
+class Command(BaseCommand):
+    help = 'نسخه‌های WebP و JPEG تصویر جلد کتاب‌های موجود را با چند پروسه می‌سازد'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--force', action='store_true', help='ساخت دوباره حتی برای کتاب‌هایی که نسخه دارند')
+
+    def handle(self, *args, **options):
+        books = Book.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            books = books.filter(image_variants={})
+        tasks = books.order_by('pk').values_list('pk', 'image').iterator(chunk_size=options['batch_size'])
+
+        started = time.monotonic()
+        done = failed = 0
+        pending = []
+        with ProcessPoolExecutor(max_workers=options['jobs'], initializer=init_worker) as executor:
+            for book_id, variants, error in executor.map(build_variants_task, tasks, chunksize=8):
+                if error:
+                    failed += 1
+                    self.stderr.write(f'کتاب {book_id}: {error}')
+                    continue
+                pending.append(Book(pk=book_id, image_variants=variants, updated_at=timezone.now()))
+                if len(pending) >= options['batch_size']:
+                    done += self._flush(pending)
+                    self.stdout.write(f'{done} کتاب پردازش شد...')
+        done += self._flush(pending)
+
+        if done:
+            bump_catalog_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{done} کتاب در {elapsed:.1f} ثانیه پردازش شد ({failed} خطا).'
+        ))
+
+    def _flush(self, pending):
+        count = len(pending)
+        if pending:
+            with transaction.atomic():
+                Book.objects.bulk_update(pending, ['image_variants', 'updated_at'])
+                listing.refresh_listings([book.pk for book in pending])
+            pending.clear()
+        return count
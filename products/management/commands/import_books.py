@@ -0,0 +1,219 @@
+import csv
+import json
+import os
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.cache import bump_catalog_version
+from products import facets, listing, search, suggestions
+from products.models import Author, Book, Genre, Publisher
+
+
+# همان مقادیر پیش‌فرضی که BookForm برای نویسنده جدید استفاده می‌کند
+AUTHOR_DEFAULTS = {'bio': 'بیوگرافی نویسنده', 'birth_date': '1900-01-01'}
+
+GENRE_SEPARATOR = '|'
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def read_rows(path, fmt):
+    """ردیف‌های فایل ورودی را یکی‌یکی و بدون بارگذاری کل فایل برمی‌گرداند"""
+    with open(path, encoding='utf-8-sig', newline='') as handle:
+        if fmt == 'csv':
+            yield from csv.DictReader(handle)
+            return
+        for line in handle:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def split_author(name):
+    parts = name.strip().split(' ', 1)
+    return parts[0], parts[1] if len(parts) > 1 else ''
+
+
+def parse_genres(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(GENRE_SEPARATOR)
+    return [name.strip() for name in value if name and name.strip()]
+
+
+def parse_row(row):
+    title = (row.get('title') or '').strip()
+    if not title:
+        raise InvalidRow('عنوان خالی است')
+    try:
+        price = Decimal(str(row.get('price') or 0))
+        pages = int(row.get('pages') or 0)
+        quantity = int(row.get('quantity') or 0)
+        publication_date = date.fromisoformat(str(row.get('publication_date')))
+    except (InvalidOperation, TypeError, ValueError) as e:
+        raise InvalidRow(str(e))
+
+    if row.get('author_first_name') or row.get('author_last_name'):
+        author = ((row.get('author_first_name') or '').strip(), (row.get('author_last_name') or '').strip())
+    elif row.get('author'):
+        author = split_author(row['author'])
+    else:
+        author = None
+
+    return {
+        'book': Book(
+            title=title,
+            description=row.get('description') or '',
+            price=price,
+            pages=pages,
+            quantity=quantity,
+            publication_date=publication_date,
+            image=row.get('image') or None,
+        ),
+        'author': author,
+        'publisher': (row.get('publisher') or '').strip() or None,
+        'genres': parse_genres(row.get('genres') or row.get('genre')),
+    }
+
+
+class Command(BaseCommand):
+    help = 'ورود گروهی کتاب‌ها از فایل CSV یا JSONL با bulk_create و امکان ادامه بعد از خطا'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='پیش‌فرض بر اساس پسوند فایل')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--checkpoint', help='فایل پیشرفت (پیش‌فرض: <path>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='نادیده گرفتن checkpoint قبلی')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'فایل {path} پیدا نشد.')
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        self.using = options['database']
+        self.checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        chunk_size = max(1, options['chunk_size'])
+
+        done = 0 if options['restart'] else self._load_checkpoint(path)
+        if done:
+            self.stdout.write(f'ادامه از ردیف {done}...')
+
+        # نقشه‌های نام → شناسه فقط یک بار از دیتابیس خوانده می‌شوند
+        self.authors = {
+            (first, last): pk
+            for pk, first, last in Author.objects.using(self.using).values_list('pk', 'first_name', 'last_name')
+        }
+        self.publishers = {name: pk for pk, name in Publisher.objects.using(self.using).values_list('pk', 'name')}
+        self.genres = {name: pk for pk, name in Genre.objects.using(self.using).values_list('pk', 'name') if name}
+
+        rows = islice(read_rows(path, fmt), done, None)
+        started = time.monotonic()
+        imported = skipped = 0
+        try:
+            while True:
+                batch = list(islice(rows, chunk_size))
+                if not batch:
+                    break
+                chunk = []
+                for row in batch:
+                    done += 1
+                    try:
+                        chunk.append(parse_row(row))
+                    except InvalidRow as e:
+                        skipped += 1
+                        self.stderr.write(f'ردیف {done}: {e}')
+                if chunk:
+                    imported += self._import_chunk(chunk)
+                self._save_checkpoint(path, done)
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'{done} ردیف ({imported / elapsed:.0f} کتاب در ثانیه)')
+        except json.JSONDecodeError as e:
+            raise CommandError(f'JSON نامعتبر بعد از ردیف {done}: {e}')
+        finally:
+            if imported:
+                bump_catalog_version()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{imported} کتاب در {elapsed:.1f} ثانیه وارد شد ({skipped} ردیف نامعتبر).'
+        ))
+
+    def _import_chunk(self, chunk):
+        new_authors, new_publishers, new_genres = {}, {}, {}
+        with transaction.atomic(using=self.using):
+            missing = {item['author'] for item in chunk if item['author'] and item['author'] not in self.authors}
+            if missing:
+                created = Author.objects.using(self.using).bulk_create(
+                    Author(first_name=first, last_name=last, **AUTHOR_DEFAULTS) for first, last in missing
+                )
+                new_authors = {(a.first_name, a.last_name): a.pk for a in created}
+                suggestions.update_authors(created, using=self.using)
+
+            missing = {item['publisher'] for item in chunk if item['publisher'] and item['publisher'] not in self.publishers}
+            if missing:
+                created = Publisher.objects.using(self.using).bulk_create(Publisher(name=name) for name in missing)
+                new_publishers = {p.name: p.pk for p in created}
+                suggestions.update_publishers(created, using=self.using)
+
+            missing = {name for item in chunk for name in item['genres'] if name not in self.genres}
+            if missing:
+                created = Genre.objects.using(self.using).bulk_create(Genre(name=name) for name in missing)
+                new_genres = {g.name: g.pk for g in created}
+
+            books = []
+            for item in chunk:
+                book = item['book']
+                if item['author']:
+                    book.author_id = self.authors.get(item['author']) or new_authors[item['author']]
+                if item['publisher']:
+                    book.publisher_id = self.publishers.get(item['publisher']) or new_publishers[item['publisher']]
+                books.append(book)
+            Book.objects.using(self.using).bulk_create(books)
+
+            Through = Book.genre.through
+            Through.objects.using(self.using).bulk_create(
+                Through(book_id=book.pk, genre_id=genre_id)
+                for book, item in zip(books, chunk)
+                for genre_id in {self.genres.get(name) or new_genres[name] for name in item['genres']}
+            )
+
+            # bulk_create سیگنال نمی‌فرستد؛ ایندکس جستجو، شمارنده‌ها و لیستینگ دستی به‌روز می‌شوند
+            book_ids = [book.pk for book in books]
+            search.reindex_books(book_ids, using=self.using)
+            facets.book_deltas(book_ids, +1, using=self.using)
+            listing.refresh_listings(book_ids, using=self.using)
+            suggestions.update_books(books, using=self.using)
+
+        # شناسه‌های تازه فقط بعد از commit به نقشه‌ها اضافه می‌شوند
+        self.authors.update(new_authors)
+        self.publishers.update(new_publishers)
+        self.genres.update(new_genres)
+        return len(books)
+
+    def _load_checkpoint(self, path):
+        try:
+            with open(self.checkpoint, encoding='utf-8') as handle:
+                state = json.load(handle)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f'فایل checkpoint {self.checkpoint} خراب است؛ با --restart از ابتدا شروع کنید.')
+        if state.get('path') != os.path.abspath(path):
+            raise CommandError(f'checkpoint {self.checkpoint} مربوط به فایل دیگری است.')
+        return state.get('rows', 0)
+
+    def _save_checkpoint(self, path, rows):
+        temp = f'{self.checkpoint}.tmp'
+        with open(temp, 'w', encoding='utf-8') as handle:
+            json.dump({'path': os.path.abspath(path), 'rows': rows}, handle)
+        os.replace(temp, self.checkpoint)
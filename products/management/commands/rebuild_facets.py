@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from products import facets
+from products.models import FacetCount
+
+
+class Command(BaseCommand):
+    help = 'شمارنده‌های ژانر و بازه قیمت فروشگاه را از روی جداول اصلی دوباره می‌سازد'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        facets.rebuild(using=options['database'])
+        total = FacetCount.objects.using(options['database']).count()
+        self.stdout.write(self.style.SUCCESS(f'{total} شمارنده دوباره ساخته شد.'))
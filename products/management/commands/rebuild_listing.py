@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.cache import bump_catalog_version
+from products import listing
+
+
+class Command(BaseCommand):
+    help = 'جدول BookListing را با جداول اصلی مقایسه و ردیف‌های ناهماهنگ یا جاافتاده را اصلاح می‌کند'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total, repaired, removed = listing.rebuild(using=options['database'], chunk_size=max(1, options['chunk_size']))
+        if repaired or removed:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} کتاب بررسی شد: {repaired} ردیف اصلاح و {removed} ردیف اضافی حذف شد '
+            f'({time.monotonic() - started:.1f} ثانیه).'
+        ))
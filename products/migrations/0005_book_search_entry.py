@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:09
+
+import django.db.models.deletion
+import products.models
+from django.db import migrations, models
+
+
+# SQL همین نقطه از تاریخچه؛ migration نباید به products.search که بعداً تغییر می‌کند وابسته باشد
+FTS_TABLE = 'products_book_fts'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, description, author_name, publisher_name, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', %s)", ['bm25(10.0, 1.0, 5.0, 3.0)'])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, description, author_name, publisher_name) "
+            "SELECT b.id, b.title, b.description, "
+            "COALESCE(a.first_name || ' ' || a.last_name, ''), COALESCE(p.name, '') "
+            "FROM products_book b "
+            "LEFT JOIN products_author a ON a.id = b.author_id "
+            "LEFT JOIN products_publisher p ON p.id = b.publisher_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_alter_book_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchEntry',
+            fields=[
+                ('book', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='products.book')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('author_name', models.TextField()),
+                ('publisher_name', models.TextField()),
+                ('document', products.models.FullTextField(db_column='products_book_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'products_book_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
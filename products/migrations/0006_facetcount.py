@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:11
+
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# مرز بازه‌های قیمت در زمان این migration (products.facets.PRICE_BUCKET_BOUNDS)
+PRICE_BUCKET_BOUNDS = (50000, 100000, 200000, 500000, 1000000)
+
+
+def bucket_for(price):
+    return bisect_right(PRICE_BUCKET_BOUNDS, Decimal(price))
+
+
+def populate_facet_counts(apps, schema_editor):
+    Book = apps.get_model('products', 'Book')
+    FacetCount = apps.get_model('products', 'FacetCount')
+    db = schema_editor.connection.alias
+    counts = Counter()
+    for price in Book.objects.using(db).values_list('price', flat=True).iterator():
+        counts[None, bucket_for(price)] += 1
+    for genre_id, price in Book.genre.through.objects.using(db).values_list('genre_id', 'book__price').iterator():
+        counts[genre_id, bucket_for(price)] += 1
+    FacetCount.objects.using(db).bulk_create(
+        FacetCount(genre_id=genre_id, bucket=bucket, count=count)
+        for (genre_id, bucket), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_book_search_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('genre', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='facet_counts', to='products.genre')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('genre', 'bucket'), name='unique_facet_genre_bucket'), models.UniqueConstraint(condition=models.Q(('genre__isnull', True)), fields=('bucket',), name='unique_facet_all_books_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_favorite_counts(apps, schema_editor):
+    Book = apps.get_model('products', 'Book')
+    FavoriteBook = apps.get_model('accounts', 'FavoriteBook')
+    db = schema_editor.connection.alias
+    counts = (FavoriteBook.objects.using(db).filter(book=OuterRef('pk'))
+              .order_by().values('book').annotate(n=Count('pk')).values('n'))
+    Book.objects.using(db).update(favorite_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('products', '0008_book_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='favorite_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_favorite_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_listing(apps, schema_editor):
+    # با مدل‌های تاریخی؛ products.listing مدل‌های فعلی را می‌خواند که ممکن است با این نقطه از تاریخچه نخوانند
+    Book = apps.get_model('products', 'Book')
+    BookListing = apps.get_model('products', 'BookListing')
+    db = schema_editor.connection.alias
+    books = Book.objects.using(db).select_related('author', 'publisher').prefetch_related('genre').order_by('pk')
+    rows = []
+    for book in books.iterator(chunk_size=500):
+        author = book.author
+        genres = sorted((genre.name or '', genre.pk) for genre in book.genre.all())
+        rows.append(BookListing(
+            book_id=book.pk,
+            title=book.title,
+            description=book.description,
+            author_name=f'{author.first_name} {author.last_name}'.strip() if author else '',
+            publisher_name=book.publisher.name if book.publisher else '',
+            genres='|' + '|'.join(f'{pk}:{name}' for name, pk in genres) + '|' if genres else '',
+            price=book.price,
+            publication_date=book.publication_date,
+            quantity=book.quantity,
+            image=book.image.name or '',
+            image_variants=book.image_variants,
+            favorite_count=book.favorite_count,
+            updated_at=book.updated_at,
+        ))
+        if len(rows) == 500:
+            BookListing.objects.using(db).bulk_create(rows)
+            rows = []
+    BookListing.objects.using(db).bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_book_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookListing',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='products.book')),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('author_name', models.CharField(blank=True, max_length=201)),
+                ('publisher_name', models.CharField(blank=True, max_length=100)),
+                ('genres', models.TextField(blank=True)),
+                ('price', models.DecimalField(decimal_places=3, max_digits=10)),
+                ('publication_date', models.DateField()),
+                ('quantity', models.IntegerField()),
+                ('image', models.ImageField(blank=True, null=True, upload_to='Books/')),
+                ('image_variants', models.JSONField(blank=True, default=dict)),
+                ('favorite_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+                ('search_entry', models.ForeignObject(from_fields=['book'], on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.booksearchentry', to_fields=['book'])),
+            ],
+            options={
+                'indexes': [models.Index(fields=['title', 'book'], name='listing_title_idx'), models.Index(fields=['price', 'book'], name='listing_price_idx'), models.Index(fields=['publication_date', 'book'], name='listing_pubdate_idx'), models.Index(fields=['favorite_count', 'book'], name='listing_favorites_idx')],
+            },
+        ),
+        migrations.RunPython(fill_listing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_book_listing'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='book',
+            name='book_title_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='book',
+            name='book_pubdate_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='book',
+            name='book_favorites_id_idx',
+        ),
+    ]
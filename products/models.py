@@ -1,6 +1,7 @@
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Lookup
 
 class Book (models.Model):
     title = models.CharField(max_length=100)
@@ -13,6 +14,17 @@ class Book (models.Model):
     genre = models.ManyToManyField('Genre')
     quantity = models.IntegerField()
     image = models.ImageField(upload_to='Books/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # تعداد علاقه‌مندی‌ها؛ با تأخیر کوتاه از accounts.counters به‌روز می‌شود
+    favorite_count = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        # صفحه‌بندی و مرتب‌سازی فروشگاه روی BookListing و ایندکس‌های آن است؛ روی Book فقط
+        # بازه قیمت (شمارش بازه‌های ناقص facets، فیلتر حذف گروهی و خروجی) ایندکس می‌خواهد
+        indexes = [
+            models.Index(fields=['price', 'id'], name='book_price_id_idx'),
+        ]
     
     def __str__(self):
         return self.title 
@@ -35,7 +47,100 @@ class Publisher (models.Model):
     
 
 class Genre (models.Model):
-    name = models.CharField(max_length=100,null=True, blank=True)
+    name = models.CharField(max_length=100,null=True, blank=True, db_index=True)
     
     def __str__(self):
         return self.name
+
+
+
+class FacetCount (models.Model):
+    """شمارنده از پیش محاسبه‌شده تعداد کتاب‌ها برای هر ژانر و بازه قیمت (genre خالی یعنی همه کتاب‌ها)"""
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, null=True, blank=True, related_name='facet_counts')
+    bucket = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['genre', 'bucket'], name='unique_facet_genre_bucket'),
+            models.UniqueConstraint(fields=['bucket'], condition=models.Q(genre__isnull=True),
+                                    name='unique_facet_all_books_bucket'),
+        ]
+
+    def __str__(self):
+        return f'{self.genre or "*"} [{self.bucket}]: {self.count}'
+
+
+class BookListing (models.Model):
+    """
+    یک ردیف تخت برای هر کتاب با نام نویسنده، ناشر و ژانرهای از پیش join شده؛ صفحات
+    فروشگاه و مدیریت فقط از این جدول می‌خوانند. products.listing آن را به‌روز نگه می‌دارد.
+    """
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='listing')
+    title = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    author_name = models.CharField(max_length=201, blank=True)
+    publisher_name = models.CharField(max_length=100, blank=True)
+    # ژانرها به شکل |3:رمان|7:تاریخ|؛ فیلتر ژانر با genres__contains='|7:' بدون join انجام می‌شود
+    genres = models.TextField(blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=3)
+    publication_date = models.DateField()
+    quantity = models.IntegerField()
+    image = models.ImageField(upload_to='Books/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True)
+    favorite_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField()
+    # همان join جستجوی FTS که Book.search_entry دارد، مستقیم از روی شناسه کتاب
+    search_entry = models.ForeignObject(
+        'BookSearchEntry', on_delete=models.DO_NOTHING, from_fields=['book'], to_fields=['book'], related_name='+',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['title', 'book'], name='listing_title_idx'),
+            models.Index(fields=['price', 'book'], name='listing_price_idx'),
+            models.Index(fields=['publication_date', 'book'], name='listing_pubdate_idx'),
+            models.Index(fields=['favorite_count', 'book'], name='listing_favorites_idx'),
+        ]
+
+    @property
+    def id(self):
+        # قالب‌های کارت کتاب با book.id کار می‌کنند
+        return self.book_id
+
+    @property
+    def genre_names(self):
+        return [item.split(':', 1)[1] for item in self.genres.strip('|').split('|') if item]
+
+    def __str__(self):
+        return self.title
+
+
+class FullTextField(models.TextField):
+    """ستون مخفی جدول FTS5 که هم‌نام خود جدول است و فقط برای MATCH به کار می‌رود"""
+
+
+@FullTextField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class BookSearchEntry (models.Model):
+    """جدول مجازی FTS5 برای جستجوی متنی کتاب‌ها (فقط روی SQLite ساخته می‌شود)"""
+    book = models.OneToOneField(Book, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+                                db_constraint=False, related_name='search_entry')
+    title = models.TextField()
+    description = models.TextField()
+    author_name = models.TextField()
+    publisher_name = models.TextField()
+    document = FullTextField(db_column='products_book_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'products_book_fts'
@@ -0,0 +1,120 @@
+from django.db import connections
+from django.db.models import F, Q
+
+from .models import BookListing
+
+
+FTS_TABLE = 'products_book_fts'
+
+# وزن ستون‌ها در bm25 به ترتیب: عنوان، توضیحات، نویسنده، ناشر
+FTS_RANK_FUNCTION = 'bm25(10.0, 1.0, 5.0, 3.0)'
+
+# محدودیت تعداد پارامترهای SQLite در هر کوئری
+_BATCH_SIZE = 500
+
+
+def is_enabled(using='default'):
+    """جستجوی FTS5 فقط روی SQLite فعال است؛ سایر دیتابیس‌ها از icontains استفاده می‌کنند"""
+    return connections[using].vendor == 'sqlite'
+
+
+def create_index(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "title, description, author_name, publisher_name, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', %s)", [FTS_RANK_FUNCTION])
+
+
+def _batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), _BATCH_SIZE):
+        yield ids[start:start + _BATCH_SIZE]
+
+
+def reindex_books(book_ids, using='default'):
+    """ردیف‌های ایندکس کتاب‌های داده‌شده را از روی جداول اصلی دوباره می‌سازد"""
+    if not is_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        for batch in _batches(book_ids):
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, description, author_name, publisher_name) "
+                "SELECT b.id, b.title, b.description, "
+                "COALESCE(a.first_name || ' ' || a.last_name, ''), COALESCE(p.name, '') "
+                "FROM products_book b "
+                "LEFT JOIN products_author a ON a.id = b.author_id "
+                "LEFT JOIN products_publisher p ON p.id = b.publisher_id "
+                f"WHERE b.id IN ({placeholders})",
+                batch,
+            )
+
+
+def unindex_books(book_ids, using='default'):
+    if not is_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        for batch in _batches(book_ids):
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch)
+
+
+def rebuild_index(using='default'):
+    if not is_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, description, author_name, publisher_name) "
+            "SELECT b.id, b.title, b.description, "
+            "COALESCE(a.first_name || ' ' || a.last_name, ''), COALESCE(p.name, '') "
+            "FROM products_book b "
+            "LEFT JOIN products_author a ON a.id = b.author_id "
+            "LEFT JOIN products_publisher p ON p.id = b.publisher_id"
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def build_match_expression(query):
+    """
+    متن جستجو را به یک عبارت امن FTS5 تبدیل می‌کند؛ هر کلمه به‌صورت پیشوندی
+    جستجو می‌شود تا نتایج هنگام تایپ هم کامل باشند.
+    """
+    terms = []
+    for word in query.split():
+        if not any(ch.isalnum() for ch in word):
+            continue
+        terms.append('"%s"*' % word.replace('"', '""'))
+    return ' '.join(terms)
+
+
+def search_books(books, query):
+    """
+    کتاب‌ها (Book یا BookListing) را بر اساس متن جستجو فیلتر می‌کند. روی SQLite از ایندکس
+    FTS5 استفاده می‌شود و امتیاز bm25 در search_rank قرار می‌گیرد (عدد کمتر یعنی مرتبط‌تر).
+    """
+    if not is_enabled(books.db):
+        if books.model is BookListing:
+            return books.filter(
+                Q(title__icontains=query) |
+                Q(author_name__icontains=query) |
+                Q(description__icontains=query) |
+                Q(publisher_name__icontains=query)
+            )
+        return books.filter(
+            Q(title__icontains=query) |
+            Q(author__first_name__icontains=query) |
+            Q(author__last_name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(publisher__name__icontains=query)
+        )
+
+    expression = build_match_expression(query)
+    if not expression:
+        return books.none()
+    return books.filter(search_entry__document__match=expression).annotate(
+        search_rank=F('search_entry__rank')
+    )
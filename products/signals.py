@@ -0,0 +1,217 @@
+from collections import Counter
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import facets, listing, search, suggestions
+from .deletion import in_bulk_delete
+from .models import Author, Book, Genre, Publisher
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, using, **kwargs):
+    search.reindex_books([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, using, **kwargs):
+    if in_bulk_delete():
+        return
+    search.unindex_books([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Publisher)
+def reindex_related_books(sender, instance, using, created, **kwargs):
+    """تغییر نام نویسنده یا ناشر روی ایندکس همه کتاب‌های مرتبط اثر می‌گذارد"""
+    if created:
+        return
+    lookup = 'author' if sender is Author else 'publisher'
+    book_ids = Book.objects.using(using).filter(**{lookup: instance}).values_list('pk', flat=True)
+    search.reindex_books(book_ids, using=using)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Publisher)
+def touch_related_books(sender, instance, using, created, **kwargs):
+    # کارت‌های کش‌شده کتاب با updated_at باطل می‌شوند و نام نویسنده/ناشر در آن‌ها آمده است
+    if created:
+        return
+    lookup = 'author' if sender is Author else 'publisher'
+    Book.objects.using(using).filter(**{lookup: instance}).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Publisher)
+def remember_publisher_books(sender, instance, using, **kwargs):
+    # بعد از حذف ناشر، publisher کتاب‌ها بدون سیگنال NULL می‌شود؛ پس شناسه‌ها را از قبل نگه می‌داریم
+    instance._book_ids = list(Book.objects.using(using).filter(publisher=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Publisher)
+def reindex_publisher_books(sender, instance, using, **kwargs):
+    book_ids = getattr(instance, '_book_ids', [])
+    search.reindex_books(book_ids, using=using)
+    Book.objects.using(using).filter(pk__in=book_ids).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Book)
+def remember_price_bucket(sender, instance, using, **kwargs):
+    instance._facet_old_bucket = None
+    if instance.pk and not instance._state.adding:
+        old_price = Book.objects.using(using).filter(pk=instance.pk).values_list('price', flat=True).first()
+        if old_price is not None:
+            instance._facet_old_bucket = facets.bucket_for(old_price)
+
+
+@receiver(post_save, sender=Book)
+def update_price_facets(sender, instance, using, created, **kwargs):
+    new_bucket = facets.bucket_for(instance.price)
+    if created:
+        facets.apply_deltas({(None, new_bucket): 1}, using=using)
+        return
+    old_bucket = getattr(instance, '_facet_old_bucket', None)
+    if old_bucket is None or old_bucket == new_bucket:
+        return
+    deltas = Counter({(None, old_bucket): -1, (None, new_bucket): 1})
+    for genre_id in instance.genre.through.objects.using(using).filter(book_id=instance.pk).values_list('genre_id', flat=True):
+        deltas[genre_id, old_bucket] -= 1
+        deltas[genre_id, new_bucket] += 1
+    facets.apply_deltas(deltas, using=using)
+
+
+@receiver(pre_delete, sender=Book)
+def remember_book_facets(sender, instance, using, **kwargs):
+    if in_bulk_delete():
+        return
+    # ردیف‌های جدول واسط ژانرها قبل از post_delete پاک می‌شوند
+    instance._facet_genre_ids = list(
+        instance.genre.through.objects.using(using).filter(book_id=instance.pk).values_list('genre_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Book)
+def remove_book_facets(sender, instance, using, **kwargs):
+    if in_bulk_delete():
+        return
+    bucket = facets.bucket_for(instance.price)
+    deltas = Counter({(None, bucket): -1})
+    for genre_id in getattr(instance, '_facet_genre_ids', []):
+        deltas[genre_id, bucket] -= 1
+    facets.apply_deltas(deltas, using=using)
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def update_genre_facets(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+    شمارنده ژانرها را با add/remove/clear روی Book.genre (از هر دو سمت رابطه) هماهنگ می‌کند.
+    برای remove و clear جفت‌هایی که واقعاً وجود دارند پیش از حذف خوانده می‌شوند.
+    """
+    through = sender.objects.using(using)
+    own_field, other_field = ('genre_id', 'book_id') if reverse else ('book_id', 'genre_id')
+
+    if action in ('pre_remove', 'pre_clear'):
+        rows = through.filter(**{own_field: instance.pk})
+        if action == 'pre_remove':
+            rows = rows.filter(**{f'{other_field}__in': pk_set})
+        instance._facet_removed_pairs = list(rows.values_list('book_id', 'genre_id'))
+    elif action in ('post_remove', 'post_clear'):
+        facets.pair_deltas(getattr(instance, '_facet_removed_pairs', []), -1, using=using)
+        instance._facet_removed_pairs = []
+    elif action == 'post_add':
+        if reverse:
+            pairs = [(book_id, instance.pk) for book_id in pk_set]
+        else:
+            pairs = [(instance.pk, genre_id) for genre_id in pk_set]
+        facets.pair_deltas(pairs, 1, using=using)
+
+
+# لیستینگ در همان تراکنش تغییر منبع بازسازی می‌شود. حذف کتاب با CASCADE ردیف لیستینگ را هم پاک می‌کند.
+# این گیرنده‌ها بعد از touch_related_books ثبت می‌شوند تا updated_at تازه در لیستینگ بیاید.
+
+@receiver(post_save, sender=Book)
+def refresh_book_listing(sender, instance, using, **kwargs):
+    listing.refresh_listings([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Publisher)
+def refresh_related_listings(sender, instance, using, created, **kwargs):
+    if created:
+        return
+    lookup = 'author' if sender is Author else 'publisher'
+    book_ids = Book.objects.using(using).filter(**{lookup: instance}).values_list('pk', flat=True)
+    listing.refresh_listings(book_ids, using=using)
+
+
+@receiver(post_delete, sender=Publisher)
+def refresh_publisher_listings(sender, instance, using, **kwargs):
+    listing.refresh_listings(getattr(instance, '_book_ids', []), using=using)
+
+
+@receiver(post_save, sender=Genre)
+def refresh_genre_listings(sender, instance, using, created, **kwargs):
+    if created:
+        return
+    book_ids = Book.genre.through.objects.using(using).filter(genre_id=instance.pk).values_list('book_id', flat=True)
+    listing.refresh_listings(book_ids, using=using)
+
+
+@receiver(pre_delete, sender=Genre)
+def remember_genre_books(sender, instance, using, **kwargs):
+    # ردیف‌های جدول واسط بدون m2m_changed پاک می‌شوند
+    instance._listing_book_ids = list(
+        Book.genre.through.objects.using(using).filter(genre_id=instance.pk).values_list('book_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Genre)
+def refresh_deleted_genre_listings(sender, instance, using, **kwargs):
+    listing.refresh_listings(getattr(instance, '_listing_book_ids', []), using=using)
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def refresh_genre_change_listings(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            listing.refresh_listings([instance.pk], using=using)
+        return
+    if action == 'pre_clear':
+        instance._listing_book_ids = list(
+            sender.objects.using(using).filter(genre_id=instance.pk).values_list('book_id', flat=True)
+        )
+    elif action == 'post_clear':
+        listing.refresh_listings(getattr(instance, '_listing_book_ids', []), using=using)
+    elif action in ('post_add', 'post_remove'):
+        listing.refresh_listings(pk_set, using=using)
+
+
+# ایندکس پیشنهادهای جستجو در حافظه همین پروسه است و بعد از commit به‌روز می‌شود
+
+@receiver(post_save, sender=Book)
+def update_book_suggestion(sender, instance, using, **kwargs):
+    suggestions.update_books([instance], using=using)
+
+
+@receiver(post_save, sender=Author)
+def update_author_suggestion(sender, instance, using, **kwargs):
+    suggestions.update_authors([instance], using=using)
+
+
+@receiver(post_save, sender=Publisher)
+def update_publisher_suggestion(sender, instance, using, **kwargs):
+    suggestions.update_publishers([instance], using=using)
+
+
+@receiver(post_delete, sender=Book)
+def remove_book_suggestion(sender, instance, using, **kwargs):
+    if in_bulk_delete():
+        return
+    suggestions.remove(suggestions.BOOK, [instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Publisher)
+def remove_related_suggestion(sender, instance, using, **kwargs):
+    kind = suggestions.AUTHOR if sender is Author else suggestions.PUBLISHER
+    suggestions.remove(kind, [instance.pk], using=using)
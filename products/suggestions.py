@@ -0,0 +1,246 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from functools import partial
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import Author, Book, Publisher
+
+
+BOOK = 'book'
+AUTHOR = 'author'
+PUBLISHER = 'publisher'
+
+# حداکثر تعداد کلیدهایی که برای یک پیشوند بررسی می‌شوند؛ زمان پاسخ به اندازه ایندکس بستگی ندارد
+SCAN_LIMIT = 200
+
+# هر عنوان از ابتدای چند کلمه اولش هم پیدا می‌شود («باران» برای «شب باران»)
+MAX_WORD_KEYS = 4
+
+# تغییر بیش از این تعداد مورد به‌جای insert/del تکی (هر کدام O(n)) با یک بار بازسازی آرایه‌ها اعمال می‌شود
+SMALL_BATCH = 8
+
+_CHARACTERS = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'أ': 'ا', 'إ': 'ا', 'آ': 'ا',
+    '‌': ' ', '‏': None, 'ـ': None,
+    **{chr(code): None for code in range(0x064B, 0x0660)},
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+})
+
+
+def normalize(text):
+    """حروف عربی/فارسی یکسان، بدون اعراب، ارقام لاتین، حروف کوچک و یک فاصله بین کلمات"""
+    return ' '.join((text or '').translate(_CHARACTERS).casefold().split())
+
+
+def _suffixes(normalized):
+    """کلید اول خود برچسب نرمال‌شده است و بقیه از ابتدای کلمه‌های بعدی شروع می‌شوند"""
+    if not normalized:
+        return []
+    keys, start = [normalized], 0
+    for _ in range(MAX_WORD_KEYS - 1):
+        start = normalized.find(' ', start) + 1
+        if not start:
+            break
+        keys.append(normalized[start:])
+    return keys
+
+
+class PrefixIndex:
+    """
+    آرایه مرتب کلیدهای نرمال‌شده و جستجوی پیشوند با bisect. هر مورد (نوع، شناسه) با
+    برچسب، امتیاز و برچسب نرمال‌شده‌اش یک بار نگه داشته می‌شود و برای هر کلیدش یک خانه
+    در آرایه دارد؛ کلید اول همان رشته برچسب نرمال‌شده است و حافظه جدا نمی‌گیرد.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._refs = []
+        self._items = {}
+        self._lock = threading.Lock()
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def load(self, items):
+        """ساخت یکجای ایندکس از (نوع، شناسه، برچسب، امتیاز)ها؛ مرتب‌سازی یک بار انجام می‌شود"""
+        entries, keyed = {}, []
+        for kind, pk, label, score in items:
+            ref = (kind, pk)
+            normalized = normalize(label)
+            entries[ref] = (label, score, normalized)
+            keyed.extend((key, ref) for key in _suffixes(normalized))
+        keyed.sort(key=lambda pair: pair[0])
+        with self._lock:
+            self._keys = [key for key, _ in keyed]
+            self._refs = [ref for _, ref in keyed]
+            self._items = entries
+            self.built_at = time.monotonic()
+
+    def _replace(self, refs, entries):
+        """مدخل‌های refs برداشته و entries ({ref: (برچسب، امتیاز، نرمال‌شده)}) اضافه می‌شوند"""
+        old = {ref: self._items.pop(ref) for ref in refs if ref in self._items}
+        self._items.update(entries)
+        added = sorted(((key, ref) for ref, entry in entries.items() for key in _suffixes(entry[2])), key=itemgetter(0))
+        if len(old) + len(entries) <= SMALL_BATCH:
+            for ref, entry in old.items():
+                for key in _suffixes(entry[2]):
+                    i = bisect_left(self._keys, key)
+                    while self._refs[i] != ref:
+                        i += 1
+                    del self._keys[i]
+                    del self._refs[i]
+            for key, ref in added:
+                i = bisect_left(self._keys, key)
+                self._keys.insert(i, key)
+                self._refs.insert(i, ref)
+            return
+        kept = ((key, ref) for key, ref in zip(self._keys, self._refs) if ref not in old)
+        merged = list(heapq.merge(kept, added, key=itemgetter(0)))
+        self._keys = [key for key, _ in merged]
+        self._refs = [ref for _, ref in merged]
+
+    def update(self, items):
+        """(نوع، شناسه، برچسب، امتیاز)ها را اضافه یا جایگزین می‌کند"""
+        entries = {(kind, pk): (label, score, normalize(label)) for kind, pk, label, score in items}
+        with self._lock:
+            self._replace(entries, entries)
+
+    def remove(self, refs):
+        """حذف (نوع، شناسه)ها"""
+        refs = set(refs)
+        with self._lock:
+            self._replace(refs, {})
+
+    def suggest(self, query, limit=8):
+        """
+        تا limit پیشنهاد به ترتیب: برچسب‌هایی که با خود عبارت شروع می‌شوند، امتیاز بیشتر، برچسب کوتاه‌تر.
+        فقط SCAN_LIMIT کلید اول پیشوند بررسی می‌شود.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        found = {}
+        with self._lock:
+            i = bisect_left(self._keys, prefix)
+            end = min(len(self._keys), i + SCAN_LIMIT)
+            while i < end and self._keys[i].startswith(prefix):
+                ref = self._refs[i]
+                found[ref] = found.get(ref, False) or self._items[ref][2] == self._keys[i]
+                i += 1
+            entries = {ref: self._items[ref] for ref in found}
+        ranked = sorted(found, key=lambda ref: (not found[ref], -entries[ref][1], len(entries[ref][0]), entries[ref][0]))
+        return [{'label': entries[ref][0], 'type': ref[0]} for ref in ranked[:limit]]
+
+
+def author_label(author):
+    return f'{author.first_name} {author.last_name}'.strip()
+
+
+def _catalog_items(using):
+    for pk, title, favorite_count in Book.objects.using(using).values_list('pk', 'title', 'favorite_count').iterator():
+        yield BOOK, pk, title, favorite_count
+    for pk, first_name, last_name in Author.objects.using(using).values_list('pk', 'first_name', 'last_name').iterator():
+        yield AUTHOR, pk, f'{first_name} {last_name}'.strip(), 0
+    for pk, name in Publisher.objects.using(using).values_list('pk', 'name').iterator():
+        yield PUBLISHER, pk, name, 0
+
+
+_index = PrefixIndex()
+_build_lock = threading.Lock()
+_rebuilding = False
+
+# تغییرهایی که در طول یک بازسازی commit می‌شوند؛ ممکن است در داده خوانده‌شده نباشند و
+# بعد از ساخته شدن ایندکس جدید و پیش از جایگزینی، دوباره روی آن اعمال می‌شوند
+_pending = None
+_pending_lock = threading.Lock()
+
+
+def _rebuild():
+    global _index, _pending
+    with _pending_lock:
+        _pending = []
+    index = PrefixIndex()
+    try:
+        index.load(_catalog_items(DEFAULT_DB_ALIAS))
+    except BaseException:
+        with _pending_lock:
+            _pending = None
+        raise
+    with _pending_lock:
+        for method, args in _pending:
+            getattr(index, method)(*args)
+        _index = index
+        _pending = None
+
+
+def _rebuild_in_background():
+    global _rebuilding
+    try:
+        _rebuild()
+    finally:
+        _rebuilding = False
+        connections.close_all()
+
+
+def get_index():
+    """
+    ایندکس این پروسه. اولین درخواست آن را می‌سازد و سیگنال‌ها تغییرات همین پروسه را اعمال می‌کنند.
+    تغییرات پروسه‌های دیگر با بازسازی در پس‌زمینه بعد از SUGGESTION_INDEX_MAX_AGE ثانیه می‌رسد.
+    """
+    global _rebuilding
+    index = _index
+    if index.built_at is None:
+        with _build_lock:
+            if _index.built_at is None:
+                _rebuild()
+            return _index
+    max_age = settings.SUGGESTION_INDEX_MAX_AGE
+    if max_age and time.monotonic() - index.built_at > max_age and not _rebuilding:
+        with _build_lock:
+            if not _rebuilding:
+                _rebuilding = True
+                threading.Thread(target=_rebuild_in_background, daemon=True).start()
+    return index
+
+
+def suggest(query, limit=8):
+    return get_index().suggest(query, limit)
+
+
+def _apply(method, *args):
+    with _pending_lock:
+        if _pending is not None:
+            _pending.append((method, args))
+        index = _index
+        if index.built_at is not None:
+            getattr(index, method)(*args)
+
+
+def _on_commit(using, method, items):
+    # ایندکس فقط دیتابیس اصلی را پوشش می‌دهد و تغییر بعد از commit در آن دیده می‌شود؛
+    # هر فراخوانی یک دسته است تا آرایه‌های ایندکس یک بار تغییر کنند
+    if using == DEFAULT_DB_ALIAS and items:
+        transaction.on_commit(partial(_apply, method, items), using=using)
+
+
+def update_books(books, using=DEFAULT_DB_ALIAS):
+    _on_commit(using, 'update', [(BOOK, book.pk, book.title, book.favorite_count) for book in books])
+
+
+def update_authors(authors, using=DEFAULT_DB_ALIAS):
+    _on_commit(using, 'update', [(AUTHOR, author.pk, author_label(author), 0) for author in authors])
+
+
+def update_publishers(publishers, using=DEFAULT_DB_ALIAS):
+    _on_commit(using, 'update', [(PUBLISHER, publisher.pk, publisher.name, 0) for publisher in publishers])
+
+
+def remove(kind, pks, using=DEFAULT_DB_ALIAS):
+    _on_commit(using, 'remove', [(kind, pk) for pk in pks])
@@ -0,0 +1,61 @@
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+def book_card_key(template_name, book):
+    stamp = book.updated_at.timestamp() if book.updated_at else 0
+    return f'book_card:{template_name}:{book.pk}:{stamp}'
+
+
+@register.simple_tag
+def book_cards(items, template_name, attr=None):
+    """
+    کارت HTML هر کتاب را از کش می‌خواند و فقط کارت‌های جاافتاده را رندر می‌کند.
+    کلید کش شامل updated_at کتاب است، پس هر ویرایش کارت همان کتاب را تازه می‌کند.
+    خروجی لیستی از (item, html) است؛ با attr می‌توان کتاب را از روی آیتم (مثلاً favorite.book) برداشت.
+    """
+    items = list(items)
+    books = [getattr(item, attr) if attr else item for item in items]
+    keys = [book_card_key(template_name, book) for book in books]
+    cache = caches[settings.BOOK_CARD_CACHE]
+    cached = cache.get_many(keys)
+
+    card_template = None
+    missing = {}
+    cards = []
+    for item, book, key in zip(items, books, keys):
+        html = cached.get(key)
+        if html is None:
+            if card_template is None:
+                card_template = get_template(template_name)
+            # بدون request رندر می‌شود تا هیچ داده مخصوص کاربر وارد کارت مشترک نشود
+            html = missing[key] = card_template.render({'book': book})
+        cards.append((item, mark_safe(html)))
+
+    if missing:
+        cache.set_many(missing, settings.BOOK_CARD_CACHE_TIMEOUT)
+    return cards
+
+
+@register.filter
+def image_srcset(book, fmt='jpeg'):
+    """رشته srcset از نسخه‌های آماده تصویر کتاب در قالب داده‌شده (webp یا jpeg)"""
+    candidates = sorted(
+        (formats[fmt] for formats in (book.image_variants or {}).values() if fmt in formats),
+        key=lambda info: info['width'],
+    )
+    return ', '.join(f"{default_storage.url(info['name'])} {info['width']}w" for info in candidates)
+
+
+@register.filter
+def image_variant_url(book, variant='card'):
+    info = (book.image_variants or {}).get(variant, {}).get('jpeg')
+    if info:
+        return default_storage.url(info['name'])
+    return book.image.url if book.image else ''
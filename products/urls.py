@@ -4,8 +4,5 @@ from . import views
 app_name = 'products'
 
 urlpatterns = [
-   
-
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
 ]
-
-
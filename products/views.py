@@ -1,3 +1,19 @@
 from django.shortcuts import render, redirect
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET
 from .forms import BookForm
+from . import suggestions
 
+# حداکثر تعداد پیشنهادی که یک درخواست می‌تواند بگیرد
+MAX_SUGGESTIONS = 20
+
+@require_GET
+@cache_control(max_age=60)
+def autocomplete(request):
+    """پیشنهادهای جعبه جستجو از ایندکس پیشوندی حافظه؛ به دیتابیس نمی‌رود (جز ساخت اولیه ایندکس)"""
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), MAX_SUGGESTIONS)
+    except ValueError:
+        limit = 8
+    return JsonResponse({'suggestions': suggestions.suggest(request.GET.get('q', ''), limit)})
@@ -0,0 +1,16 @@
+// وضعیت علاقه‌مندی کارت‌ها؛ کارت‌ها بین کاربران مشترک کش می‌شوند، پس قلب‌ها اینجا پر می‌شوند
+function setFavoriteHeart(bookId, active) {
+  document.querySelectorAll('[data-favorite-book="' + bookId + '"] ion-icon').forEach(function (icon) {
+    icon.setAttribute('name', active ? 'heart' : 'heart-outline');
+  });
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+  const data = document.getElementById('favorite-ids');
+  if (!data) {
+    return;
+  }
+  JSON.parse(data.textContent).forEach(function (bookId) {
+    setFavoriteHeart(bookId, true);
+  });
+});
@@ -79,4 +79,55 @@ const filter = function () {
   }
 }
 
-addEventOnElem(filterBtn, "click", filter);
\ No newline at end of file
+addEventOnElem(filterBtn, "click", filter);
+
+
+/**
+ * search suggestions
+ */
+
+const suggestionInputs = document.querySelectorAll("[data-autocomplete]");
+const suggestionList = document.getElementById("searchSuggestions");
+let suggestionTimer = null;
+
+const showSuggestions = function () {
+  const input = this;
+  const query = input.value.trim();
+  clearTimeout(suggestionTimer);
+  if (!query || !suggestionList) return;
+
+  suggestionTimer = setTimeout(function () {
+    fetch(input.dataset.autocomplete + "?q=" + encodeURIComponent(query))
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        if (input.value.trim() !== query) return;
+        suggestionList.replaceChildren(...data.suggestions.map(function (suggestion) {
+          const option = document.createElement("option");
+          option.value = suggestion.label;
+          return option;
+        }));
+      })
+      .catch(function () {});
+  }, 150);
+}
+
+suggestionInputs.forEach(function (input) {
+  input.addEventListener("input", showSuggestions);
+});
+
+
+
+/**
+ * csrf token for pages served from the shared page cache
+ */
+
+const readCsrfCookie = function () {
+  const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+  return match ? decodeURIComponent(match[1]) : null;
+}
+
+const getCsrfToken = function (cookieUrl) {
+  const token = readCsrfCookie();
+  if (token) return Promise.resolve(token);
+  return fetch(cookieUrl, { credentials: "same-origin" }).then(readCsrfCookie);
+}